@@ -1,30 +1,41 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 from flask import Flask, render_template, jsonify
 from flask_cors import CORS
+from functools import wraps
 import sys
 import os
-import numpy as np
 import random
-import time
 import threading
 
 # Add src to path to import detector and sniffer
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
-from detector import CyberAI_Detector
-import requests
+from startup import StartupTracker
+from alert_dispatcher import AlertDispatcher
+from event_store import EventStore, verdict_rows, DEFAULT_STORE
 import socket
-import json
+
+# Phase timings + readiness. Only the detector gates the API; the location
+# lookup just improves the map once it lands.
+startup = StartupTracker(STARTUP_T0, required=("detector",))
+startup.record_phase("imports", STARTUP_T0, time.perf_counter())
 
 # UDP Sniffer Configuration
 UDP_IP = "0.0.0.0" # Bind to all interfaces
 UDP_PORT = 5005
-packet_queue = [] 
+wire_receiver = None # created by udp_listener (keeps numpy off the startup path)
+live_pipeline = None # continuous detection of sensor traffic (see start_live_pipeline)
 
-# GeoIP Cache to avoid API rate limits
-GEO_CACHE = {}
-SYSTEM_LOCATION = None
+# Offline GeoIP engine (range database + LRU), opened in the background
+geo_engine = None
+# Fallback to a visible location (e.g., NYC) until/unless resolution succeeds
+DEFAULT_LOCATION = {"country": "United States", "city": "New York", "lat": 40.7128, "lon": -74.0060}
+SYSTEM_LOCATION = dict(DEFAULT_LOCATION)
 
 def fetch_system_location():
     """Fetch the public location of this system to use as 'Home Base'"""
+    import requests
     try:
         response = requests.get("http://ip-api.com/json/", timeout=5)
         if response.status_code == 200:
@@ -43,65 +54,158 @@ def fetch_system_location():
     except Exception as e:
         print(f"⚠️ Could not resolve system location: {e}")
     
-    # Fallback to a visible location (e.g., NYC) if resolution fails
-    return {"country": "United States", "city": "New York", "lat": 40.7128, "lon": -74.0060}
+    return dict(DEFAULT_LOCATION)
+
+def resolve_system_location():
+    """Background task: swap in the real location without blocking startup"""
+    global SYSTEM_LOCATION
+    startup.pending("location")
+    with startup.phase("location_lookup"):
+        SYSTEM_LOCATION = fetch_system_location()
+    startup.ready("location")
 
-# Initialize System Location on Startup
-SYSTEM_LOCATION = fetch_system_location()
+def init_geoip():
+    """Background task: open the offline GeoIP database (ip-api.com only as an async fallback)"""
+    global geo_engine
+    from geoip import GeoIP, GeoDatabase, DEFAULT_DATABASE
+    path = os.environ.get("CYBERAI_GEOIP_DB", DEFAULT_DATABASE)
+    database = None
+    with startup.phase("geoip_load"):
+        if os.path.exists(path):
+            try:
+                database = GeoDatabase.open(path)
+                print(f"🗺️ GeoIP database loaded: {len(database)} ranges")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ GeoIP database unusable: {e}")
+    # Without a local database, fall back to remote lookups unless disabled
+    remote = os.environ.get("CYBERAI_GEOIP_REMOTE", "0" if database else "1") == "1"
+    geo_engine = GeoIP(database, cache_size=50000, remote=remote)
+
+def init_event_store():
+    """Background task: open (or create) the verdict history database"""
+    global event_store
+    path = os.environ.get("CYBERAI_EVENT_DB", DEFAULT_STORE)
+    with startup.phase("event_store_open"):
+        try:
+            event_store = EventStore(path, max_age=float(os.environ.get("CYBERAI_EVENT_DAYS", "7")) * 86400,
+                                     max_bytes=int(float(os.environ.get("CYBERAI_EVENT_MB", "1024")) * 2**20)).start()
+        except Exception as e:
+            print(f"⚠️ Event store unavailable ({path}): {e}")
 
 def get_geoip(ip):
-    """Resolve IP to Location using ip-api.com"""
-    # Handle Local/Private IPs
-    if ip.startswith("192.168.") or ip.startswith("10.") or ip.startswith("127."):
-        # Use System Location but add "Jitter" so dots don't stack perfectly
-        base = SYSTEM_LOCATION.copy()
-        
-        # Add random jitter (~5km variance)
-        start_lat = base['lat']
-        start_lon = base['lon']
-        
-        # Consistent jitter based on IP hash would be better, but random is fine for "live" feel
-        # actually, let's just do random to make it look like activity in the area
-        jitter_lat = random.uniform(-0.05, 0.05)
-        jitter_lon = random.uniform(-0.05, 0.05)
-        
-        base['lat'] = start_lat + jitter_lat
-        base['lon'] = start_lon + jitter_lon
-        base['city'] = f"{base['city']} (Local)"
-        
-        return base
-        
-    if ip in GEO_CACHE:
-        return GEO_CACHE[ip]
-        
-    try:
-        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            if data['status'] == 'success':
-                geo_data = {
-                    "country": data.get('country', 'Unknown'),
-                    "region": data.get('regionName', ''),
-                    "city": data.get('city', 'Unknown'),
-                    "isp": data.get('isp', 'Unknown ISP'),
-                    "lat": data.get('lat', 0),
-                    "lon": data.get('lon', 0)
-                }
-                GEO_CACHE[ip] = geo_data
-                print(f"🌍 GeoIP Resolved: {ip} -> {geo_data['city']}, {geo_data['country']}")
-                return geo_data
-    except Exception as e:
-        print(f"⚠️ GeoIP Error: {e}")
-        pass
+    """Resolve IP to Location (local database; never waits on the network)"""
+    return get_geoip_many([ip])[0]
+
+def get_geoip_many(ips, on_resolved=None):
+    """
+    get_geoip() for a batch: public addresses are resolved in one database search.
+    With on_resolved, addresses waiting on a remote lookup come back as PENDING
+    and are delivered later through on_resolved(ip, location).
+    """
+    from geoip import PENDING, is_private
+    out = [None] * len(ips)
+    public = []
+    for pos, ip in enumerate(ips):
+        if is_private(ip):
+            out[pos] = local_location()
+        else:
+            public.append(pos)
+    if public:
+        found = geo_engine.lookup_many([ips[pos] for pos in public], on_resolved) if geo_engine else [None] * len(public)
+        for pos, location in zip(public, found):
+            if location == PENDING and on_resolved is not None:
+                out[pos] = PENDING
+                continue
+            out[pos] = location if isinstance(location, dict) else {"country": "Unknown", "city": "Unknown", "lat": 0, "lon": 0}
+    return out
+
+def local_location():
+    """Private/loopback IPs (172.16/12 and IPv6 included): the system location, jittered"""
+    # Use System Location but add "Jitter" so dots don't stack perfectly
+    base = SYSTEM_LOCATION.copy()
+    
+    # Add random jitter (~5km variance)
+    start_lat = base['lat']
+    start_lon = base['lon']
+    
+    # Consistent jitter based on IP hash would be better, but random is fine for "live" feel
+    # actually, let's just do random to make it look like activity in the area
+    jitter_lat = random.uniform(-0.05, 0.05)
+    jitter_lon = random.uniform(-0.05, 0.05)
+    
+    base['lat'] = start_lat + jitter_lat
+    base['lon'] = start_lon + jitter_lon
+    base['city'] = f"{base['city']} (Local)"
     
-    return {"country": "Unknown", "city": "Unknown", "lat": 0, "lon": 0}
+    return base
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize Detector
-print("⚡ Initializing CyberAI System...")
-detector = CyberAI_Detector(threshold=0.35)
+# Detector, scheduler and watcher are built in the background (see
+# init_detector); routes that need them answer 503 until they exist.
+detector = None
+scheduler = None
+model_watcher = None
+
+def init_detector():
+    """Background task: import and load the model, then publish it"""
+    global detector, scheduler, model_watcher, metrics
+    print("⚡ Initializing CyberAI System...")
+    startup.pending("detector")
+    try:
+        with startup.phase("detector_import"):
+            from detector import CyberAI_Detector
+            from batch_scheduler import MicroBatchScheduler
+            from model_watcher import ModelWatcher
+            from metrics_store import MetricsStore
+        with startup.phase("detector_init"):
+            # REAL packets produce near-identical vectors, so repeated ones skip the model
+            # CYBERAI_WORKERS > 0 scores large batches in worker processes (multi-core)
+            # CYBERAI_CASCADE_BAND (e.g. 0.15) lets clear-cut rows skip the full ensemble
+            cascade_band = os.environ.get("CYBERAI_CASCADE_BAND")
+            new_detector = CyberAI_Detector(threshold=sim_state["threshold"], cache_size=50000, cache_ttl=300.0,
+                                            workers=int(os.environ.get("CYBERAI_WORKERS", "0")),
+                                            cascade_band=float(cascade_band) if cascade_band else None)
+            # Concurrent request threads share model calls through micro-batches
+            new_scheduler = MicroBatchScheduler(new_detector, max_wait=0.002, max_batch=64)
+            # Hot-reloads models/ in the background when the files change
+            new_watcher = ModelWatcher(new_detector, interval=2.0)
+    except Exception as e:
+        print(f"❌ Detector initialization failed: {e}")
+        startup.failed("detector", e)
+        return
+
+    metrics = MetricsStore()
+    detector, scheduler, model_watcher = new_detector, new_scheduler, new_watcher
+    model_watcher.start()
+    startup.ready("detector")
+    print("✅ CyberAI System ready")
+    startup.print_report()
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_init():
+    """Kick off the slow startup work once per serving process"""
+    global _background_started
+    with _background_lock:
+        if _background_started: return
+        _background_started = True
+    threading.Thread(target=init_detector, daemon=True).start()
+    threading.Thread(target=resolve_system_location, daemon=True).start()
+    threading.Thread(target=init_geoip, daemon=True).start()
+    threading.Thread(target=init_event_store, daemon=True).start()
+
+def requires_detector(view):
+    """Answer 503 while the detector is still loading"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if detector is None:
+            return jsonify({"status": "starting", "message": "Detector is still loading",
+                            "components": startup.report()["components"]}), 503
+        return view(*args, **kwargs)
+    return wrapper
 
 # Global stats
 stats = {
@@ -115,6 +219,51 @@ stats = {
 
 # Recent traffic log (keep last 50)
 traffic_log = []
+# Request threads and the live pipeline both update stats / traffic_log
+stats_lock = threading.Lock()
+# 1 s / 1 min / 1 h rollups (created with the detector; keeps numpy off the startup path)
+metrics = None
+# Durable history of every verdict (SQLite, WAL, group commits), opened in the background
+event_store = None
+# Discord webhook delivery: bounded queue, 2 workers, one keep-alive session
+alerts = AlertDispatcher(workers=2, rate=0.5, burst=5, dedup_window=60.0, digest_interval=30.0)
+
+def record_verdicts(entries, results, ips, attack_type, source, dsts=None):
+    """Fold scored traffic into the global stats, metrics, event store, log and alerts"""
+    scored = len(results)
+    attacks = sum(1 for r in results if r['is_attack'])
+    severe = medium = 0
+    for r in results:
+        level = r['alert_level']
+        if level == 'HIGH' or level == 'CRITICAL':
+            severe += 1
+        elif level == 'MEDIUM':
+            medium += 1
+    if metrics is not None:
+        metrics.record(scored, attacks, attack_type, [r['attack_probability'] for r in results], ips,
+                       severe=severe, medium=medium)
+    if event_store is not None:
+        # Every verdict, not just the logged ones; append() only queues
+        event_store.append(verdict_rows(results, ips, source, attack_type, dsts))
+
+    with stats_lock:
+        stats["total_requests"] += scored
+        if attacks:
+            stats["attacks_blocked"] += attacks
+            # Increment specific attack type
+            key = attack_type if attack_type in stats["attack_types"] else "Other"
+            stats["attack_types"][key] += attacks
+        stats["last_update"] = time.time()
+
+        traffic_log.extend(entries)
+        del traffic_log[:-50]
+
+    # 🔔 Remote Alert Logic (the dispatcher deduplicates, rate limits and digests)
+    for entry in entries:
+        result = entry["result"]
+        if result['alert_level'] == "CRITICAL" and result['is_attack']:
+            msg = f"**Attack Blocked!**\nIP: `{entry['ip']}`\nType: `{attack_type}`\nConf: `{result['attack_probability']:.2f}`"
+            alerts.alert(entry["ip"], attack_type, msg, "CRITICAL")
 
 from flask import request
 
@@ -136,15 +285,18 @@ def set_threshold():
     data = request.json
     new_threshold = float(data.get('threshold', 0.35))
     sim_state["threshold"] = new_threshold
-    detector.threshold = new_threshold
+    if detector is not None:
+        detector.threshold = new_threshold
     print(f"🎚️ Threshold adjusted to: {new_threshold}")
     return jsonify({"status": "ok", "threshold": new_threshold})
 
 @app.route('/api/rules', methods=['GET'])
+@requires_detector
 def get_rules():
     return jsonify(detector.get_rules())
 
 @app.route('/api/rules/update', methods=['POST'])
+@requires_detector
 def update_rules():
     data = request.json
     action = data.get('action') # "add" or "remove"
@@ -155,7 +307,39 @@ def update_rules():
         print(f"🛡️ Rule Updated: {action} {ip} to {rule_type}")
         return jsonify({"status": "ok", "rules": detector.get_rules()})
     else:
-        return jsonify({"status": "error", "message": "Failed to update rule"})
+        return jsonify({"status": "error", "message": "Failed to update rule (expected an IP or CIDR prefix)"})
+
+@app.route('/api/rules/feed', methods=['GET'])
+@requires_detector
+def get_feed():
+    return jsonify({"status": "ok", "feed": detector.get_feed_info()})
+
+@app.route('/api/rules/import', methods=['POST'])
+@requires_detector
+def import_feed():
+    """Bulk-import a blocklist: multipart 'file' upload or raw text body (?mode=replace to overwrite)"""
+    merge = request.args.get('mode', 'merge') != 'replace'
+    upload = request.files.get('file')
+    lines = upload.stream if upload else request.stream
+    try:
+        report = detector.import_feed(lines, merge=merge)
+    except (OSError, ValueError) as e:
+        return jsonify({"status": "error", "message": f"Import failed: {e}"})
+    print(f"📥 Threat feed imported: {report['parsed']} entries -> {report['ranges']} ranges")
+    return jsonify({"status": "ok", "report": report, "feed": detector.get_feed_info()})
+
+@app.route('/api/model', methods=['GET'])
+@requires_detector
+def get_model():
+    return jsonify(detector.get_model_info())
+
+@app.route('/api/model/reload', methods=['POST'])
+@requires_detector
+def reload_model():
+    """Load, validate and atomically swap in the model files (background)"""
+    if model_watcher.trigger():
+        return jsonify({"status": "accepted", "model": detector.get_model_info()}), 202
+    return jsonify({"status": "busy", "message": "A reload is already running", "model": detector.get_model_info()}), 409
 
 @app.route('/api/control/webhook', methods=['POST'])
 def set_webhook():
@@ -163,41 +347,38 @@ def set_webhook():
     url = data.get('url')
     if url and url.startswith("https://discord"):
         stats['webhook_url'] = url
+        alerts.set_url(url)
         print(f"🔔 Webhook set: {url[:30]}...")
         # Send a test message
-        send_discord_alert("✅ CyberAI Alert System Connected!", "INFO")
+        alerts.notify("✅ CyberAI Alert System Connected!", "INFO")
         return jsonify({"status": "ok", "message": "Webhook Saved & Tested"})
     return jsonify({"status": "error", "message": "Invalid Discord URL"})
 
-def send_discord_alert(message, level="CRITICAL"):
-    """Send alert to Discord Webhook (Background Task)"""
-    url = stats.get('webhook_url')
-    if not url: return
+@app.before_request
+def ensure_background_init():
+    # Covers servers that never set WERKZEUG_RUN_MAIN (no reloader, WSGI hosts)
+    start_background_init()
 
-    def _send():
-        try:
-            color = 16711680 if level == "CRITICAL" else 16753920 # Red or Orange
-            payload = {
-                "username": "CyberAI Sentinel",
-                "embeds": [{
-                    "title": f"⚠️ {level} THREAT DETECTED",
-                    "description": message,
-                    "color": color,
-                    "footer": {"text": f"Time: {time.strftime('%H:%M:%S')}"}
-                }]
-            }
-            requests.post(url, json=payload, timeout=5)
-        except Exception as e:
-            print(f"❌ Webhook Error: {e}")
-
-    # Run in thread to not block the dashboard
-    threading.Thread(target=_send, daemon=True).start()
+@app.after_request
+def record_first_response(response):
+    startup.first_response()
+    return response
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-import psutil
+@app.route('/api/ready')
+def get_ready():
+    """Readiness probe: 200 once the detector can score traffic, 503 before"""
+    state = startup.components.get("detector", "pending")
+    ready = state == "ready"
+    return jsonify({"status": "ready" if ready else ("failed" if state.startswith("failed") else "starting"),
+                    "components": startup.report()["components"]}), (200 if ready else 503)
+
+@app.route('/api/startup')
+def get_startup():
+    return jsonify(startup.report())
 
 # Global System State (Updated by background thread)
 curr_system_stats = {
@@ -206,28 +387,42 @@ curr_system_stats = {
     "net": 0.0
 }
 
+def start_live_pipeline():
+    """Ingest ring -> batch features -> batch detection -> enrichment -> stats, in the background"""
+    global live_pipeline
+    from live_pipeline import DetectionPipeline
+    live_pipeline = DetectionPipeline(
+        lambda: detector, enrich=get_geoip_many,
+        on_batch=lambda events, results, ips, dsts: record_verdicts(events, results, ips, "Real Traffic",
+                                                                    source="REAL", dsts=dsts))
+    live_pipeline.start()
+    return live_pipeline
+
 def udp_listener():
     """Receive packets from standalone sniffer_service.py"""
+    global wire_receiver
+    from wire_protocol import WireReceiver
+    wire_receiver = WireReceiver()
+    pipeline = start_live_pipeline()
     print(f"📡 UDP Listener active on port {UDP_PORT}")
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind((UDP_IP, UDP_PORT))
     
     while True:
         try:
-            data, addr = sock.recvfrom(4096) # Increase buffer
-            packet = json.loads(data.decode())
-            packet_queue.append(packet)
-            # print(f"🔹 Rx Packet from {addr}: {packet.get('ip')} (Q: {len(packet_queue)})") # Reduce logs
-            
-            # Keep queue size small
-            if len(packet_queue) > 50:
-                packet_queue.pop(0)
+            data, addr = sock.recvfrom(65535) # Binary datagrams carry many connections
+            batch = wire_receiver.decode(data, addr)
+            if batch is None:
+                continue
+            # Every connection is scored by the pipeline, not by dashboard polls
+            pipeline.submit(batch)
         except Exception as e:
             print(f"UDP Error: {e}")
 
 def monitor_system():
     """Background thread to monitor system stats efficiently"""
     global curr_system_stats
+    import psutil
     last_net = psutil.net_io_counters()
     last_time = time.time()
     
@@ -273,14 +468,19 @@ def monitor_system():
 
 # Start Monitor Thread
 # ONLY start threads if we are in the reloader process (to avoid double execution)
-if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+# Inference-pool workers re-import this file as __mp_main__ (spawn); `flask run`
+# imports it as "app", so only that re-import is excluded
+if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and __name__ != '__mp_main__':
     print("🖥️ Starting Background Threads...")
     
     # 1. System Monitor
     monitor_thread = threading.Thread(target=monitor_system, daemon=True)
     monitor_thread.start()
     
-    # 2. Packet Sniffer
+    # 2. Model load, hot-reload watcher and location lookup (off the request path)
+    start_background_init()
+    
+    # 3. Packet Sniffer
     # DEPRECATED: Direct Sniffer caused freeze. Now using UDP Listener (see monitor_system)
     sniffer = None
 else:
@@ -290,115 +490,138 @@ else:
 
 @app.route('/api/stats')
 def get_stats():
+    with stats_lock:
+        snapshot = dict(stats, attack_types=dict(stats["attack_types"]))
+        recent_logs = [dict(entry) for entry in traffic_log[-10:]]
+    # Threat level from alert rates over the last 10 s / 60 s, not request counts
+    snapshot["current_threat_level"] = metrics.threat_level() if metrics else "LOW"
     return jsonify({
-        "stats": stats,
-        "recent_logs": traffic_log[-10:], 
-        "system": curr_system_stats
+        "stats": snapshot,
+        "recent_logs": recent_logs,
+        "system": curr_system_stats,
+        "scheduler": scheduler.get_stats() if scheduler else None,
+        "cache": detector.get_cache_stats() if detector else None,
+        "pool": detector.get_pool_stats() if detector else None,
+        "cascade": detector.get_cascade_stats() if detector else None,
+        "wire": wire_receiver.get_stats() if wire_receiver else None,
+        "pipeline": live_pipeline.get_stats() if live_pipeline else None,
+        "geoip": geo_engine.get_stats() if geo_engine else None,
+        "alerts": alerts.get_stats(),
+        "metrics": metrics.get_stats() if metrics else None,
+        "events": event_store.get_stats() if event_store else None,
+        "ready": startup.is_ready()
     })
 
+@app.route('/api/live')
+def get_live():
+    """Events published or geo-updated after ?since=<seq> (read-only; scoring never waits on this)"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    if live_pipeline is None:
+        return jsonify({"events": [], "last_seq": since, "pipeline": None})
+    events = live_pipeline.events_since(since, limit)
+    stats = live_pipeline.get_stats()
+    # With nothing new, report the pipeline's own position (lower than `since` after a restart)
+    return jsonify({"events": events, "last_seq": events[-1]["seq"] if events else stats["last_seq"],
+                    "pipeline": stats})
+
+@app.route('/api/stats/history')
+def get_stats_history():
+    """Rolled-up detection metrics: ?res=1s|1m|1h (default 1m), ?since=<unix time>"""
+    res = request.args.get('res', '1m')
+    since = request.args.get('since', type=float)
+    if metrics is None:
+        return jsonify({"status": "starting", "buckets": []}), 503
+    if res not in metrics.rings:
+        return jsonify({"status": "error", "message": f"res must be one of {', '.join(metrics.rings)}"}), 400
+    ring = metrics.rings[res]
+    return jsonify({"status": "ok", "res": res, "bucket_seconds": ring.seconds,
+                    "buckets": metrics.history(res, since)})
+
+@app.route('/api/events')
+def get_events():
+    """
+    Stored verdicts, newest first: ?since=&until=<unix time>, ?ip=, ?attacks=1,
+    ?limit= (max 1000), ?cursor=<next_cursor of the previous page>
+    """
+    if event_store is None:
+        return jsonify({"status": "starting", "events": [], "next_cursor": None}), 503
+    try:
+        page = event_store.query(since=request.args.get('since', type=float),
+                                 until=request.args.get('until', type=float),
+                                 ip=request.args.get('ip') or None,
+                                 attacks_only=request.args.get('attacks', '0') == '1',
+                                 limit=max(1, min(request.args.get('limit', 100, type=int), 1000)),
+                                 cursor=request.args.get('cursor') or None)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid cursor"}), 400
+    return jsonify(dict(page, status="ok"))
+
 @app.route('/api/simulate')
+@requires_detector
 def simulate_traffic():
-    """Simulate a single request analysis OR use real packet"""
-    
-    # 1. Try to get REAL packet from UDP Queue
-    real_packet = None
-    # print(f"DEBUG: Checking Queue. Size: {len(packet_queue)}")
-    if len(packet_queue) > 0:
-        real_packet = packet_queue.pop(0)
-    
-    if real_packet:
-        # Use Real Data
-        proto_map = {"tcp": 1, "udp": 2, "other": 0}
-        p_val = proto_map.get(real_packet.get('proto', 'other'), 0)
-        bytes_val = real_packet.get('len', 0)
-        
-        features = [
-             0.01,           # duration
-             p_val,          # protocol_type 
-             0,              # service
-             0,              # flag
-             bytes_val,      # src_bytes
-             0               # dst_bytes
-        ] + [0]*35 # Fill rest with zeros
-        
-        ip = real_packet.get('ip', '0.0.0.0')
-        attack_type = "Real Traffic"
-        current_scenario = "REAL"
-        source_label = "REAL"
-    else:
-        # GENERATE SIMULATED DATA
-        current_scenario = sim_state["scenario"]
-        source_label = "SIM"
-        
-        # Default Features (Normal)
-        features = [0.01, 1, 2, 3, random.randint(100, 500), random.randint(500, 1000)] + [0]*35
-        ip = f"192.168.1.{random.randint(2, 254)}"
-        attack_type = "Normal"
-
-        if current_scenario == "DDOS":
-            # DDoS characteristics: High freq, same service, small packets or huge volume
-            features[4] = random.randint(1000, 5000) # src_bytes
-            features[10] = 255 # count
-            attack_type = "DDoS"
-            ip = f"{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}"
-        elif current_scenario == "BRUTE_FORCE":
-            # Brute Force: High duration, specific service
-            features[0] = 5.0 # duration
-            features[30] = 1.0 # srv_diff_host_rate
-            attack_type = "Brute Force"
-            ip = f"10.0.0.{random.randint(2, 20)}"
-        
-    result = detector.analyze(features, ip_address=ip)
+    """Simulate a single request analysis (sensor traffic is scored by the live pipeline)"""
+    # GENERATE SIMULATED DATA (NSL-KDD feature names; unset features are 0)
+    current_scenario = sim_state["scenario"]
+    source_label = "SIM"
+
+    # Default Features (Normal web browsing)
+    conns = random.randint(1, 10)
+    features = {
+        "protocol_type": "tcp", "service": "http", "flag": "SF",
+        "src_bytes": random.randint(100, 500), "dst_bytes": random.randint(500, 1000),
+        "logged_in": 1, "count": conns, "srv_count": conns, "same_srv_rate": 1.0,
+        "dst_host_count": random.randint(1, 255), "dst_host_srv_count": 255, "dst_host_same_srv_rate": 1.0,
+    }
+    ip = f"192.168.1.{random.randint(2, 254)}"
+    attack_type = "Normal"
+
+    if current_scenario == "DDOS":
+        # DDoS characteristics: SYN flood - hundreds of half-open (S0) connections to one host
+        features = {
+            "protocol_type": "tcp", "service": "private", "flag": "S0",
+            "count": random.randint(200, 511), "srv_count": random.randint(5, 25),
+            "serror_rate": 1.0, "srv_serror_rate": 1.0,
+            "same_srv_rate": random.uniform(0.02, 0.1), "diff_srv_rate": 0.06,
+            "dst_host_count": 255, "dst_host_srv_count": random.randint(5, 25),
+            "dst_host_same_srv_rate": random.uniform(0.02, 0.1), "dst_host_diff_srv_rate": 0.07,
+            "dst_host_serror_rate": 1.0, "dst_host_srv_serror_rate": 1.0,
+        }
+        attack_type = "DDoS"
+        ip = f"{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}"
+    elif current_scenario == "BRUTE_FORCE":
+        # Brute Force: rapid-fire login attempts on one service, sessions reset by the server
+        features = {
+            "duration": random.randint(0, 5), "protocol_type": "tcp", "service": "telnet", "flag": "RSTR",
+            "src_bytes": random.randint(100, 800),
+            "count": random.randint(150, 250), "srv_count": random.randint(15, 30),
+        }
+        attack_type = "Brute Force"
+        ip = f"10.0.0.{random.randint(2, 20)}"
+
+    result = scheduler.analyze(features, ip_address=ip)
     
+    # Metrics get the model's probability, before the visual jitter below
+    verdict = dict(result)
+
     # 🌟 VISUAL FLAIR: Add "jitter" to probability so graph is never perfectly flat
     # This makes the dashboard look "alive" even during normal traffic
     base_prob = result['attack_probability']
     if not result['is_attack']:
         # Add random noise between 0% and 15% for normal traffic
         noise = random.uniform(0.01, 0.15)
-        noise = random.uniform(0.01, 0.15)
         result['attack_probability'] = min(0.99, base_prob + noise)
-        
-    # 🔔 Remote Alert Logic
-    if result['alert_level'] == "CRITICAL" and result['is_attack']:
-        # Rate limit alerts (simple check logic could be improved)
-        if random.random() < 0.2: # Don't spam, only alert on 20% of criticals for demo
-            msg = f"**Attack Blocked!**\nIP: `{ip}`\nType: `{attack_type}`\nConf: `{result['attack_probability']:.2f}`"
-            send_discord_alert(msg, "CRITICAL")
-    
-    # Update global stats
-    stats["total_requests"] += 1
-    if result['is_attack']:
-        stats["attacks_blocked"] += 1
-        # Increment specific attack type
-        if attack_type in stats["attack_types"]:
-            stats["attack_types"][attack_type] += 1
-        else:
-            stats["attack_types"]["Other"] += 1
-    
-    # Simple logic to determine overall threat level based on recent history
-    if result['alert_level'] in ['HIGH', 'CRITICAL']:
-         stats["current_threat_level"] = "HIGH"
-    elif result['alert_level'] == 'MEDIUM' and stats["current_threat_level"] != "HIGH":
-         stats["current_threat_level"] = "MEDIUM"
-    elif stats["total_requests"] % 20 == 0: # Decay threat level occasionally
-         stats["current_threat_level"] = "LOW"
-         
     
     # Log entry
     log_entry = {
-        "id": stats["total_requests"],
+        "id": stats["total_requests"] + 1,
         "timestamp": time.strftime("%H:%M:%S"),
         "ip": ip,
         "result": result,
         "geo": get_geoip(ip),
         "source": source_label
     }
-    
-    traffic_log.append(log_entry)
-    if len(traffic_log) > 50:
-        traffic_log.pop(0)
-        
+    record_verdicts([log_entry], [verdict], [ip], attack_type, source=source_label)
     return jsonify(log_entry)
 
 if __name__ == '__main__':
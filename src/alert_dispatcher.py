@@ -0,0 +1,290 @@
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+
+COLORS = {"CRITICAL": 16711680, "HIGH": 16753920, "INFO": 3447003}   # red, orange, blue
+
+
+def discord_payload(message, level):
+    """Discord webhook body for one alert"""
+    return {
+        "username": "CyberAI Sentinel",
+        "embeds": [{
+            "title": f"⚠️ {level} THREAT DETECTED" if level != "INFO" else "ℹ️ CyberAI Sentinel",
+            "description": message,
+            "color": COLORS.get(level, COLORS["HIGH"]),
+            "footer": {"text": f"Time: {time.strftime('%H:%M:%S')}"}
+        }]
+    }
+
+
+class AlertDispatcher:
+    """
+    🔔 ALERT DISPATCHER
+    ===================
+    Delivers webhook alerts without a thread or connection per alert:
+    - one bounded queue and `workers` threads sharing a keep-alive
+      requests.Session
+    - the same (ip, attack type) alerts at most once per `dedup_window`
+      seconds
+    - a token bucket per attack type (`rate` alerts/s, bursts of `burst`)
+      caps the rest, so a flood of one type can't starve the others;
+      nothing is dropped at random
+    - everything deduplicated or rate-limited is counted and folded into
+      one digest message every `digest_interval` seconds
+    - failed posts (network errors, 5xx, 429) are retried with exponential
+      backoff, honouring Retry-After / Discord's retry_after
+    """
+
+    def __init__(self, url=None, workers=2, queue_size=1000, rate=0.5, burst=5, dedup_window=60.0,
+                 digest_interval=30.0, max_retries=3, backoff=0.5, timeout=5.0, dedup_capacity=10000):
+        self.url = url
+        self.workers = workers
+        self.rate = rate
+        self.burst = burst
+        self.dedup_window = dedup_window
+        self.digest_interval = digest_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.dedup_capacity = dedup_capacity
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._session = None
+        self._buckets = {}                   # attack type -> [tokens, last refill]
+        self._last_sent = OrderedDict()      # (ip, attack type) -> monotonic time of its last alert
+        self._suppressed = Counter()         # attack type -> alerts held back since the last digest
+        self._suppressed_ips = Counter()
+        self._digest_due = time.monotonic() + digest_interval
+
+        self.submitted = 0
+        self.queued = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self.sent = 0
+        self.digests = 0
+        self.retries = 0
+        self.failed = 0
+
+    def set_url(self, url):
+        self.url = url
+
+    def _start(self):
+        # Caller holds the lock
+        if self._threads:
+            return
+        import requests
+        self._session = requests.Session()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True, name=f"alert-dispatcher-{i}")
+            thread.start()
+            self._threads.append(thread)
+
+    def _take_token(self, attack_type, now):
+        bucket = self._buckets.get(attack_type)
+        if bucket is None:
+            bucket = self._buckets[attack_type] = [float(self.burst), now]
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return True
+        return False
+
+    def _enqueue(self, payload):
+        # Caller holds the lock
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.queued += 1
+        return True
+
+    def alert(self, ip, attack_type, message, level="CRITICAL"):
+        """
+        Offer one detection alert. Returns "queued", "deduplicated",
+        "rate_limited", "dropped" (queue full) or "disabled" (no webhook).
+        """
+        if not self.url:
+            return "disabled"
+        now = time.monotonic()
+        key = (ip, attack_type)
+        with self._lock:
+            self.submitted += 1
+            self._start()
+            self._maybe_digest(now)
+            last = self._last_sent.get(key)
+            if last is not None and now - last < self.dedup_window:
+                self.deduplicated += 1
+                outcome = "deduplicated"
+            elif not self._take_token(attack_type, now):
+                self.rate_limited += 1
+                outcome = "rate_limited"
+            else:
+                self._last_sent[key] = now
+                self._last_sent.move_to_end(key)
+                while len(self._last_sent) > self.dedup_capacity:
+                    self._last_sent.popitem(last=False)
+                return "queued" if self._enqueue(discord_payload(message, level)) else "dropped"
+            self._suppressed[attack_type] += 1
+            self._suppressed_ips[ip] += 1
+            return outcome
+
+    def notify(self, message, level="INFO"):
+        """System message (webhook test, ...): no dedup or rate limit"""
+        if not self.url:
+            return "disabled"
+        with self._lock:
+            self._start()
+            return "queued" if self._enqueue(discord_payload(message, level)) else "dropped"
+
+    def _maybe_digest(self, now):
+        # Caller holds the lock
+        if now < self._digest_due:
+            return
+        self._digest_due = now + self.digest_interval
+        total = sum(self._suppressed.values())
+        if not total:
+            return
+        types = ", ".join(f"{kind} ×{count}" for kind, count in self._suppressed.most_common())
+        top = ", ".join(f"`{ip}` ×{count}" for ip, count in self._suppressed_ips.most_common(5))
+        message = (f"**{total} more alerts** in the last {self.digest_interval:.0f}s "
+                   f"(repeats and over the rate limit)\nTypes: {types}\nTop sources: {top}")
+        self._suppressed.clear()
+        self._suppressed_ips.clear()
+        if self._enqueue(discord_payload(message, "HIGH")):
+            self.digests += 1
+
+    def _worker(self):
+        while True:
+            try:
+                payload = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                payload = None
+            if payload is None:
+                # Quiet period: a digest may still be due
+                with self._lock:
+                    self._maybe_digest(time.monotonic())
+                continue
+            self._post(payload)
+
+    def _post(self, payload):
+        for attempt in range(self.max_retries + 1):
+            delay = self.backoff * (2 ** attempt)
+            try:
+                response = self._session.post(self.url, json=payload, timeout=self.timeout)
+                if response.status_code < 400:
+                    with self._lock:
+                        self.sent += 1
+                    return True
+                if response.status_code == 429:
+                    delay = max(delay, _retry_after(response))
+                elif response.status_code < 500:
+                    print(f"❌ Webhook Error: HTTP {response.status_code}")
+                    break                # bad URL / payload: retrying won't help
+            except Exception as e:
+                print(f"❌ Webhook Error: {e}")
+            if attempt < self.max_retries:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+        with self._lock:
+            self.failed += 1
+        return False
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "enabled": bool(self.url),
+                "submitted": self.submitted,
+                "queued": self.queued,
+                "sent": self.sent,
+                "deduplicated": self.deduplicated,
+                "rate_limited": self.rate_limited,
+                "dropped": self.dropped,
+                "digests": self.digests,
+                "pending_in_digest": sum(self._suppressed.values()),
+                "retries": self.retries,
+                "failed": self.failed,
+                "queue_depth": self._queue.qsize(),
+                "workers": len(self._threads),
+            }
+
+
+def _retry_after(response):
+    """Seconds to wait from a 429: Retry-After header or Discord's JSON retry_after"""
+    try:
+        return float(response.headers.get("Retry-After") or response.json().get("retry_after", 0))
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+if __name__ == "__main__":
+    import json
+    import random
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    # Local stand-in for the webhook: 20 ms per post, every 10th post fails
+    # with a 500 and the 3rd is rate limited with retry_after
+    received = []
+    posts = Counter()
+
+    class StandIn(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            posts["total"] += 1
+            n = posts["total"]
+            time.sleep(0.02)
+            if n == 3:
+                status, body = 429, {"retry_after": 0.2}
+            elif n % 10 == 0:
+                status, body = 500, {}
+            else:
+                status, body = 204, None
+                received.append(payload["embeds"][0]["description"])
+            data = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    dispatcher = AlertDispatcher(f"http://127.0.0.1:{server.server_port}/webhook",
+                                 rate=2.0, burst=5, dedup_window=10.0, digest_interval=1.0)
+
+    # A ~4 s flood: 20k critical detections from 50 sources, plus one new attacker
+    rng = random.Random(0)
+    sources = [f"198.51.100.{i}" for i in range(50)]
+    threads_before = threading.active_count()
+    outcomes = Counter()
+    submit_s = 0.0
+    for i in range(20000):
+        ip = "203.0.113.9" if i == 15000 else rng.choice(sources)
+        kind = "Brute Force" if ip == "203.0.113.9" else "DDoS"
+        t0 = time.perf_counter()
+        outcomes[dispatcher.alert(ip, kind, f"**Attack Blocked!**\nIP: `{ip}`\nType: `{kind}`")] += 1
+        submit_s += time.perf_counter() - t0
+        time.sleep(0.00015)
+    peak_threads = threading.active_count()
+    time.sleep(2.5)                          # let retries and the last digest go out
+    stats = dispatcher.get_stats()
+
+    print(f"🔔 {stats['submitted']} critical detections offered "
+          f"({submit_s / stats['submitted'] * 1e6:.1f} µs each in alert()): {dict(outcomes)}")
+    print(f"   webhook posts: {posts['total']} ({stats['sent']} delivered, {stats['digests']} digests, "
+          f"{stats['retries']} retries, {stats['failed']} failed)")
+    print(f"   threads: {threads_before} before, {peak_threads} during the flood")
+    print(f"   new attacker alerted: {any('203.0.113.9' in text for text in received)}")
+    digest = next((text for text in received if "more alerts" in text), "")
+    print(f"   first digest: {digest.splitlines()[0] if digest else None}")
+    print("   (before: one thread + one connection per alert, 20% of criticals dropped at random)")
+    server.shutdown()
@@ -0,0 +1,168 @@
+import threading
+
+import numpy as np
+
+
+class CascadeScorer:
+    """
+    🪜 CASCADED EARLY-EXIT SCORING
+    ==============================
+    Scores every row with one cheap ensemble member first. Rows whose score
+    is more than `band` away from the threshold exit with that score; only
+    the ambiguous rows pay for the full soft vote (which reuses the stage
+    score, so they cost no more than before).
+    - stage_member: member index for stage 1 (default: the cheapest one)
+    - stage_trees: only walk the first N trees of that member (cheaper still,
+      but the full vote then has to recompute the member)
+    - audit_rate: fraction of early exits that are also fully scored, to
+      track how often the cascade verdict agrees with the full ensemble
+    """
+
+    def __init__(self, ensemble, band=0.15, stage_member=None, stage_trees=None, audit_rate=0.01, seed=0):
+        if len(ensemble.members) < 2 and stage_trees is None:
+            raise ValueError("Cascade needs a multi-member ensemble or stage_trees")
+        if stage_member is None:
+            stage_member = min(range(len(ensemble.members)), key=ensemble.member_cost)
+        self.ensemble = ensemble
+        self.band = float(band)
+        self.stage_member = stage_member
+        self.stage_trees = stage_trees
+        self.audit_rate = audit_rate
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+        self.rows = 0
+        self.early_exits = 0
+        self.audited = 0
+        self.agreed = 0
+        self.audit_abs_diff = 0.0
+
+    def score(self, X, threshold, full=None):
+        """
+        Attack probability per row of X. `full(X)` scores ambiguous rows with
+        the whole ensemble (default: this ensemble, reusing the stage score).
+        """
+        stage = self.ensemble.member_proba(X, self.stage_member, self.stage_trees)
+        exit_mask = np.abs(stage - threshold) > self.band
+        out = stage.copy()
+
+        # Ambiguous rows, plus a random sample of early exits for the agreement audit
+        audit_mask = exit_mask & (self._rng.random(len(X)) < self.audit_rate)
+        rescore = np.flatnonzero(~exit_mask | audit_mask)
+        if rescore.size:
+            if full is not None:
+                proba = full(X[rescore])
+            else:
+                known = {self.stage_member: stage[rescore]} if self.stage_trees is None else None
+                proba = self.ensemble.predict_attack_proba(X[rescore], known)
+            full_proba = np.empty(len(X))
+            full_proba[rescore] = proba
+            ambiguous = ~exit_mask
+            out[ambiguous] = full_proba[ambiguous]
+        else:
+            full_proba = None
+
+        with self._lock:
+            self.rows += len(X)
+            self.early_exits += int(np.count_nonzero(exit_mask))
+            n_audit = int(np.count_nonzero(audit_mask))
+            if n_audit:
+                self.audited += n_audit
+                self.agreed += int(np.count_nonzero(
+                    (stage[audit_mask] > threshold) == (full_proba[audit_mask] > threshold)))
+                self.audit_abs_diff += float(np.abs(stage[audit_mask] - full_proba[audit_mask]).sum())
+        return out
+
+    def get_stats(self):
+        with self._lock:
+            kind = self.ensemble.members[self.stage_member][0]
+            return {
+                "band": self.band,
+                "stage": f"{kind}[:{self.stage_trees}]" if self.stage_trees else kind,
+                "rows": self.rows,
+                "early_exits": self.early_exits,
+                "early_exit_rate": round(self.early_exits / self.rows, 4) if self.rows else 0.0,
+                "audited": self.audited,
+                "agreement": round(self.agreed / self.audited, 4) if self.audited else None,
+                "audit_mean_abs_diff": round(self.audit_abs_diff / self.audited, 4) if self.audited else None,
+            }
+
+
+def sample_traffic(n, seed=0):
+    """
+    NSL-KDD connection dicts shaped like the dashboard's simulated scenarios
+    (normal browsing, SYN flood, telnet brute force, and perturbed normal
+    traffic); encode and standardize them before scoring.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for scenario in rng.integers(0, 4, n):
+        conns = int(rng.integers(1, 11))
+        row = {
+            "protocol_type": "tcp", "service": "http", "flag": "SF",
+            "src_bytes": int(rng.integers(100, 500)), "dst_bytes": int(rng.integers(500, 1000)),
+            "logged_in": 1, "count": conns, "srv_count": conns, "same_srv_rate": 1.0,
+            "dst_host_count": int(rng.integers(1, 256)), "dst_host_srv_count": 255, "dst_host_same_srv_rate": 1.0,
+        }
+        if scenario == 1:
+            srv = int(rng.integers(5, 26))
+            row = {
+                "protocol_type": "tcp", "service": "private", "flag": "S0",
+                "count": int(rng.integers(200, 512)), "srv_count": srv, "serror_rate": 1.0, "srv_serror_rate": 1.0,
+                "same_srv_rate": rng.uniform(0.02, 0.1), "diff_srv_rate": 0.06,
+                "dst_host_count": 255, "dst_host_srv_count": srv,
+                "dst_host_same_srv_rate": rng.uniform(0.02, 0.1), "dst_host_diff_srv_rate": 0.07,
+                "dst_host_serror_rate": 1.0, "dst_host_srv_serror_rate": 1.0,
+            }
+        elif scenario == 2:
+            row = {
+                "duration": int(rng.integers(0, 6)), "protocol_type": "tcp", "service": "telnet", "flag": "RSTR",
+                "src_bytes": int(rng.integers(100, 801)),
+                "count": int(rng.integers(150, 251)), "srv_count": int(rng.integers(15, 31)),
+            }
+        elif scenario == 3:
+            # Borderline traffic: normal rows with the counts and rates pushed around
+            for name in ("count", "srv_count", "dst_host_count"):
+                row[name] = int(row[name] * rng.uniform(1, 60))
+            for name in ("serror_rate", "rerror_rate", "same_srv_rate", "dst_host_same_srv_rate"):
+                row[name] = rng.uniform(0, 1)
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from detector import ModelState
+
+    parser = argparse.ArgumentParser(description="Cascade early-exit rate / agreement / latency per band")
+    parser.add_argument("--models", default="models")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--bands", type=float, nargs="+", default=[0.05, 0.1, 0.15, 0.25, 0.35])
+    parser.add_argument("--stage-trees", type=int, default=None)
+    args = parser.parse_args()
+
+    state = ModelState.load(args.models)
+    ensemble = state.compiled_model
+    # The model's input space: category codes, then the training scaler
+    X = state.pipeline.standardize(state.pipeline.encode(sample_traffic(args.rows)))
+    chunks = [X[i:i + 512] for i in range(0, len(X), 512)]
+
+    start = time.perf_counter()
+    reference = np.concatenate([ensemble.predict_attack_proba(c) for c in chunks])
+    base = time.perf_counter() - start
+    ref_verdict = reference > args.threshold
+    print(f"🪜 {args.rows} rows, threshold {args.threshold:.2f}, full ensemble {base / args.rows * 1e6:.1f} µs/row")
+
+    for band in args.bands:
+        cascade = CascadeScorer(ensemble, band=band, stage_trees=args.stage_trees, audit_rate=0.0)
+        start = time.perf_counter()
+        proba = np.concatenate([cascade.score(c, args.threshold) for c in chunks])
+        elapsed = time.perf_counter() - start
+        stats = cascade.get_stats()
+        agree = np.mean((proba > args.threshold) == ref_verdict)
+        print(f"   band ±{band:.2f} [{stats['stage']}] exit {stats['early_exit_rate']:6.1%} | "
+              f"verdict agreement {agree:7.3%} | {elapsed / args.rows * 1e6:5.1f} µs/row "
+              f"({base / elapsed:4.2f}x)")
@@ -1,6 +1,134 @@
-import joblib
+import hashlib
+import os
+import threading
+import time
 import numpy as np
-import pandas as pd
+from model_bundle import NSL_KDD_FEATURES, ModelBundle
+from pipeline import InferencePipeline
+from rule_store import DEFAULT_STORE, RangeStore, import_feed
+from rule_trie import ALLOW, BLOCK, RuleEngine
+from verdict_cache import VerdictCache
+
+class ModelState:
+    """
+    Everything a verdict needs from the model directory. Detectors swap whole
+    snapshots atomically, and each call captures one snapshot up front, so an
+    in-flight analyze() always finishes on the model it started with.
+
+    Loaded from models/bundle/ (memory-mapped compiled trees, sklearn only
+    loaded on demand) unless the three pickles are newer than it, so either
+    can be dropped in as an update.
+    """
+
+    def __init__(self, model, scaler, encoders, compiled_model, engine, version, model_dir,
+                 feature_names, categories, scaler_mean, scaler_scale,
+                 bundle=None, canary=None):
+        self._model = model
+        self.scaler = scaler            # sklearn objects (pickle path only)
+        self.encoders = encoders
+        self.compiled_model = compiled_model
+        self.engine = engine
+        self.version = version
+        self.model_dir = model_dir
+        self.feature_names = feature_names
+        self.n_features = len(feature_names)
+        self.categories = categories    # column -> list of known category strings
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.bundle = bundle
+        self.canary = canary            # (rows, expected probabilities) or None
+        self.loaded_at = time.time()
+        # Category encoding + scaling in front of the model
+        self.pipeline = InferencePipeline(feature_names, categories, scaler_mean, scaler_scale)
+
+    @property
+    def sklearn_loaded(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        """The sklearn ensemble (lazily loaded from the bundle if needed)"""
+        if self._model is None and self.bundle is not None:
+            self._model = self.bundle.load_sklearn_model()
+        return self._model
+
+    def attack_proba(self, X, compiled_max_batch):
+        """Attack probability per row of X, on whichever engine suits the batch size"""
+        compiled = self.compiled_model
+        if compiled is not None and (len(X) <= compiled_max_batch or not self.sklearn_loaded):
+            if len(X) <= compiled_max_batch:
+                return compiled.predict_attack_proba(X)
+            # Bundle-only snapshots never load sklearn just for big batches
+            step = compiled_max_batch
+            return np.concatenate([compiled.predict_attack_proba(X[i:i + step]) for i in range(0, len(X), step)])
+        return self.model.predict_proba(X)[:, 1]
+
+    PICKLES = ('best_model.pkl', 'scaler.pkl', 'encoders.pkl')
+
+    @classmethod
+    def load(cls, model_dir, engine="compiled", use_bundle=True, verify=False):
+        """
+        Load model + preprocessors from model_dir; raises on any failure.
+        verify=True re-checks the bundle's file checksums first.
+        """
+        bundle_dir = os.path.join(model_dir, 'bundle')
+        if use_bundle and ModelBundle.exists(bundle_dir) and not cls._pickles_newer(model_dir, bundle_dir):
+            return cls._load_bundle(bundle_dir, model_dir, engine, verify)
+        return cls._load_pickles(model_dir, engine)
+
+    @classmethod
+    def _pickles_newer(cls, model_dir, bundle_dir):
+        """True when all three pickles exist and one was written after the bundle"""
+        try:
+            newest = max(os.path.getmtime(os.path.join(model_dir, name)) for name in cls.PICKLES)
+        except OSError:
+            return False
+        return newest > os.path.getmtime(os.path.join(bundle_dir, 'manifest.json'))
+
+    @classmethod
+    def _load_bundle(cls, bundle_dir, model_dir, engine, verify=False):
+        bundle = ModelBundle.load(bundle_dir, mmap=True)
+        if verify:
+            mismatched = bundle.verify()
+            if mismatched:
+                raise ValueError(f"Bundle {bundle.version} fails its checksums: {', '.join(mismatched)}")
+        compiled = bundle.compiled if engine == "compiled" else None
+        model = None if compiled is not None else bundle.load_sklearn_model()
+        return cls(model, None, None, compiled, engine, bundle.version, model_dir,
+                   bundle.feature_names, bundle.categories, bundle.scaler_mean, bundle.scaler_scale,
+                   bundle=bundle, canary=(bundle.canary_X, bundle.canary_proba))
+
+    @classmethod
+    def _load_pickles(cls, model_dir, engine):
+        import joblib
+        model_path = os.path.join(model_dir, 'best_model.pkl')
+        model = joblib.load(model_path)
+        scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
+        encoders = joblib.load(os.path.join(model_dir, 'encoders.pkl'))
+
+        digest = hashlib.sha256()
+        with open(model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        mtime = time.strftime('%Y%m%d-%H%M%S', time.localtime(os.path.getmtime(model_path)))
+        version = f"{mtime}-{digest.hexdigest()[:8]}"
+
+        # ⚡ COMPILED ENGINE (flat-array trees, falls back to sklearn)
+        compiled = None
+        if engine == "compiled":
+            try:
+                from tree_engine import compile_model
+                compiled = compile_model(model)
+            except Exception as e:
+                print(f"⚠️  Compiled engine unavailable ({e}), using sklearn")
+                engine = "sklearn"
+
+        names = getattr(scaler, 'feature_names_in_', None)
+        names = list(names) if names is not None else NSL_KDD_FEATURES[:model.n_features_in_]
+        categories = {col: [str(c) for c in enc.classes_] for col, enc in encoders.items()}
+        return cls(model, scaler, encoders, compiled, engine, version, model_dir,
+                   names, categories, scaler.mean_, scaler.scale_)
+
 
 class CyberAI_Detector:
     """
@@ -11,30 +139,92 @@ class CyberAI_Detector:
     - Multiple alert levels
     - Logging capability
     - Batch processing
+    - Compiled tree inference (engine="compiled"), sklearn fallback
+    - Optional verdict cache for repetitive traffic (cache_size > 0)
+    - Zero-downtime model hot-reload (reload_model)
+    - Multi-core scoring of large batches in worker processes (workers > 0)
+    - Cascaded early-exit scoring: cheap member first (cascade_band)
+    - Connections as numbers, category strings ('tcp', 'http', 'SF') or
+      {feature_name: value} dicts; scaled exactly as in training
     """
+
+    ENGINES = ("compiled", "sklearn")
+    # Above this many rows sklearn's Cython traversal beats the lock-step walk
+    COMPILED_MAX_BATCH = 512
+    # Rows a freshly loaded model must score sanely before it goes live
+    CANARY_ROWS = 32
+    # Smaller batches are cheaper to score in-process than to ship to a worker
+    POOL_MIN_BATCH = 2048
     
-    def __init__(self, threshold=0.35):
-        """Initialize detector with sensitivity threshold"""
+    def __init__(self, threshold=0.35, engine="compiled", cache_size=0, cache_ttl=300.0, cache_quantum=None,
+                 model_dir='models', workers=0, cascade_band=None, cascade_trees=None, cascade_audit=0.01):
+        """
+        Initialize detector with sensitivity threshold and inference engine.
+        cache_size > 0 enables the verdict cache (LRU entries, TTL seconds,
+        quantum = None for exact vectors or a rounding step per feature).
+        workers > 0 scores large batches in that many worker processes
+        (None = one per CPU); 0 keeps all scoring in this process.
+        cascade_band enables early exit: rows whose cheap-member score is
+        more than the band away from the threshold skip the full ensemble
+        (cascade_trees limits the cheap stage to its first N trees,
+        cascade_audit is the fraction of exits re-scored to measure agreement).
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
         print("🔧 Initializing CyberAI Detector...")
         
         # Load trained model and preprocessors
+        self.model_dir = model_dir
+        self.requested_engine = engine
+        self._state = None
+        self._reload_lock = threading.Lock()
+        self.reload_status = {"state": "idle", "reloads": 0, "last_reload_ms": None, "last_error": None}
         try:
-            self.model = joblib.load('models/best_model.pkl')
-            self.scaler = joblib.load('models/scaler.pkl')
-            self.encoders = joblib.load('models/encoders.pkl')
-            print("✅ AI Model loaded successfully!")
-        except:
+            self._state = ModelState.load(model_dir, engine, verify=True)
+            print(f"✅ AI Model loaded successfully! (version {self._state.version}"
+                  f"{', bundle' if self._state.bundle else ''})")
+            if self.compiled_model is not None:
+                print(f"⚡ Compiled inference engine ready ({self.compiled_model.n_trees} trees)")
+        except FileNotFoundError:
             print("⚠️  Models not found. Run training first.")
-            self.model = None
+        except Exception as e:
+            print(f"❌ Could not load models from {model_dir}/: {type(e).__name__}: {e}")
             
         # Configuration
         self.threshold = threshold
+        self.cascade_config = None if cascade_band is None else dict(
+            band=cascade_band, stage_trees=cascade_trees, audit_rate=cascade_audit)
+        self._cascade = (None, None)        # (state, CascadeScorer) for the live snapshot
+        self.pool = None
+        if workers != 0 and self._state is not None:
+            from inference_pool import ProcessPoolBackend
+            try:
+                self.pool = ProcessPoolBackend(model_dir, workers=workers, engine=engine,
+                                               n_features=self._state.n_features,
+                                               compiled_max_batch=self.COMPILED_MAX_BATCH)
+            except OSError as e:
+                print(f"⚠️  Inference pool unavailable, scoring in-process: {e}")
+        self.cache = VerdictCache(cache_size, cache_ttl, cache_quantum) if cache_size > 0 else None
         
         # 🛡️ RULE ENGINE (Hybrid Defense)
-        # trusted_ips: Always ALLOW (Verdict: Safe)
-        # blocked_ips: Always BLOCK (Verdict: Critical)
-        self.trusted_ips = {"192.168.1.1", "10.0.0.1"} # Example: Admin IPs
-        self.blocked_ips = {"192.168.1.100", "1.1.1.1"} # Example: Known attackers
+        # whitelist: Always ALLOW (Verdict: Safe)
+        # blacklist: Always BLOCK (Verdict: Critical)
+        # Entries are IPs or CIDR prefixes; the longest matching prefix wins.
+        self.rules = RuleEngine()
+        for ip in ("192.168.1.1", "10.0.0.1"): # Example: Admin IPs
+            self.rules.add(ip, "whitelist")
+        for ip in ("192.168.1.100", "1.1.1.1"): # Example: Known attackers
+            self.rules.add(ip, "blacklist")
+
+        # 📥 THREAT FEEDS (bulk blocklists, memory-mapped from disk)
+        self.feed_path = DEFAULT_STORE
+        self._feed_lock = threading.Lock()         # serializes import_feed()
+        if os.path.exists(self.feed_path):
+            try:
+                self.rules.feed = RangeStore.open(self.feed_path)
+                print(f"📥 Threat feed loaded: {len(self.rules.feed)} blocked ranges")
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Could not open threat feed {self.feed_path}: {e}")
         
         self.alert_levels = {
             'INFO': '📊 Monitor',
@@ -45,34 +235,113 @@ class CyberAI_Detector:
         }
         
         print(f"🔐 Detection threshold: {self.threshold:.0%}")
-        print(f"📝 Rules loaded: {len(self.trusted_ips)} Allowed, {len(self.blocked_ips)} Blocked")
+        print(f"📝 Rules loaded: {self.rules.count('whitelist')} Allowed, {self.rules.count('blacklist')} Blocked")
         print("="*50)
 
+    # Read-only views of the live model snapshot
+    model = property(lambda self: self._state.model if self._state else None)
+    scaler = property(lambda self: self._state.scaler if self._state else None)
+    encoders = property(lambda self: self._state.encoders if self._state else None)
+    compiled_model = property(lambda self: self._state.compiled_model if self._state else None)
+    engine = property(lambda self: self._state.engine if self._state else self.requested_engine)
+
+    def reload_model(self, model_dir=None):
+        """
+        Load model files in the calling thread, validate them on a canary
+        batch and swap them in atomically. Returns True on success; on
+        failure the current model stays live.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            start = time.perf_counter()
+            self.reload_status["state"] = "loading"
+            try:
+                state = ModelState.load(model_dir or self.model_dir, self.requested_engine, verify=True)
+                self._validate_state(state)
+            except Exception as e:
+                self.reload_status.update(state="failed", last_error=f"{type(e).__name__}: {e}")
+                print(f"❌ Model reload failed, keeping version {self.get_model_info()['version']}: {e}")
+                return False
+
+            old = self._state
+            self._state = state
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            self.reload_status.update(state="idle", last_error=None, last_reload_ms=elapsed_ms,
+                                      reloads=self.reload_status["reloads"] + 1)
+            print(f"🔄 Model swapped: {old.version if old else None} -> {state.version} ({elapsed_ms} ms)")
+            if self.pool is not None:
+                # Workers keep serving nothing stale: until they catch up, big batches run in-process
+                self.pool.reload(state.model_dir)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _validate_state(self, state):
+        """Score a canary batch with the new snapshot before it goes live"""
+        if state.n_features != 41:
+            raise ValueError(f"Model expects {state.n_features} features, detector produces 41")
+        if state.canary is not None:
+            canary, expected = state.canary
+        else:
+            canary = np.random.default_rng(0).normal(size=(self.CANARY_ROWS, state.n_features))
+            canary[0] = 0
+            expected = state.model.predict_proba(canary)[:, 1] if state.compiled_model is not None else None
+        proba = self._local_proba(canary, state)
+        if proba.shape != (len(canary),) or not np.all(np.isfinite(proba)) \
+                or proba.min() < 0 or proba.max() > 1:
+            raise ValueError("Canary batch produced invalid probabilities")
+        if expected is not None:
+            drift = np.abs(expected - proba).max()
+            if drift > 1e-6:
+                raise ValueError(f"Canary probabilities drifted from the reference (max diff {drift:.2e})")
+
+    def get_model_info(self):
+        state = self._state
+        return {
+            "version": state.version if state else None,
+            "loaded_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state.loaded_at)) if state else None,
+            "engine": self.engine,
+            "source": ("bundle" if state.bundle else "pickle") if state else None,
+            "model_dir": state.model_dir if state else self.model_dir,
+            "reload": dict(self.reload_status),
+        }
+
     def update_rules(self, action, ip, rule_type):
-        """Update the rule sets dynamically"""
-        target_set = self.trusted_ips if rule_type == "whitelist" else self.blocked_ips
+        """Update the rule sets dynamically (ip may be an address or CIDR prefix)"""
+        rule_type = "whitelist" if rule_type == "whitelist" else "blacklist"
         
-        if action == "add":
-            target_set.add(ip)
-            # Ensure IP isn't in both lists
-            other_set = self.blocked_ips if rule_type == "whitelist" else self.trusted_ips
-            if ip in other_set:
-                other_set.remove(ip)
-            return True
-            
-        elif action == "remove":
-            if ip in target_set:
-                target_set.remove(ip)
+        try:
+            if action == "add":
+                # A prefix holds one verdict, so this also drops it from the other list
+                self.rules.add(ip, rule_type)
                 return True
+                
+            elif action == "remove":
+                return self.rules.remove(ip, rule_type)
+        except ValueError:
+            return False
         
         return False
 
     def get_rules(self):
-        return {
-            "whitelist": list(self.trusted_ips),
-            "blacklist": list(self.blocked_ips)
-        }
+        return self.rules.to_dict()
+
+    def import_feed(self, lines, merge=True):
+        """Stream a plain-text/CSV blocklist into the persistent feed store"""
+        # One import at a time: each merges into the store the previous one wrote
+        with self._feed_lock:
+            store, report = import_feed(lines, self.feed_path, merge=merge)
+            self.rules.feed = store
+        return report
+
+    def get_feed_info(self):
+        return self.rules.feed.summary() if self.rules.feed is not None else None
     
+    # Alert level boundaries for the vectorized path (must exceed a bound to move up a level)
+    _LEVELS = ('INFO', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+    _LEVEL_BOUNDS = np.array([0.2, 0.35, 0.5, 0.7])
+
     def get_alert_level(self, probability):
         """Determine alert level based on probability"""
         if probability > 0.7:
@@ -86,6 +355,105 @@ class CyberAI_Detector:
         else:
             return 'INFO'
     
+    def encode_features(self, connections):
+        """Raw connection(s) -> (n, 41) float64 rows with category codes (unscaled)"""
+        state = self._state
+        if state is not None:
+            return state.pipeline.encode(connections)
+        X = np.asarray(connections, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1) if X.size else X.reshape(0, 41)
+        return X
+
+    def _model_proba(self, X, state):
+        """X holds encoded raw rows; scaling happens here, right before the model"""
+        X = state.pipeline.standardize(X)
+        cascade = self._cascade_for(state)
+        if cascade is not None:
+            # Ambiguous rows go through the pool when there is one, else reuse the stage score locally
+            full = (lambda rows: self._full_proba(rows, state)) if self.pool is not None else None
+            return cascade.score(X, self.threshold, full)
+        return self._full_proba(X, state)
+
+    def _full_proba(self, X, state):
+        if self.pool is not None and len(X) >= self.POOL_MIN_BATCH:
+            return self.pool.predict(X, state, self._local_proba)
+        return self._local_proba(X, state)
+
+    def _cascade_for(self, state):
+        """The cascade for this snapshot (None when off or the model isn't compiled)"""
+        if self.cascade_config is None or state.compiled_model is None:
+            return None
+        owner, cascade = self._cascade
+        if owner is not state:
+            from cascade import CascadeScorer
+            cascade = CascadeScorer(state.compiled_model, **self.cascade_config)
+            self._cascade = (state, cascade)
+        return cascade
+
+    def _local_proba(self, X, state):
+        return state.attack_proba(X, self.COMPILED_MAX_BATCH)
+
+    def _attack_proba(self, X, state):
+        """Attack probability for each row of the 2-D feature array X (cache-aware)"""
+        if self.cache is None:
+            return self._model_proba(X, state)
+
+        generation = (state, self.threshold)
+        self.cache.sync(generation)
+        keys = self.cache.keys_for(X)
+        cached = self.cache.get_many(keys)
+        out = np.array([0.0 if p is None else p for p in cached])
+
+        missing = [i for i, p in enumerate(cached) if p is None]
+        if missing:
+            # Score each distinct uncached vector once
+            first = {}
+            for i in missing:
+                first.setdefault(keys[i], i)
+            self.cache.note_coalesced(len(missing) - len(first))
+            probs = self._model_proba(X[list(first.values())], state)
+            self.cache.put_many(first.keys(), probs.tolist(), generation)
+            scored = dict(zip(first.keys(), probs))
+            for i in missing:
+                out[i] = scored[keys[i]]
+        return out
+
+    def get_cascade_stats(self):
+        cascade = self._cascade[1]
+        return cascade.get_stats() if cascade is not None else None
+
+    def get_pool_stats(self):
+        return self.pool.get_stats() if self.pool is not None else None
+
+    def close(self):
+        """Shut down worker processes (no-op without a pool)"""
+        if self.pool is not None:
+            self.pool.close()
+
+    def get_cache_stats(self):
+        return self.cache.get_stats() if self.cache is not None else None
+
+    def _trusted_result(self, ip_address):
+        return {
+            'is_attack': False,
+            'attack_probability': 0.0,
+            'alert_level': 'INFO',
+            'emoji': '🛡️ Safe',
+            'message': f"RULE ENGINE: Allowed Trusted IP {ip_address}",
+            'recommendation': "Whitelisted - No action required"
+        }
+
+    def _blocked_result(self, ip_address):
+        return {
+            'is_attack': True,
+            'attack_probability': 1.0,
+            'alert_level': 'CRITICAL',
+            'emoji': '🚫 Blocked',
+            'message': f"RULE ENGINE: Blocked Malicious IP {ip_address}",
+            'recommendation': "Blacklisted - Auto-Blocked"
+        }
+
     def analyze(self, connection_features, ip_address=None):
         """
         Analyze a single connection using Hybrid Logic:
@@ -95,34 +463,22 @@ class CyberAI_Detector:
         
         # 1️⃣ RULE CHECK
         if ip_address:
+            verdict = self.rules.match(ip_address)
             # Check Whitelist
-            if ip_address in self.trusted_ips:
-                return {
-                    'is_attack': False,
-                    'attack_probability': 0.0,
-                    'alert_level': 'INFO',
-                    'emoji': '🛡️ Safe',
-                    'message': f"RULE ENGINE: Allowed Trusted IP {ip_address}",
-                    'recommendation': "Whitelisted - No action required"
-                }
+            if verdict == ALLOW:
+                return self._trusted_result(ip_address)
             
             # Check Blacklist
-            if ip_address in self.blocked_ips:
-                return {
-                    'is_attack': True,
-                    'attack_probability': 1.0,
-                    'alert_level': 'CRITICAL',
-                    'emoji': '🚫 Blocked',
-                    'message': f"RULE ENGINE: Blocked Malicious IP {ip_address}",
-                    'recommendation': "Blacklisted - Auto-Blocked"
-                }
+            if verdict == BLOCK:
+                return self._blocked_result(ip_address)
 
         # 2️⃣ AI ANALYSIS (Fallback)
-        if self.model is None:
+        state = self._state
+        if state is None:
             return {"error": "Model not loaded"}
         
         # Get prediction
-        probability = self.model.predict_proba([connection_features])[0][1]
+        probability = self._attack_proba(state.pipeline.encode(connection_features), state)[0]
         alert_level = self.get_alert_level(probability)
         
         # Determine if it's an attack (based on threshold)
@@ -139,27 +495,87 @@ class CyberAI_Detector:
         
         return result
     
-    def analyze_batch(self, connections_list):
-        """Analyze multiple connections at once"""
+    def analyze_batch(self, connections, ip_addresses=None):
+        """
+        Analyze multiple connections at once.
+
+        connections: N feature vectors ((N, 41) array, lists with category
+                     strings, or feature-name dicts)
+        ip_addresses: optional sequence of N source IPs (None/"" = no rule check)
+
+        Rules are applied as boolean masks and every row that no rule matches
+        is scored in a single predict_proba call. Per-row results are identical
+        to calling analyze() on each row.
+        """
+        X = self.encode_features(connections)
+        n = X.shape[0]
+
+        # 1️⃣ RULE MASKS
+        trusted_mask = np.zeros(n, dtype=bool)
+        blocked_mask = np.zeros(n, dtype=bool)
+        if ip_addresses is not None:
+            ips = list(ip_addresses)
+            if len(ips) != n:
+                raise ValueError(f"Expected {n} IP addresses, got {len(ips)}")
+            verdicts = self.rules.match_batch(ips)
+            trusted_mask = verdicts == ALLOW
+            blocked_mask = verdicts == BLOCK
+        else:
+            ips = [None] * n
+        model_mask = ~(trusted_mask | blocked_mask)
+
+        # 2️⃣ AI ANALYSIS (one model call for all rule-unmatched rows)
+        probabilities = np.zeros(n, dtype=np.float64)
+        probabilities[blocked_mask] = 1.0
+        model_idx = np.flatnonzero(model_mask)
+        state = self._state
+        model_ready = state is not None
+        if model_ready and model_idx.size:
+            probabilities[model_idx] = self._attack_proba(X[model_idx], state)
+
+        level_codes = np.searchsorted(self._LEVEL_BOUNDS, probabilities, side='left')
+        level_codes[trusted_mask] = 0
+        is_attack = (probabilities > self.threshold) | blocked_mask
+        is_attack[trusted_mask] = False
+        if not model_ready:
+            is_attack[model_mask] = False
+
+        levels = [self._LEVELS[c] for c in level_codes.tolist()]
+        recommendations = {lvl: self.get_recommendation(True, lvl) for lvl in self._LEVELS}
+
         results = []
-        for i, connection in enumerate(connections_list):
-            result = self.analyze(connection)
+        for i, (prob, level, attack) in enumerate(zip(probabilities.tolist(), levels, is_attack.tolist())):
+            if trusted_mask[i]:
+                result = self._trusted_result(ips[i])
+            elif blocked_mask[i]:
+                result = self._blocked_result(ips[i])
+            elif not model_ready:
+                result = {"error": "Model not loaded"}
+            else:
+                result = {
+                    'is_attack': attack,
+                    'attack_probability': prob,
+                    'alert_level': level,
+                    'emoji': self.alert_levels[level],
+                    'message': f"{self.alert_levels[level]} - {prob:.1%} attack confidence",
+                    'recommendation': recommendations[level]
+                }
             result['connection_id'] = i
             results.append(result)
-        
+
         # Summary
-        attacks = sum(1 for r in results if r['is_attack'])
-        total = len(results)
-        
+        attacks = int(np.count_nonzero(is_attack))
+        total = n
+
         summary = {
             'total_connections': total,
             'detected_attacks': attacks,
             'attack_rate': f"{attacks/total:.1%}" if total > 0 else "0%",
             'results': results
         }
-        
+
         return summary
-    
+
     def get_recommendation(self, is_attack, alert_level):
         """Get action recommendation based on threat level"""
         if alert_level == 'CRITICAL':
@@ -241,7 +657,7 @@ if result['is_attack']:
     print(f"ACTION: {result['recommendation']}")
     
 # 5. Or analyze multiple connections
-results = detector.analyze_batch([connection1, connection2, ...])
+results = detector.analyze_batch([connection1, connection2, ...], ip_addresses=[ip1, ip2, ...])
     """)
     
     print("\n" + "="*50)
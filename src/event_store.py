@@ -0,0 +1,353 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE = 'models/events.db'
+
+# One row per scored connection. Indexes carry the rowid, so (ts) and
+# (ip, ts) also order ties by id for keyset pagination.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL NOT NULL,
+    ip          TEXT NOT NULL,
+    dst         TEXT,
+    source      TEXT NOT NULL,
+    attack_type TEXT,
+    is_attack   INTEGER NOT NULL,
+    probability REAL,
+    alert_level TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_ip_ts ON events (ip, ts);
+"""
+COLUMNS = ("ts", "ip", "dst", "source", "attack_type", "is_attack", "probability", "alert_level")
+INSERT = f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def verdict_rows(results, ips, source, attack_type=None, dsts=None, ts=None):
+    """Store rows for one scored batch (attack_type is only kept on attacks)"""
+    ts = time.time() if ts is None else ts
+    dsts = dsts if dsts is not None else [None] * len(results)
+    return [(ts, ip, dst, source, attack_type if r.get('is_attack') else None, 1 if r.get('is_attack') else 0,
+             r.get('attack_probability'), r.get('alert_level'))
+            for r, ip, dst in zip(results, ips, dsts) if 'error' not in r]
+
+
+def encode_cursor(ts, row_id):
+    return f"{ts!r}:{row_id}"
+
+
+def decode_cursor(cursor):
+    """'<ts>:<id>' -> (ts, id); raises ValueError on anything else"""
+    ts, _, row_id = cursor.rpartition(':')
+    return float(ts), int(row_id)
+
+
+class EventStore:
+    """
+    🗄️ VERDICT EVENT STORE
+    ======================
+    Durable, append-only history of every scored connection in SQLite (WAL):
+    - append() only puts the batch on a bounded queue and never blocks the
+      caller; when the writer falls behind, whole batches are dropped and
+      counted instead of stalling detection
+    - one writer thread drains everything queued and commits it in a single
+      transaction (group commit), so the per-commit fsync is paid once per
+      thousands of rows, not once per row
+    - indexes on ts and (ip, ts) serve time-range and per-source queries;
+      readers use their own connections and never wait on the writer
+    - retention: rows older than `max_age` seconds and, past `max_bytes`,
+      the oldest rows are deleted by the writer; freed pages are reused, so
+      the file stops growing
+    Queries return newest first and page with an opaque (ts, id) cursor.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, queue_size=1000, max_commit_rows=50000,
+                 max_age=7 * 86400, max_bytes=1 << 30, prune_interval=60.0, synchronous="NORMAL"):
+        self.path = path
+        self.max_commit_rows = max_commit_rows
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.synchronous = synchronous
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._readers = threading.local()
+        self._queue = queue.Queue(maxsize=queue_size)     # batches of rows
+        self._lock = threading.Lock()
+        self._thread = None
+        self._next_prune = time.monotonic() + prune_interval
+
+        self.appended = 0
+        self.written = 0
+        self.dropped = 0
+        self.commits = 0
+        self.pruned = 0
+        self.errors = 0
+        self.commit_time = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL in WAL mode: commits skip the fsync (the checkpoint does it);
+        # a power cut can lose the last commits, never corrupt the file
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="event-store")
+                self._thread.start()
+        return self
+
+    def append(self, rows):
+        """Queue one batch of rows (tuples in COLUMNS order); never blocks"""
+        if not rows:
+            return True
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(rows)
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(rows)
+            return False
+        with self._lock:
+            self.appended += len(rows)
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                batches = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                batches = []
+            rows = sum(len(b) for b in batches)
+            # Group commit: take whatever else is already waiting
+            while batches and rows < self.max_commit_rows:
+                try:
+                    batch = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batches.append(batch)
+                rows += len(batch)
+            if batches:
+                self._commit(batches, rows)
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + self.prune_interval
+                try:
+                    self.prune()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Event store prune failed: {e}")
+
+    def _commit(self, batches, rows):
+        t0 = time.perf_counter()
+        try:
+            self._writer.execute("BEGIN")
+            for batch in batches:
+                self._writer.executemany(INSERT, batch)
+            self._writer.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            with self._lock:
+                self.errors += 1
+                self.dropped += rows
+            print(f"⚠️ Event store write failed: {e}")
+        else:
+            with self._lock:
+                self.written += rows
+                self.commits += 1
+                self.commit_time += time.perf_counter() - t0
+        finally:
+            for _ in batches:
+                self._queue.task_done()
+
+    def prune(self, now=None, chunk=50000):
+        """Apply retention (writer thread; also safe to call directly once flushed)"""
+        now = time.time() if now is None else now
+        deleted = 0
+        conn = self._writer
+        if self.max_age is not None:
+            # Short transactions so the writer gets back to appends between chunks
+            while True:
+                n = conn.execute("DELETE FROM events WHERE id IN (SELECT id FROM events WHERE ts < ? LIMIT ?)",
+                                 (now - self.max_age, chunk)).rowcount
+                deleted += n
+                if n < chunk:
+                    break
+        if self.max_bytes is not None:
+            used = self._used_bytes(conn)
+            if used > self.max_bytes:
+                total = conn.execute("SELECT count(*) FROM events").fetchone()[0]
+                # Drop the oldest share that brings the used pages 10% under the cap
+                excess = int(total * (1.0 - 0.9 * self.max_bytes / used))
+                while excess > 0:
+                    n = conn.execute("DELETE FROM events WHERE id IN (SELECT id FROM events ORDER BY id LIMIT ?)",
+                                     (min(chunk, excess),)).rowcount
+                    deleted += n
+                    excess -= n
+                    if not n:
+                        break
+        with self._lock:
+            self.pruned += deleted
+        return deleted
+
+    @staticmethod
+    def _used_bytes(conn):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * page_size
+
+    def _reader(self):
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._readers.conn = conn
+        return conn
+
+    def query(self, since=None, until=None, ip=None, attacks_only=False, limit=100, cursor=None):
+        """
+        Committed events, newest first. `since`/`until` are unix times,
+        `cursor` is the next_cursor of the previous page.
+        Returns {"events": [...], "next_cursor": str or None}.
+        """
+        where, args = [], []
+        if ip:
+            where.append("ip = ?")
+            args.append(ip)
+        if since is not None:
+            where.append("ts >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            args.append(until)
+        if attacks_only:
+            where.append("is_attack = 1")
+        if cursor:
+            where.append("(ts, id) < (?, ?)")
+            args += decode_cursor(cursor)
+        sql = (f"SELECT id, {', '.join(COLUMNS)} FROM events"
+               + (f" WHERE {' AND '.join(where)}" if where else "")
+               + " ORDER BY ts DESC, id DESC LIMIT ?")
+        rows = self._reader().execute(sql, args + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        events = [dict(row, is_attack=bool(row["is_attack"])) for row in rows]
+        return {"events": events,
+                "next_cursor": encode_cursor(rows[-1]["ts"], rows[-1]["id"]) if more else None}
+
+    def get_stats(self):
+        with self._lock:
+            stats = {
+                "path": self.path,
+                "appended": self.appended,
+                "written": self.written,
+                "dropped": self.dropped,
+                "commits": self.commits,
+                "rows_per_commit": round(self.written / self.commits, 1) if self.commits else 0.0,
+                "avg_commit_ms": round(self.commit_time / self.commits * 1000, 2) if self.commits else 0.0,
+                "pruned": self.pruned,
+                "errors": self.errors,
+                "queue_depth": self._queue.qsize(),
+            }
+        try:
+            stats["bytes"] = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal")
+                                 if os.path.exists(self.path + suffix))
+        except OSError:
+            stats["bytes"] = None
+        return stats
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    # 500k verdicts in 2048-row batches (the live pipeline's batch size),
+    # from 5k sources over a simulated day, appended as fast as possible
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp()
+    store = EventStore(os.path.join(directory, "events.db"), max_age=None, max_bytes=None).start()
+    sources = [f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(5000)]
+    total, batch_size = 500_000, 2048
+    t_start = 1_700_000_000.0
+    batches = []
+    for b in range(total // batch_size):
+        ts = t_start + b * 86400 / (total // batch_size)
+        results = [{"is_attack": rng.random() < 0.05, "attack_probability": rng.random(), "alert_level": "LOW"}
+                   for _ in range(batch_size)]
+        ips = [rng.choice(sources) for _ in range(batch_size)]
+        batches.append(verdict_rows(results, ips, "REAL", "DDoS", ts=ts))
+    rows = sum(len(b) for b in batches)
+
+    append_s = 0.0
+    t0 = time.perf_counter()
+    for batch in batches:
+        a = time.perf_counter()
+        store.append(batch)
+        append_s += time.perf_counter() - a
+    store.flush()
+    elapsed = time.perf_counter() - t0
+    stats = store.get_stats()
+    print(f"🗄️ {stats['written']} rows in {elapsed:.2f}s = {stats['written'] / elapsed:,.0f} inserts/s "
+          f"({stats['commits']} commits, {stats['rows_per_commit']:.0f} rows each, {stats['dropped']} dropped)")
+    print(f"   append() cost to the detection thread: {append_s / len(batches) * 1e6:.1f} µs per batch")
+
+    # Before: one commit per row (what a naive per-event INSERT does)
+    naive = sqlite3.connect(os.path.join(directory, "naive.db"), isolation_level=None)
+    naive.execute("PRAGMA journal_mode=WAL")
+    naive.executescript(SCHEMA)
+    sample = batches[0][:2000]
+    t0 = time.perf_counter()
+    for row in sample:
+        naive.execute(INSERT, row)
+    naive_rate = len(sample) / (time.perf_counter() - t0)
+    print(f"   one commit per row (synchronous=FULL): {naive_rate:,.0f} inserts/s")
+
+    # Queries against the 500k rows
+    def timed(label, **kwargs):
+        t = time.perf_counter()
+        page = store.query(**kwargs)
+        print(f"   {label:<34} {len(page['events']):>3} rows in {(time.perf_counter() - t) * 1000:6.2f} ms")
+        return page
+    timed("latest page", limit=100)
+    timed("one source, whole day", ip=sources[42], limit=100)
+    timed("one hour window", since=t_start + 12 * 3600, until=t_start + 13 * 3600, limit=100)
+    timed("attacks in one hour", since=t_start + 12 * 3600, until=t_start + 13 * 3600, attacks_only=True)
+    page, pages, seen, t = {"next_cursor": None}, 0, 0, time.perf_counter()
+    while True:
+        page = store.query(ip=sources[7], limit=50, cursor=page["next_cursor"])
+        pages += 1
+        seen += len(page["events"])
+        if not page["next_cursor"]:
+            break
+    print(f"   paged through one source: {seen} rows in {pages} pages, {(time.perf_counter() - t) * 1000:.1f} ms")
+
+    # Retention: keep the last 6 hours
+    store.max_age = 6 * 3600
+    t = time.perf_counter()
+    deleted = store.prune(now=t_start + 86400)
+    kept = store._reader().execute("SELECT count(*) FROM events").fetchone()[0]
+    print(f"   retention (6 h) removed {deleted} rows in {time.perf_counter() - t:.2f}s, kept {kept}")
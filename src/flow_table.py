@@ -0,0 +1,336 @@
+import time
+from collections import OrderedDict, deque
+
+from model_bundle import NSL_KDD_FEATURES
+
+# IP protocol numbers
+ICMP, TCP, UDP = 1, 6, 17
+PROTOCOL_NAMES = {ICMP: "icmp", TCP: "tcp", UDP: "udp"}
+
+# TCP header flag bits
+FIN, SYN, RST, PSH, ACK, URG = 0x01, 0x02, 0x04, 0x08, 0x10, 0x20
+
+# Responder port -> NSL-KDD service name (tcp unless noted)
+TCP_SERVICES = {
+    7: "echo", 9: "discard", 11: "systat", 13: "daytime", 15: "netstat", 20: "ftp_data", 21: "ftp",
+    22: "ssh", 23: "telnet", 25: "smtp", 37: "time", 42: "name", 43: "whois", 53: "domain",
+    57: "mtp", 70: "gopher", 71: "remote_job", 77: "rje", 79: "finger", 80: "http", 84: "ctf",
+    87: "link", 95: "supdup", 101: "hostnames", 102: "iso_tsap", 105: "csnet_ns", 109: "pop_2",
+    110: "pop_3", 111: "sunrpc", 113: "auth", 117: "uucp_path", 119: "nntp", 137: "netbios_ns",
+    138: "netbios_dgm", 139: "netbios_ssn", 143: "imap4", 150: "sql_net", 175: "vmnet", 179: "bgp",
+    194: "IRC", 210: "Z39_50", 389: "ldap", 433: "nnsp", 443: "http_443", 512: "exec",
+    513: "login", 514: "shell", 515: "printer", 520: "efs", 530: "courier", 540: "uucp",
+    543: "klogin", 544: "kshell", 2784: "http_2784", 5190: "aol", 6667: "IRC", 8001: "http_8001",
+}
+UDP_SERVICES = {53: "domain_u", 69: "tftp_u", 123: "ntp_u"}
+# ICMP type -> service
+ICMP_SERVICES = {0: "ecr_i", 3: "urp_i", 8: "eco_i", 13: "tim_i", 14: "tim_i", 17: "urh_i"}
+
+
+def service_name(proto, sport, dport):
+    """NSL-KDD service for a connection (for ICMP, sport carries the ICMP type)"""
+    if proto == TCP:
+        if 6000 <= dport <= 6063:
+            return "X11"
+        name = TCP_SERVICES.get(dport)
+    elif proto == UDP:
+        name = UDP_SERVICES.get(dport)
+    elif proto == ICMP:
+        return ICMP_SERVICES.get(sport, "oth_i")
+    else:
+        return "other"
+    if name is not None:
+        return name
+    # Unassigned ports: NSL-KDD calls high ports "private"
+    return "private" if dport >= 1024 else "other"
+
+
+class Flow:
+    """Running totals for one bidirectional connection (updated in O(1) per packet)"""
+
+    __slots__ = ("orig", "orig_port", "resp", "resp_port", "proto", "service", "start", "last",
+                 "src_bytes", "dst_bytes", "src_pkts", "dst_pkts", "urgent", "wrong_fragment",
+                 "orig_flags", "resp_flags", "syn_first")
+
+    def __init__(self, ts, src, sport, dst, dport, proto, tcp_flags):
+        self.orig, self.orig_port, self.resp, self.resp_port = src, sport, dst, dport
+        self.proto = proto
+        self.service = service_name(proto, sport, dport)
+        self.start = self.last = ts
+        self.src_bytes = self.dst_bytes = 0
+        self.src_pkts = self.dst_pkts = 0
+        self.urgent = self.wrong_fragment = 0
+        self.orig_flags = self.resp_flags = 0      # OR of every TCP flag each side sent
+        self.syn_first = bool(tcp_flags & SYN) and not tcp_flags & ACK
+
+    def tcp_flag(self):
+        """Bro/Zeek-style connection state, as used for the NSL-KDD 'flag' feature"""
+        o, r = self.orig_flags, self.resp_flags
+        if not self.syn_first:
+            return "OTH"
+        if not r & SYN:                  # responder never answered the SYN
+            if r & RST:
+                return "REJ"
+            if o & RST:
+                return "RSTOS0"
+            if o & FIN:
+                return "SH"
+            return "S0"
+        if o & RST:
+            return "RSTO"
+        if r & RST:
+            return "RSTR"
+        if o & FIN and r & FIN:
+            return "SF"
+        if o & FIN:
+            return "S2"
+        if r & FIN:
+            return "S3"
+        return "S1"
+
+    def features(self):
+        """NSL-KDD feature vector; the traffic (window) features stay 0 until TrafficWindows fills them"""
+        row = [0] * len(NSL_KDD_FEATURES)
+        row[0] = int(self.last - self.start)
+        row[1] = PROTOCOL_NAMES.get(self.proto, "other")
+        row[2] = self.service
+        row[3] = self.tcp_flag() if self.proto == TCP else "SF"
+        row[4] = self.src_bytes
+        row[5] = self.dst_bytes
+        row[6] = int(self.orig == self.resp and self.orig_port == self.resp_port)
+        row[7] = self.wrong_fragment
+        row[8] = self.urgent
+        return row
+
+    def record(self, reason):
+        return {
+            "ip": self.orig,
+            "dst": self.resp,
+            "sport": self.orig_port,
+            "dport": self.resp_port,
+            "proto": PROTOCOL_NAMES.get(self.proto, "other"),
+            "len": self.src_bytes + self.dst_bytes,
+            "packets": self.src_pkts + self.dst_pkts,
+            "start": self.start,
+            "end": self.last,
+            "reason": reason,
+            "features": self.features(),
+        }
+
+
+class FlowTable:
+    """
+    🌊 CONNECTION FLOW TABLE
+    ========================
+    Folds packets into bidirectional 5-tuple connections and emits one
+    NSL-KDD-shaped record per finished connection.
+    - TCP state (SYN/FIN/RST per side) becomes the 'flag' feature; flows end
+      on FIN from both sides or any RST, UDP/ICMP ones on idle timeout
+    - idle timeouts per protocol plus an active timeout for long flows
+    - at most `max_flows` live flows (least recently active one is evicted)
+    - per packet cost is O(1): one dict lookup, counter updates, and an
+      expiry check that only looks at the oldest flow of each protocol
+    - `windows` (a TrafficWindows) fills the count/srv_count/dst_host_*
+      features of each record as its connection finishes
+    - `shedder` (a LoadShedder) is asked before a new flow is opened; flows
+      it samples out are only counted
+    Finished records pile up in `completed` (bounded) until drain()ed.
+    """
+
+    def __init__(self, tcp_timeout=60.0, udp_timeout=10.0, icmp_timeout=5.0, active_timeout=300.0,
+                 linger=2.0, max_flows=100000, windows=None, shedder=None):
+        self.timeouts = {TCP: tcp_timeout, UDP: udp_timeout, ICMP: icmp_timeout}
+        self.default_timeout = udp_timeout
+        self.active_timeout = active_timeout
+        self.linger = linger
+        self.max_flows = max_flows
+        self.windows = windows
+        self.shedder = shedder
+
+        # One LRU per protocol, so each list is ordered by last activity
+        # against a single idle timeout and expiry only inspects the front
+        self._flows = {TCP: OrderedDict(), UDP: OrderedDict(), ICMP: OrderedDict(), 0: OrderedDict()}
+        # Recently closed TCP keys: stray ACKs/retransmits after FIN or RST are
+        # absorbed instead of opening bogus 'OTH' connections
+        self._closed = OrderedDict()
+        self.completed = deque(maxlen=max_flows)
+
+        self.packets = 0
+        self.late_packets = 0
+        self.emitted = 0
+        self.evicted = 0
+        self.expired = 0
+        self.dropped_records = 0
+
+    def __len__(self):
+        return sum(len(flows) for flows in self._flows.values())
+
+    def _table(self, proto):
+        return self._flows[proto] if proto in self._flows else self._flows[0]
+
+    def update(self, ts, src, dst, sport, dport, proto, payload_len, tcp_flags=0, wrong_fragment=0):
+        """
+        Account one packet. ports are 0 for portless protocols; for ICMP
+        pass the ICMP type as sport. payload_len is the transport payload.
+        """
+        self.packets += 1
+        table = self._table(proto)
+        if (src, sport) <= (dst, dport):
+            key = (proto, src, sport, dst, dport)
+        else:
+            key = (proto, dst, dport, src, sport)
+
+        flow = table.get(key)
+        if flow is not None and ts - flow.start > self.active_timeout:
+            self._finish(table, key, flow, "active_timeout")
+            flow = None
+
+        if flow is None:
+            if proto == TCP and key in self._closed:
+                if not (tcp_flags & SYN and not tcp_flags & ACK):
+                    self.late_packets += 1
+                    return
+                del self._closed[key]
+            if self.shedder is not None and not self.shedder.admit(ts, key, src, payload_len):
+                return
+            if len(self) >= self.max_flows:
+                self._evict_oldest()
+            flow = Flow(ts, src, sport, dst, dport, proto, tcp_flags)
+            table[key] = flow
+        else:
+            table.move_to_end(key)
+
+        flow.last = ts
+        if src == flow.orig and sport == flow.orig_port:
+            flow.src_bytes += payload_len
+            flow.src_pkts += 1
+            flow.orig_flags |= tcp_flags
+        else:
+            flow.dst_bytes += payload_len
+            flow.dst_pkts += 1
+            flow.resp_flags |= tcp_flags
+        if tcp_flags & URG:
+            flow.urgent += 1
+        if wrong_fragment:
+            flow.wrong_fragment += 1
+
+        if proto == TCP and (tcp_flags & RST or (flow.orig_flags & FIN and flow.resp_flags & FIN)):
+            self._finish(table, key, flow, "closed")
+            self._closed[key] = ts
+
+        self.expire(ts)
+
+    def expire(self, now=None):
+        """Emit flows idle past their protocol's timeout (cheap; call freely)"""
+        now = time.time() if now is None else now
+        for proto, table in self._flows.items():
+            timeout = self.timeouts.get(proto, self.default_timeout)
+            while table:
+                key, flow = next(iter(table.items()))
+                if now - flow.last <= timeout:
+                    break
+                self._finish(table, key, flow, "idle_timeout")
+                self.expired += 1
+        while self._closed:
+            key, closed_at = next(iter(self._closed.items()))
+            if now - closed_at <= self.linger and len(self._closed) <= self.max_flows:
+                break
+            del self._closed[key]
+
+    def _evict_oldest(self):
+        """Table full: finish the least recently active flow of any protocol"""
+        fronts = [(next(iter(t.values())).last, t) for t in self._flows.values() if t]
+        _, table = min(fronts, key=lambda item: item[0])
+        key, flow = next(iter(table.items()))
+        self._finish(table, key, flow, "evicted")
+        self.evicted += 1
+
+    def _finish(self, table, key, flow, reason):
+        del table[key]
+        if len(self.completed) == self.completed.maxlen:
+            self.dropped_records += 1
+        record = flow.record(reason)
+        if self.windows is not None:
+            self.windows.fill(record)
+        self.completed.append(record)
+        self.emitted += 1
+
+    def flush(self):
+        """Finish every live flow (end of capture / replay)"""
+        for table in self._flows.values():
+            while table:
+                key, flow = next(iter(table.items()))
+                self._finish(table, key, flow, "flush")
+
+    def drain(self):
+        """Hand over (and forget) every finished connection record"""
+        out = list(self.completed)
+        self.completed.clear()
+        return out
+
+    def get_stats(self):
+        return {
+            "active_flows": len(self),
+            "packets": self.packets,
+            "connections": self.emitted,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "late_packets": self.late_packets,
+            "dropped_records": self.dropped_records,
+            "windows": self.windows.get_stats() if self.windows is not None else None,
+            "shedding": self.shedder.get_stats() if self.shedder is not None else None,
+        }
+
+
+if __name__ == "__main__":
+    import random
+
+    from traffic_windows import TrafficWindows
+
+    # Synthetic mix at line rate: handshakes, SYN floods, rejected scans, DNS
+    rng = random.Random(0)
+    table = FlowTable(max_flows=50000, windows=TrafficWindows())
+    n_packets = 0
+    ts = 1000.0
+
+    def pkt(*args, **kwargs):
+        global n_packets
+        n_packets += 1
+        table.update(*args, **kwargs)
+
+    records = []
+    start = time.perf_counter()
+    for i in range(60000):
+        if i % 1000 == 0:
+            records += table.drain()
+        ts += 0.0005
+        client = f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        sport = rng.randint(1024, 65535)
+        kind = rng.random()
+        if kind < 0.5:       # full HTTP exchange
+            pkt(ts, client, "192.168.1.10", sport, 80, TCP, 0, SYN)
+            pkt(ts, "192.168.1.10", client, 80, sport, TCP, 0, SYN | ACK)
+            pkt(ts, client, "192.168.1.10", sport, 80, TCP, 300, ACK | PSH)
+            pkt(ts + 0.01, "192.168.1.10", client, 80, sport, TCP, 1500, ACK | PSH)
+            pkt(ts + 0.02, client, "192.168.1.10", sport, 80, TCP, 0, FIN | ACK)
+            pkt(ts + 0.02, "192.168.1.10", client, 80, sport, TCP, 0, FIN | ACK)
+            pkt(ts + 0.03, client, "192.168.1.10", sport, 80, TCP, 0, ACK)
+        elif kind < 0.8:     # SYN flood
+            pkt(ts, client, "192.168.1.10", sport, rng.randint(1, 65535), TCP, 0, SYN)
+        elif kind < 0.9:     # closed port
+            pkt(ts, client, "192.168.1.10", sport, 23, TCP, 0, SYN)
+            pkt(ts, "192.168.1.10", client, 23, sport, TCP, 0, RST | ACK)
+        else:                # DNS
+            pkt(ts, client, "8.8.8.8", sport, 53, UDP, 40)
+            pkt(ts + 0.001, "8.8.8.8", client, 53, sport, UDP, 120)
+    table.expire(ts + 120)
+    elapsed = time.perf_counter() - start
+
+    records += table.drain()
+    flags = {}
+    for r in records:
+        flags[r["features"][3]] = flags.get(r["features"][3], 0) + 1
+    print(f"🌊 {n_packets} packets -> {len(records)} connections in {elapsed:.2f}s "
+          f"({n_packets / elapsed:,.0f} packets/s, {elapsed / n_packets * 1e6:.2f} µs/packet)")
+    print(f"   flags: {flags}")
+    print(f"   stats: {table.get_stats()}")
@@ -0,0 +1,620 @@
+import bisect
+import csv
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+from rule_store import _split128, _Words128
+from rule_trie import parse_ip, parse_prefix
+
+# File layout (little-endian):
+#   header    : magic(4s) format(H) pad(H) n4(Q) n6(Q) locations_bytes(Q)
+#   IPv4      : starts uint32[n4], ends uint32[n4], location uint32[n4]   (each padded to 8 bytes)
+#   IPv6      : starts uint64[n6, 2], ends uint64[n6, 2], location uint32[n6]
+#   locations : JSON list of [country, region, city, lat, lon]
+# Ranges are sorted by start and inclusive, so one binary search answers a lookup.
+MAGIC = b'CYGI'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQQQ')
+
+DEFAULT_DATABASE = 'models/geoip.bin'
+
+UNKNOWN_LOCATION = {"country": "Unknown", "city": "Unknown", "lat": 0, "lon": 0}
+# lookup_many() result for addresses waiting on a remote lookup
+PENDING = "pending"
+
+
+def _parse_bound(text):
+    """'1.2.3.4', '2001:db8::' or an integer (IP2Location style) -> (version, key)"""
+    text = text.strip().strip('"')
+    if text.isdigit():
+        key = int(text)
+        return (4 if key < 1 << 32 else 6), key
+    parsed = parse_ip(text)
+    if parsed is None:
+        raise ValueError(f"Invalid IP address: {text!r}")
+    return parsed
+
+
+def iter_csv(lines):
+    """
+    Stream (version, start, end, (country, region, city, lat, lon)) out of a
+    range CSV. Accepted rows:
+      start,end,country,region,city,lat,lon
+      start,end,<code>,country,region,city,lat,lon   (DB-IP lite / IP2Location DB5)
+    start/end are addresses or integers. Headers and comments are skipped;
+    rows that don't parse yield None.
+    """
+    for row in csv.reader(lines):
+        if not row or row[0].startswith('#'):
+            continue
+        if not (row[0][:1].isdigit() or row[0][:1] in ':abcdefABCDEF') or len(row) not in (7, 8):
+            continue
+        try:
+            v_lo, start = _parse_bound(row[0])
+            v_hi, end = _parse_bound(row[1])
+            if v_lo != v_hi or start > end:
+                raise ValueError(row[:2])
+            country, region, city = row[-5:-2]
+            yield v_lo, start, end, (country, region, city, float(row[-2]), float(row[-1]))
+        except (ValueError, IndexError):
+            yield None
+
+
+def iter_mmdb(path):
+    """Same tuples from a MaxMind-format .mmdb (City layout); needs the optional maxminddb package"""
+    import ipaddress
+    import maxminddb
+
+    def name(entry):
+        return (entry or {}).get("names", {}).get("en", "")
+
+    with maxminddb.open_database(path) as reader:
+        for network, record in reader:
+            if not record:
+                continue
+            location = record.get("location") or {}
+            if "latitude" not in location:
+                continue
+            subdivisions = record.get("subdivisions") or [{}]
+            version = 6 if isinstance(network, ipaddress.IPv6Network) else 4
+            yield version, int(network.network_address), int(network.broadcast_address), (
+                name(record.get("country")), name(subdivisions[0]), name(record.get("city")),
+                location["latitude"], location["longitude"])
+
+
+class GeoDatabase:
+    """
+    🗺️ GEOIP RANGE DATABASE
+    =======================
+    IP ranges in sorted start/end arrays (one location index per range),
+    memory-mapped straight from a compiled file. A lookup is one binary
+    search; lookup_many() answers a whole batch of IPv4 addresses with a
+    single np.searchsorted call.
+    """
+
+    def __init__(self, v4_starts, v4_ends, v4_locs, v6_starts, v6_ends, v6_locs, locations, path=None):
+        self.v4_starts = v4_starts
+        self.v4_ends = v4_ends
+        self.v4_locs = v4_locs
+        self.v6_starts = v6_starts
+        self.v6_ends = v6_ends
+        self.v6_locs = v6_locs
+        self.locations = [{"country": c, "region": r, "city": city, "lat": lat, "lon": lon}
+                          for c, r, city, lat, lon in locations]
+        self.path = path
+
+    @classmethod
+    def open(cls, path=DEFAULT_DATABASE):
+        with open(path, 'rb') as f:
+            magic, fmt, _, n4, n6, loc_bytes = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a v{FORMAT_VERSION} GeoIP database")
+
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        offset = HEADER.size
+
+        def take(dtype, count, shape=None):
+            nonlocal offset
+            arr = mm[offset:offset + count * np.dtype(dtype).itemsize].view(dtype)
+            offset += arr.nbytes
+            offset += -offset % 8
+            return arr.reshape(shape) if shape else arr
+
+        v4 = take('<u4', n4), take('<u4', n4), take('<u4', n4)
+        v6 = take('<u8', 2 * n6, (n6, 2)), take('<u8', 2 * n6, (n6, 2)), take('<u4', n6)
+        locations = json.loads(bytes(mm[offset:offset + loc_bytes]).decode('utf-8'))
+        return cls(*v4, *v6, locations, path=path)
+
+    def save(self, path):
+        """Write atomically: running dashboards keep their old mapping until they reopen"""
+        rows = [[l["country"], l["region"], l["city"], l["lat"], l["lon"]] for l in self.locations]
+        blob = json.dumps(rows, separators=(',', ':')).encode('utf-8')
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.v4_starts), len(self.v6_starts), len(blob)))
+            for arr, dtype in ((self.v4_starts, '<u4'), (self.v4_ends, '<u4'), (self.v4_locs, '<u4'),
+                               (self.v6_starts, '<u8'), (self.v6_ends, '<u8'), (self.v6_locs, '<u4')):
+                f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+                f.write(b'\0' * (-f.tell() % 8))
+            f.write(blob)
+        os.replace(tmp, path)
+        self.path = path
+
+    @classmethod
+    def build(cls, ranges):
+        """Build a database from (version, start, end, location) tuples"""
+        v4_starts, v4_ends, v4_locs = array('I'), array('I'), array('I')
+        v6 = []
+        index = {}
+        invalid = 0
+        for item in ranges:
+            if item is None:
+                invalid += 1
+                continue
+            version, start, end, location = item
+            loc = index.setdefault(location, len(index))
+            if version == 4:
+                v4_starts.append(start)
+                v4_ends.append(end)
+                v4_locs.append(loc)
+            else:
+                v6.append((start, end, loc))
+
+        s4 = np.frombuffer(v4_starts, dtype=np.uint32)
+        order = np.argsort(s4, kind='stable')
+        v6.sort()
+        db = cls(s4[order], np.frombuffer(v4_ends, dtype=np.uint32)[order],
+                 np.frombuffer(v4_locs, dtype=np.uint32)[order],
+                 _split128([s for s, _, _ in v6]), _split128([e for _, e, _ in v6]),
+                 np.array([l for _, _, l in v6], dtype=np.uint32), list(index))
+        return db, {"parsed": len(s4) + len(v6), "invalid": invalid, "locations": len(index)}
+
+    def __len__(self):
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.v4_starts, self.v4_ends, self.v4_locs,
+                                      self.v6_starts, self.v6_ends, self.v6_locs))
+
+    def lookup_key(self, version, key):
+        if version == 4:
+            # A typed key: a Python int above 2**31 would make numpy cast the whole array
+            i = int(np.searchsorted(self.v4_starts, np.uint32(key), side='right')) - 1
+            if i >= 0 and key <= int(self.v4_ends[i]):
+                return self.locations[int(self.v4_locs[i])]
+            return None
+        i = bisect.bisect_right(_Words128(self.v6_starts), key) - 1
+        if i >= 0 and key <= _Words128(self.v6_ends)[i]:
+            return self.locations[int(self.v6_locs[i])]
+        return None
+
+    def lookup(self, ip):
+        """Location dict for an address, None if no range covers it"""
+        parsed = parse_ip(ip) if ip else None
+        return self.lookup_key(*parsed) if parsed else None
+
+    def lookup_many(self, ips):
+        """lookup() for a list of addresses; IPv4 is resolved in one vectorized search"""
+        out = [None] * len(ips)
+        v4_pos, v4_keys = [], []
+        for pos, ip in enumerate(ips):
+            parsed = parse_ip(ip) if ip else None
+            if parsed is None:
+                continue
+            if parsed[0] == 4:
+                v4_pos.append(pos)
+                v4_keys.append(parsed[1])
+            else:
+                out[pos] = self.lookup_key(*parsed)
+        if v4_keys and len(self.v4_starts):
+            keys = np.asarray(v4_keys, dtype=np.uint32)
+            i = np.searchsorted(self.v4_starts, keys, side='right') - 1
+            safe = np.maximum(i, 0)
+            hit = (i >= 0) & (keys <= self.v4_ends[safe])
+            locs = self.v4_locs[safe]
+            for pos, ok, loc in zip(v4_pos, hit.tolist(), locs.tolist()):
+                if ok:
+                    out[pos] = self.locations[loc]
+        return out
+
+    def summary(self):
+        return {
+            "path": self.path,
+            "ranges_v4": int(len(self.v4_starts)),
+            "ranges_v6": int(len(self.v6_starts)),
+            "locations": len(self.locations),
+            "bytes": int(self.nbytes),
+        }
+
+
+# Addresses no GeoIP source can place: private, loopback, link-local, CGNAT,
+# unique-local (RFC 1918, 6598, 3927, 4193, 4291)
+PRIVATE_PREFIXES = ("10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "127.0.0.0/8", "169.254.0.0/16",
+                    "100.64.0.0/10", "0.0.0.0/8", "::1/128", "::/128", "fc00::/7", "fe80::/10")
+
+
+def _prefix_ranges(prefixes):
+    ranges = {4: [], 6: []}
+    for text in prefixes:
+        version, key, plen = parse_prefix(text)
+        bits = 32 if version == 4 else 128
+        ranges[version].append((key, key | ((1 << (bits - plen)) - 1)))
+    return ranges
+
+
+_PRIVATE = _prefix_ranges(PRIVATE_PREFIXES)
+
+
+def is_private(ip):
+    """True for private/loopback/link-local addresses (IPv4 and IPv6), by integer range"""
+    parsed = parse_ip(ip) if ip else None
+    if parsed is None:
+        return False
+    version, key = parsed
+    if version == 6 and key >> 32 == 0xFFFF:     # IPv4-mapped ::ffff:a.b.c.d
+        version, key = 4, key & 0xFFFFFFFF
+    return any(start <= key <= end for start, end in _PRIVATE[version])
+
+
+def _ip_api_location(data):
+    return {
+        "country": data.get('country', 'Unknown'),
+        "region": data.get('regionName', ''),
+        "city": data.get('city', 'Unknown'),
+        "isp": data.get('isp', 'Unknown ISP'),
+        "lat": data.get('lat', 0),
+        "lon": data.get('lon', 0)
+    }
+
+
+class GeoIP:
+    """
+    🌍 GEOIP ENGINE
+    ===============
+    Resolves addresses without leaving the caller's thread:
+    - a bounded LRU (`cache_size` entries) in front of the local range
+      database; private ranges are never looked up
+    - with remote=True, addresses the database doesn't cover go to
+      ip-api.com's batch endpoint on a pool of `remote_workers` threads
+      (bounded queue, up to `remote_batch` addresses per request, requests
+      spaced `remote_interval` s apart to respect the provider limit)
+    - concurrent lookups of the same address share one remote request;
+      every caller's `on_resolved(ip, location)` runs when it finishes
+    - failed addresses are remembered for `negative_ttl` seconds and not
+      retried before that
+    """
+
+    def __init__(self, database=None, cache_size=50000, remote=False, remote_queue=1000,
+                 remote_timeout=2.0, remote_workers=2, remote_batch=100, remote_interval=4.0,
+                 negative_ttl=300.0, url="http://ip-api.com/batch"):
+        self.database = database
+        self.cache_size = cache_size
+        self.remote = remote
+        self.remote_timeout = remote_timeout
+        self.remote_workers = remote_workers
+        self.remote_batch = remote_batch
+        self.remote_interval = remote_interval
+        self.negative_ttl = negative_ttl
+        self.url = url
+        self._cache = OrderedDict()          # ip -> location
+        self._failed = OrderedDict()         # ip -> retry after (monotonic)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=remote_queue)
+        self._waiters = {}                   # ip -> callbacks of everyone waiting on its request
+        self._threads = []
+        self._next_request = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.database_hits = 0
+        self.private = 0
+        self.evictions = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.remote_queued = 0
+        self.remote_dropped = 0
+        self.remote_requests = 0
+        self.remote_resolved = 0
+        self.remote_failed = 0
+
+    def _store(self, ip, location):
+        # Caller holds the lock
+        self._cache[ip] = location
+        self._cache.move_to_end(ip)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, ip, on_resolved=None):
+        """Location dict, PENDING while a remote lookup runs, or None when unknown"""
+        return self.lookup_many([ip], on_resolved)[0]
+
+    def lookup_many(self, ips, on_resolved=None):
+        """
+        Locations for a batch (None where unknown). Addresses sent to the
+        remote fallback come back as PENDING and call
+        on_resolved(ip, location_or_None) once their request finishes.
+        """
+        out = [None] * len(ips)
+        missing = []
+        with self._lock:
+            for pos, ip in enumerate(ips):
+                location = self._cache.get(ip)
+                if location is None:
+                    self.misses += 1
+                    missing.append(pos)
+                else:
+                    self._cache.move_to_end(ip)
+                    self.hits += 1
+                    out[pos] = location
+        if not missing:
+            return out
+
+        public = [pos for pos in missing if not is_private(ips[pos])]
+        found = self.database.lookup_many([ips[pos] for pos in public]) if self.database else [None] * len(public)
+        unresolved = {}
+        with self._lock:
+            self.private += len(missing) - len(public)
+            for pos, location in zip(public, found):
+                if location is not None:
+                    self.database_hits += 1
+                    self._store(ips[pos], location)
+                    out[pos] = location
+                else:
+                    unresolved.setdefault(ips[pos], []).append(pos)
+        if self.remote:
+            for ip, positions in unresolved.items():
+                if self._request(ip, on_resolved):
+                    for pos in positions:
+                        out[pos] = PENDING
+        return out
+
+    def _request(self, ip, on_resolved):
+        """Queue (or join) a remote lookup; False when the address is not looked up"""
+        with self._lock:
+            retry_after = self._failed.get(ip)
+            if retry_after is not None:
+                if retry_after > time.monotonic():
+                    self.negative_hits += 1
+                    return False
+                del self._failed[ip]
+            waiters = self._waiters.get(ip)
+            if waiters is not None:
+                self.coalesced += 1
+                if on_resolved is not None:
+                    waiters.append(on_resolved)
+                return True
+            try:
+                self._queue.put_nowait(ip)
+            except queue.Full:
+                self.remote_dropped += 1
+                return False
+            self._waiters[ip] = [on_resolved] if on_resolved is not None else []
+            self.remote_queued += 1
+            if not self._threads:
+                for i in range(self.remote_workers):
+                    thread = threading.Thread(target=self._remote_worker, daemon=True, name=f"geoip-remote-{i}")
+                    thread.start()
+                    self._threads.append(thread)
+            return True
+
+    def _remote_worker(self):
+        import requests
+        session = requests.Session()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.remote_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                now = time.monotonic()
+                wait = self._next_request - now
+                self._next_request = max(now, self._next_request) + self.remote_interval
+                self.remote_requests += 1
+            if wait > 0:
+                time.sleep(wait)
+
+            results = {}
+            try:
+                response = session.post(self.url, json=[{"query": ip} for ip in batch], timeout=self.remote_timeout)
+                if response.status_code == 200:
+                    for data in response.json():
+                        if data.get('status') == 'success':
+                            results[data.get('query')] = _ip_api_location(data)
+                else:
+                    print(f"⚠️ GeoIP Error: HTTP {response.status_code}")
+            except Exception as e:
+                print(f"⚠️ GeoIP Error: {e}")
+            self._finish(batch, results)
+
+    def _finish(self, batch, results):
+        expires = time.monotonic() + self.negative_ttl
+        callbacks = []
+        with self._lock:
+            for ip in batch:
+                location = results.get(ip)
+                if location is not None:
+                    self.remote_resolved += 1
+                    self._store(ip, location)
+                else:
+                    self.remote_failed += 1
+                    self._failed[ip] = expires
+                    self._failed.move_to_end(ip)
+                    if len(self._failed) > self.cache_size:
+                        self._failed.popitem(last=False)
+                callbacks += [(callback, ip, location) for callback in self._waiters.pop(ip, ())]
+        for callback, ip, location in callbacks:
+            try:
+                callback(ip, location)
+            except Exception as e:
+                print(f"⚠️ GeoIP callback error: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "database": self.database.summary() if self.database else None,
+                "cache_entries": len(self._cache),
+                "cache_size": self.cache_size,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "database_hits": self.database_hits,
+                "private": self.private,
+                "evictions": self.evictions,
+                "remote": self.remote,
+                "remote_pending": len(self._waiters),
+                "remote_queued": self.remote_queued,
+                "remote_coalesced": self.coalesced,
+                "remote_dropped": self.remote_dropped,
+                "remote_requests": self.remote_requests,
+                "remote_resolved": self.remote_resolved,
+                "remote_failed": self.remote_failed,
+                "negative_entries": len(self._failed),
+                "negative_hits": self.negative_hits,
+            }
+
+
+def import_database(source, path=DEFAULT_DATABASE, mmdb=False):
+    """Compile a range CSV (or .mmdb) into the database file at `path`; returns timing/size stats"""
+    start = time.perf_counter()
+    if mmdb:
+        db, counts = GeoDatabase.build(iter_mmdb(source))
+    else:
+        with open(source, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            db, counts = GeoDatabase.build(iter_csv(f))
+    built_at = time.perf_counter()
+    db.save(path)
+    saved_at = time.perf_counter()
+    reloaded = GeoDatabase.open(path)
+    return reloaded, {
+        **counts,
+        "ranges": len(reloaded),
+        "file_bytes": os.path.getsize(path),
+        "import_s": round(built_at - start, 3),
+        "write_s": round(saved_at - built_at, 3),
+        "reload_ms": round((time.perf_counter() - saved_at) * 1000, 3),
+    }
+
+
+def _synthetic_database(n_ranges, seed=0):
+    """Contiguous IPv4 ranges covering the whole space, cycling through 5k locations"""
+    rng = np.random.default_rng(seed)
+    bounds = np.unique(rng.integers(1, 1 << 32, n_ranges - 1, dtype=np.uint64))
+    starts = np.concatenate([[0], bounds]).astype(np.uint32)
+    ends = np.concatenate([bounds - 1, [(1 << 32) - 1]]).astype(np.uint32)
+    locs = (np.arange(len(starts)) % 5000).astype(np.uint32)
+    locations = [("Country %d" % (i % 200), "Region %d" % (i % 1000), "City %d" % i,
+                  float(rng.uniform(-60, 70)), float(rng.uniform(-180, 180))) for i in range(5000)]
+    empty = np.empty((0, 2), dtype=np.uint64)
+    return GeoDatabase(starts, ends, locs, empty, empty, np.empty(0, dtype=np.uint32), locations)
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="CyberAI offline GeoIP database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="compile a range CSV (DB-IP lite, IP2Location DB5, ...) or .mmdb")
+    imp.add_argument("source")
+    imp.add_argument("--mmdb", action="store_true", help="source is a MaxMind-format .mmdb (needs maxminddb)")
+    imp.add_argument("--db", default=DEFAULT_DATABASE)
+    info = sub.add_parser("info", help="show database size and resolve addresses")
+    info.add_argument("--db", default=DEFAULT_DATABASE)
+    info.add_argument("--lookup", nargs="*", default=[], help="IPs to resolve")
+    bench = sub.add_parser("bench", help="lookup throughput on a synthetic database")
+    bench.add_argument("--ranges", type=int, default=3_000_000)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        db, report = import_database(args.source, args.db, mmdb=args.mmdb)
+        print(f"📥 {args.source}: {report}")
+        print(f"✅ Database ready: {db.summary()}")
+    elif args.command == "info":
+        start = time.perf_counter()
+        db = GeoDatabase.open(args.db)
+        print(f"🗺️ {db.summary()} (opened in {(time.perf_counter() - start) * 1000:.3f} ms)")
+        for ip in args.lookup:
+            print(f"   {ip}: {db.lookup(ip) or 'not covered'}")
+    else:
+        path = os.path.join(tempfile.gettempdir(), "cyberai_geoip_bench.bin")
+        _synthetic_database(args.ranges).save(path)
+        start = time.perf_counter()
+        db = GeoDatabase.open(path)
+        print(f"🗺️ {db.summary()} (opened in {(time.perf_counter() - start) * 1000:.3f} ms)")
+
+        rng = random.Random(0)
+        ips = [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+               for _ in range(100000)]
+        start = time.perf_counter()
+        single = [db.lookup(ip) for ip in ips]
+        single_s = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = db.lookup_many(ips)
+        batch_s = time.perf_counter() - start
+        assert single == batch
+        print(f"   lookup():      {single_s / len(ips) * 1e6:6.2f} µs/IP ({len(ips) / single_s:>10,.0f}/s)")
+        print(f"   lookup_many(): {batch_s / len(ips) * 1e6:6.2f} µs/IP ({len(ips) / batch_s:>10,.0f}/s)")
+
+        # Flood-like traffic: a few hot sources behind the LRU
+        engine = GeoIP(db, cache_size=50000)
+        hot = [rng.choice(ips[:2000]) for _ in range(100000)]
+        start = time.perf_counter()
+        for ip in hot:
+            engine.lookup(ip)
+        cached_s = time.perf_counter() - start
+        print(f"   GeoIP.lookup() on repeated sources: {cached_s / len(hot) * 1e6:.2f} µs/IP, "
+              f"hit rate {engine.get_stats()['hit_rate']:.1%}")
+        print("   (ip-api.com: one blocking HTTP round trip per uncached IP, 45 requests/min limit)")
+        os.remove(path)
+
+        # Remote fallback against a local stand-in for the batch endpoint
+        # (200 ms per request): a flood of repeated public sources
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class StandIn(BaseHTTPRequestHandler):
+            def do_POST(self):
+                queries = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(0.2)
+                body = json.dumps([{"status": "fail", "query": q["query"]} if q["query"].endswith(".0") else
+                                   {"status": "success", "query": q["query"], "country": "Testland",
+                                    "city": "Test City", "lat": 0, "lon": 0} for q in queries]).encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        engine = GeoIP(None, remote=True, remote_interval=0.0, url=f"http://127.0.0.1:{server.server_port}/batch")
+        sources = [f"198.51.{rng.randint(0, 1)}.{rng.randint(0, 255)}" for _ in range(20000)]
+        resolved = []
+        start = time.perf_counter()
+        for ip in sources:
+            engine.lookup(ip, on_resolved=lambda ip, location: resolved.append(ip))
+        caller_s = time.perf_counter() - start
+        while engine.get_stats()["remote_pending"]:
+            time.sleep(0.01)
+        settle_s = time.perf_counter() - start
+        for ip in sources:
+            engine.lookup(ip)
+        stats = engine.get_stats()
+        print(f"   remote fallback: {len(sources)} lookups ({len(set(sources))} addresses) answered in "
+              f"{caller_s / len(sources) * 1e6:.1f} µs each; {stats['remote_requests']} batch requests, "
+              f"{stats['remote_coalesced']} coalesced, all settled after {settle_s:.2f}s")
+        print(f"   failures cached: {stats['negative_entries']} addresses, {stats['negative_hits']} retries skipped")
+        server.shutdown()
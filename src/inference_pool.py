@@ -0,0 +1,304 @@
+import atexit
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+
+def _worker_main(conn, model_dir, engine, in_name, out_name, max_rows, n_features, compiled_max_batch):
+    """Worker process: load the model once, then score rows from shared memory"""
+    from detector import ModelState
+
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    X_buf = np.ndarray((max_rows, n_features), dtype=np.float64, buffer=in_shm.buf)
+    out_buf = np.ndarray((max_rows,), dtype=np.float64, buffer=out_shm.buf)
+    try:
+        state = ModelState.load(model_dir, engine)
+        conn.send(("ready", state.version))
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            if msg[0] == "score":
+                n = msg[1]
+                out_buf[:n] = state.attack_proba(X_buf[:n], compiled_max_batch)
+                conn.send(("done", n))
+            elif msg[0] == "reload":
+                state = ModelState.load(msg[1], engine)
+                conn.send(("ready", state.version))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del X_buf, out_buf
+        in_shm.close()
+        out_shm.close()
+
+
+class _Slot:
+    """One worker process plus its private input/output shared-memory blocks"""
+
+    def __init__(self, index, max_rows, n_features):
+        self.index = index
+        self.in_shm = shared_memory.SharedMemory(create=True, size=max_rows * n_features * 8)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=max_rows * 8)
+        self.X = np.ndarray((max_rows, n_features), dtype=np.float64, buffer=self.in_shm.buf)
+        self.out = np.ndarray((max_rows,), dtype=np.float64, buffer=self.out_shm.buf)
+        self.process = None
+        self.conn = None
+        self.version = None             # model version once the worker reports ready
+
+    def release(self):
+        del self.X, self.out
+        for shm in (self.in_shm, self.out_shm):
+            shm.close()
+            shm.unlink()
+
+
+class ProcessPoolBackend:
+    """
+    🧮 PROCESS-POOL INFERENCE BACKEND
+    =================================
+    Fans large batches out to worker processes so scoring uses every core
+    instead of one GIL-bound thread.
+    - each worker loads the model once (memory-mapped when a bundle exists,
+      so the tree arrays are shared between workers through the page cache)
+    - rows travel through per-worker shared-memory buffers, not pickles
+    - a worker that dies, or doesn't answer within `score_timeout` seconds,
+      is killed and restarted in the background; its rows (and any rows no
+      ready worker can take) are scored in-process instead
+    - workers only score for the model version the caller is on; after a
+      hot reload call reload() and the pool catches up in the background
+    """
+
+    def __init__(self, model_dir='models', workers=None, engine="compiled", n_features=41,
+                 max_rows=4096, compiled_max_batch=512, start_timeout=60.0, score_timeout=5.0):
+        self.model_dir = model_dir
+        self.score_timeout = score_timeout
+        self.engine = engine
+        self.n_features = n_features
+        self.max_rows = max_rows
+        self.compiled_max_batch = compiled_max_batch
+        self.workers = workers or os.cpu_count() or 1
+        # spawn works everywhere (incl. Windows) and never forks Flask's threads
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.batches = 0
+        self.rows = 0
+        self.fallback_rows = 0
+        self.restarts = 0
+        self.timeouts = 0
+
+        self._slots = [_Slot(i, max_rows, n_features) for i in range(self.workers)]
+        for slot in self._slots:
+            self._spawn(slot)
+        atexit.register(self.close)
+        self._wait_ready(start_timeout)
+        print(f"🧮 Inference pool ready: {self.ready_workers()}/{self.workers} worker processes")
+
+    def _spawn(self, slot):
+        parent, child = self._ctx.Pipe()
+        slot.process = self._ctx.Process(
+            target=_worker_main, daemon=True, name=f"cyberai-infer-{slot.index}",
+            args=(child, self.model_dir, self.engine, slot.in_shm.name, slot.out_shm.name,
+                  self.max_rows, self.n_features, self.compiled_max_batch))
+        slot.process.start()
+        child.close()
+        slot.conn = parent
+        slot.version = None
+
+    def _wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.ready_workers() < self.workers:
+            with self._lock:
+                self._poll_ready()
+            time.sleep(0.01)
+
+    def _poll_ready(self):
+        """Pick up 'ready' messages without blocking; restart dead workers"""
+        for slot in self._slots:
+            if not slot.process.is_alive():
+                self._restart(slot)
+            elif slot.version is None and slot.conn.poll():
+                try:
+                    _, slot.version = slot.conn.recv()
+                except (EOFError, OSError):
+                    self._restart(slot)
+
+    def _restart(self, slot, reason=None):
+        if self._closed:
+            return
+        slot.conn.close()
+        if slot.process.is_alive():
+            slot.process.kill()
+        slot.process.join(timeout=1)
+        self.restarts += 1
+        reason = reason or f"died (exit {slot.process.exitcode})"
+        print(f"⚠️  Inference worker {slot.index} {reason}, restarting")
+        self._spawn(slot)
+
+    def ready_workers(self, version=None):
+        return sum(1 for s in self._slots
+                   if s.version is not None and (version is None or s.version == version))
+
+    def predict(self, X, state, fallback):
+        """
+        Attack probability per row of X for model snapshot `state`. Rows that
+        no ready worker on the same version can take go to fallback(X, state).
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        n = len(X)
+        out = np.empty(n, dtype=np.float64)
+        with self._lock:
+            if self._closed:
+                return fallback(X, state)
+            self._poll_ready()
+            slots = [s for s in self._slots if s.version is not None and s.version == state.version]
+            if not slots:
+                self.fallback_rows += n
+                return fallback(X, state)
+
+            # Even split across workers, in rounds of at most max_rows each
+            chunk = min(self.max_rows, -(-n // len(slots)))
+            pending = [(i, min(i + chunk, n)) for i in range(0, n, chunk)]
+            failed = []
+            while pending:
+                busy = {}
+                for slot in slots:
+                    if not pending:
+                        break
+                    lo, hi = pending.pop(0)
+                    slot.X[:hi - lo] = X[lo:hi]
+                    try:
+                        slot.conn.send(("score", hi - lo))
+                    except (BrokenPipeError, OSError):
+                        failed.append((lo, hi))
+                        continue
+                    busy[slot] = (lo, hi)
+                for slot, (lo, hi) in busy.items():
+                    if self._collect(slot):
+                        out[lo:hi] = slot.out[:hi - lo]
+                    else:
+                        failed.append((lo, hi))
+                slots = [s for s in slots if s.version == state.version]
+                if not slots:
+                    failed.extend(pending)
+                    pending = []
+
+            for lo, hi in failed:
+                out[lo:hi] = fallback(X[lo:hi], state)
+                self.fallback_rows += hi - lo
+            self.batches += 1
+            self.rows += n
+        return out
+
+    def _collect(self, slot):
+        """Wait for one worker's reply; restart it if it died or hung mid-batch"""
+        ready = wait([slot.conn, slot.process.sentinel], timeout=self.score_timeout)
+        if not ready:
+            # Alive but wedged: never hold every scorer hostage to it
+            self.timeouts += 1
+            self._restart(slot, f"gave no answer in {self.score_timeout:.1f}s")
+            return False
+        if slot.conn in ready:
+            try:
+                slot.conn.recv()
+                return True
+            except (EOFError, OSError):
+                pass
+        self._restart(slot)
+        return False
+
+    def reload(self, model_dir=None):
+        """Ask every worker to load the model in model_dir (blocks until they answer)"""
+        if model_dir:
+            self.model_dir = model_dir
+        with self._lock:
+            for slot in self._slots:
+                if slot.version is None:
+                    # Still starting: restart so it loads the new files
+                    slot.process.terminate()
+                    continue
+                try:
+                    slot.conn.send(("reload", self.model_dir))
+                    slot.version = None
+                except (BrokenPipeError, OSError):
+                    pass
+            self._poll_ready()
+        self._wait_ready(60.0)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for slot in self._slots:
+                try:
+                    slot.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for slot in self._slots:
+                slot.process.join(timeout=2)
+                if slot.process.is_alive():
+                    slot.process.terminate()
+                    slot.process.join()
+                slot.conn.close()
+                slot.release()
+
+    def get_stats(self):
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for s in self._slots if s.process.is_alive()),
+            "ready": self.ready_workers(),
+            "versions": sorted({s.version for s in self._slots if s.version is not None}),
+            "batches": self.batches,
+            "rows": self.rows,
+            "fallback_rows": self.fallback_rows,
+            "restarts": self.restarts,
+            "timeouts": self.timeouts,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    from detector import ModelState
+
+    parser = argparse.ArgumentParser(description="In-process vs process-pool scoring throughput")
+    parser.add_argument("--models", default="models")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    state = ModelState.load(args.models)
+    local = lambda X, s: s.attack_proba(X, 512)
+    X = np.random.default_rng(0).normal(size=(args.rows, state.n_features))
+
+    start = time.perf_counter()
+    expected = local(X, state)
+    base = time.perf_counter() - start
+    print(f"⚡ {os.cpu_count()} CPUs, {args.rows} rows")
+    print(f"   in-process   {args.rows / base:10.0f} rows/s")
+
+    for workers in sorted(set(args.workers)):
+        pool = ProcessPoolBackend(args.models, workers=workers)
+        pool.predict(X[:1000], state, local)                          # warm up
+        start = time.perf_counter()
+        proba = pool.predict(X, state, local)
+        elapsed = time.perf_counter() - start
+        print(f"   {workers:2d} workers   {args.rows / elapsed:10.0f} rows/s "
+              f"({base / elapsed:4.2f}x) | max diff {np.abs(proba - expected).max():.1e}")
+
+        # Crash recovery: kill a worker mid-stream, results must stay exact
+        pool._slots[0].process.kill()
+        proba = pool.predict(X[:20000], state, local)
+        assert np.array_equal(proba, expected[:20000])
+        pool._wait_ready(60.0)
+        print(f"      after a worker crash: exact, restarts={pool.get_stats()['restarts']}, "
+              f"ready={pool.ready_workers()}/{workers}")
+        pool.close()
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from tree_engine import CompiledEnsemble
+
+BUNDLE_FORMAT = 1
+DEFAULT_BUNDLE = 'models/bundle'
+
+# Column order the model is trained on (src/train.py)
+NSL_KDD_FEATURES = [
+    'duration', 'protocol_type', 'service', 'flag', 'src_bytes',
+    'dst_bytes', 'land', 'wrong_fragment', 'urgent', 'hot',
+    'num_failed_logins', 'logged_in', 'num_compromised', 'root_shell',
+    'su_attempted', 'num_root', 'num_file_creations', 'num_shells',
+    'num_access_files', 'num_outbound_cmds', 'is_host_login',
+    'is_guest_login', 'count', 'srv_count', 'serror_rate',
+    'srv_serror_rate', 'rerror_rate', 'srv_rerror_rate', 'same_srv_rate',
+    'diff_srv_rate', 'srv_diff_host_rate', 'dst_host_count',
+    'dst_host_srv_count', 'dst_host_same_srv_rate',
+    'dst_host_diff_srv_rate', 'dst_host_same_src_port_rate',
+    'dst_host_srv_diff_host_rate', 'dst_host_serror_rate',
+    'dst_host_srv_serror_rate', 'dst_host_rerror_rate',
+    'dst_host_srv_rerror_rate'
+]
+
+# Bundle layout:
+#   manifest.json          version, schema, metadata, file checksums
+#   compiled/*.npy         flat tree arrays (memory-mapped read-only)
+#   scaler_mean.npy        StandardScaler mean_
+#   scaler_scale.npy       StandardScaler scale_
+#   canary_X.npy           rows scored at build time ...
+#   canary_proba.npy       ... and their expected attack probabilities
+#   model.joblib           original sklearn ensemble (only loaded on demand)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_bundle(model, scaler, encoders, feature_names=None, out_dir=DEFAULT_BUNDLE, metadata=None):
+    """Write a versioned bundle next to the pickles; returns its manifest"""
+    import joblib
+    import sklearn
+    from tree_engine import compile_model
+
+    feature_names = list(feature_names if feature_names is not None else NSL_KDD_FEATURES)
+    tmp = f"{out_dir}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    compiled = compile_model(model)
+    compiled.save(os.path.join(tmp, 'compiled'))
+    np.save(os.path.join(tmp, 'scaler_mean.npy'), np.asarray(scaler.mean_, dtype=np.float64))
+    np.save(os.path.join(tmp, 'scaler_scale.npy'), np.asarray(scaler.scale_, dtype=np.float64))
+
+    canary = np.random.default_rng(0).normal(size=(32, len(feature_names)))
+    canary[0] = 0
+    np.save(os.path.join(tmp, 'canary_X.npy'), canary)
+    np.save(os.path.join(tmp, 'canary_proba.npy'), model.predict_proba(canary)[:, 1])
+    joblib.dump(model, os.path.join(tmp, 'model.joblib'))
+
+    files = {}
+    for root, _, names in os.walk(tmp):
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            files[os.path.relpath(full, tmp).replace(os.sep, '/')] = _sha256(full)
+    content_hash = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+
+    manifest = {
+        "bundle_format": BUNDLE_FORMAT,
+        "version": f"{time.strftime('%Y%m%d-%H%M%S')}-{content_hash[:8]}",
+        "created_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "model": {
+            "type": type(model).__name__,
+            "members": [kind for kind, _, _ in compiled.members],
+            "n_trees": compiled.n_trees,
+        },
+        "schema": {
+            "features": feature_names,
+            "categorical": {col: [str(c) for c in enc.classes_] for col, enc in encoders.items()},
+        },
+        "metadata": {
+            "sklearn_version": sklearn.__version__,
+            "numpy_version": np.__version__,
+            **(metadata or {}),
+        },
+        "files": files,
+    }
+    with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap directories so readers never see a half-written bundle
+    old = f"{out_dir}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old)
+    os.replace(tmp, out_dir)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+class ModelBundle:
+    """
+    📦 VERSIONED MODEL BUNDLE
+    =========================
+    Loads a bundle written by save_bundle(). Large arrays are memory-mapped
+    read-only, so opening is cheap and worker processes share the pages.
+    sklearn is never imported unless the original model is requested.
+    """
+
+    def __init__(self, path, manifest, compiled, scaler_mean, scaler_scale, canary_X, canary_proba):
+        self.path = path
+        self.manifest = manifest
+        self.compiled = compiled
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.canary_X = canary_X
+        self.canary_proba = canary_proba
+
+    @staticmethod
+    def exists(path=DEFAULT_BUNDLE):
+        return os.path.isfile(os.path.join(path, 'manifest.json'))
+
+    @classmethod
+    def load(cls, path=DEFAULT_BUNDLE, mmap=True):
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get("bundle_format") != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported bundle format {manifest.get('bundle_format')} in {path}")
+
+        mode = 'r' if mmap else None
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode=mode)
+        return cls(
+            path=path,
+            manifest=manifest,
+            compiled=CompiledEnsemble.load(os.path.join(path, 'compiled'), mmap_mode=mode),
+            scaler_mean=load('scaler_mean.npy'),
+            scaler_scale=load('scaler_scale.npy'),
+            canary_X=load('canary_X.npy'),
+            canary_proba=load('canary_proba.npy'),
+        )
+
+    @property
+    def version(self):
+        return self.manifest["version"]
+
+    @property
+    def feature_names(self):
+        return self.manifest["schema"]["features"]
+
+    @property
+    def categories(self):
+        return self.manifest["schema"]["categorical"]
+
+    def load_sklearn_model(self):
+        import joblib
+        return joblib.load(os.path.join(self.path, 'model.joblib'))
+
+    def verify(self):
+        """Re-hash every file against the manifest; returns the mismatched names"""
+        return [name for name, digest in self.manifest["files"].items()
+                if _sha256(os.path.join(self.path, name)) != digest]
+
+
+def _probe(mode, model_dir):
+    """Child process: cold-load one way, score a row, report time and memory"""
+    start = time.perf_counter()
+    from detector import ModelState
+    state = ModelState.load(model_dir, use_bundle=(mode == 'bundle'))
+    loaded = time.perf_counter()
+    if state.compiled_model is not None:
+        state.compiled_model.predict_attack_proba(np.zeros((1, state.n_features)))
+    else:
+        state.model.predict_proba(np.zeros((1, state.n_features)))
+    scored = time.perf_counter()
+
+    report = {"load_s": loaded - start, "first_verdict_s": scored - start}
+    try:
+        import psutil
+        mem = psutil.Process().memory_full_info()
+        report.update(rss_mb=mem.rss / 1e6, uss_mb=mem.uss / 1e6, pss_mb=getattr(mem, 'pss', 0) / 1e6)
+    except ImportError:
+        pass
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import subprocess
+    import sys
+
+    parser = argparse.ArgumentParser(description="CyberAI model bundle tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build a bundle from the existing pickles")
+    build.add_argument("--models", default="models")
+    bench = sub.add_parser("bench", help="cold start + memory: pickles vs bundle")
+    bench.add_argument("--models", default="models")
+    bench.add_argument("--workers", type=int, default=4)
+    probe = sub.add_parser("_probe")
+    probe.add_argument("mode")
+    probe.add_argument("models")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        import joblib
+        model = joblib.load(os.path.join(args.models, 'best_model.pkl'))
+        scaler = joblib.load(os.path.join(args.models, 'scaler.pkl'))
+        encoders = joblib.load(os.path.join(args.models, 'encoders.pkl'))
+        names = getattr(scaler, 'feature_names_in_', None)
+        manifest = save_bundle(model, scaler, encoders, names, os.path.join(args.models, 'bundle'),
+                               metadata={"source": "rebuilt from pickles"})
+        print(f"📦 Bundle {manifest['version']} written ({manifest['model']['n_trees']} trees)")
+
+    elif args.command == "_probe":
+        print(json.dumps(_probe(args.mode, args.models)), flush=True)
+        sys.stdin.read()     # stay alive until the parent has measured every worker
+
+    else:
+        print(f"⏱️  Cold start with {args.workers} concurrent worker processes")
+        for mode in ("pickle", "bundle"):
+            procs = [subprocess.Popen([sys.executable, '-W', 'ignore', __file__, '_probe', mode, args.models],
+                                      stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                     for _ in range(args.workers)]
+            reports = [json.loads(p.stdout.readline()) for p in procs]
+            for p in procs:
+                p.stdin.close()
+                p.wait()
+            avg = {k: sum(r[k] for r in reports) / len(reports) for k in reports[0]}
+            print(f"   {mode:<7} load {avg['load_s'] * 1000:7.0f} ms | first verdict {avg['first_verdict_s'] * 1000:7.0f} ms"
+                  + (f" | RSS {avg['rss_mb']:6.1f} MB, USS {avg['uss_mb']:6.1f} MB, PSS {avg['pss_mb']:6.1f} MB"
+                     if 'rss_mb' in avg else ""))
@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+
+class ModelWatcher:
+    """
+    👀 MODEL DIRECTORY WATCHER
+    ==========================
+    Polls the detector's model files and hot-reloads them in a background
+    thread once a change has settled (unchanged for one full poll, so a
+    half-copied pickle is never loaded). trigger() forces a reload.
+    """
+
+    WATCHED = ('best_model.pkl', 'scaler.pkl', 'encoders.pkl', os.path.join('bundle', 'manifest.json'))
+
+    def __init__(self, detector, interval=2.0):
+        self.detector = detector
+        self.interval = interval
+        self._running = False
+        self._reload_thread = None
+        self._lock = threading.Lock()
+
+    def _fingerprint(self):
+        out = []
+        for name in self.WATCHED:
+            try:
+                st = os.stat(os.path.join(self.detector.model_dir, name))
+                out.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def start(self):
+        if self._running: return
+        self._running = True
+        threading.Thread(target=self._watch_loop, daemon=True).start()
+        print(f"👀 Watching {self.detector.model_dir}/ for model updates")
+
+    def stop(self):
+        self._running = False
+
+    def trigger(self):
+        """Start a background reload; False if one is already running"""
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self.detector.reload_model, daemon=True)
+            self._reload_thread.start()
+            return True
+
+    def _watch_loop(self):
+        current = self._fingerprint()
+        pending = None
+        while self._running:
+            time.sleep(self.interval)
+            seen = self._fingerprint()
+            if seen == current:
+                pending = None
+            elif seen == pending and any(seen):
+                # Stable for a whole interval: the new files are complete
+                if self.trigger():
+                    current = seen
+                    pending = None
+            else:
+                pending = seen
@@ -0,0 +1,155 @@
+import struct
+
+# Link-layer types (pcap LINKTYPE_*)
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6), b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9), b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+_PCAPNG_SHB = 0x0A0D0D0A
+_PCAPNG_IDB, _PCAPNG_SPB, _PCAPNG_EPB = 1, 3, 6
+# Sanity limits (libpcap's): larger lengths can only come from a corrupt file
+_MAX_SNAPLEN = 262144
+_MAX_BLOCK = 16 << 20
+# Fixed fields each packet/interface block body must hold
+_MIN_BODY = {_PCAPNG_IDB: 8, _PCAPNG_EPB: 20, _PCAPNG_SPB: 4}
+
+
+class PcapError(ValueError):
+    pass
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    if len(data) < n:
+        return None                  # end of file (a truncated last record is dropped)
+    return data
+
+
+def _pcap_packets(f, header):
+    endian, resolution = _PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack(endian + "I", header[20:24])[0] & 0x0FFFFFFF
+    record = struct.Struct(endian + "IIII")
+    while True:
+        head = _read_exact(f, record.size)
+        if head is None:
+            return
+        sec, frac, incl_len, _ = record.unpack(head)
+        if incl_len > _MAX_SNAPLEN:
+            raise PcapError(f"corrupt pcap record: captured length {incl_len}")
+        data = _read_exact(f, incl_len)
+        if data is None:
+            return
+        yield sec + frac * resolution, linktype, data
+
+
+def _tsresol(options, endian):
+    """if_tsresol option of an interface block -> seconds per timestamp unit"""
+    pos = 0
+    while pos + 4 <= len(options):
+        code, length = struct.unpack_from(endian + "HH", options, pos)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = options[pos + 4]
+            return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+        pos += 4 + (length + 3) // 4 * 4
+    return 1e-6
+
+
+def _block_length(length, minimum):
+    """Validate a pcapng block length before anything is read with it"""
+    if length < minimum or length % 4 or length > _MAX_BLOCK:
+        raise PcapError(f"corrupt pcapng block: length {length}")
+    return length
+
+
+def _pcapng_packets(f, first):
+    interfaces = []                  # (linktype, seconds per unit) per interface id
+    endian = "<"
+    block = first
+    last_ts = 0.0
+    while True:
+        if block is None:
+            block = _read_exact(f, 8)
+            if block is None:
+                return
+        if struct.unpack("<I", block[:4])[0] == _PCAPNG_SHB:
+            order = _read_exact(f, 4)
+            if order is None:
+                return
+            endian = "<" if order == b"\x4d\x3c\x2b\x1a" else ">"
+            length = _block_length(struct.unpack(endian + "I", block[4:8])[0], 28)
+            if _read_exact(f, length - 12) is None:
+                return
+            interfaces = []          # a new section renumbers interfaces
+            block = None
+            continue
+
+        btype, length = struct.unpack(endian + "II", block)
+        body = _read_exact(f, _block_length(length, 12) - 8)
+        if body is None:
+            return
+        body = body[:-4]             # trailing copy of the block length
+        block = None
+        if len(body) < _MIN_BODY.get(btype, 0):
+            raise PcapError(f"corrupt pcapng block type {btype}: {len(body)}-byte body")
+
+        if btype == _PCAPNG_IDB:
+            linktype = struct.unpack_from(endian + "H", body)[0]
+            interfaces.append((linktype, _tsresol(body[8:], endian)))
+        elif btype == _PCAPNG_EPB:
+            iface, high, low, cap_len, _ = struct.unpack_from(endian + "IIIII", body)
+            linktype, unit = interfaces[iface] if iface < len(interfaces) else (LINKTYPE_ETHERNET, 1e-6)
+            last_ts = ((high << 32) | low) * unit
+            yield last_ts, linktype, body[20:20 + cap_len]
+        elif btype == _PCAPNG_SPB:
+            orig_len = struct.unpack_from(endian + "I", body)[0]
+            linktype = interfaces[0][0] if interfaces else LINKTYPE_ETHERNET
+            yield last_ts, linktype, body[4:4 + orig_len]   # no timestamp in simple blocks
+        # other blocks (name resolution, statistics, ...) are skipped
+
+
+def read_packets(path):
+    """
+    Stream (timestamp, linktype, frame bytes) from a pcap or pcapng file.
+    Reads one record at a time, so memory use does not depend on file size.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if len(head) >= 24 and head[:4] in _PCAP_MAGIC:
+            yield from _pcap_packets(f, head)
+        elif len(head) >= 8 and struct.unpack("<I", head[:4])[0] == _PCAPNG_SHB:
+            f.seek(0)
+            yield from _pcapng_packets(f, None)
+        else:
+            raise PcapError(f"{path}: not a pcap or pcapng file")
+
+
+class PcapWriter:
+    """Minimal little-endian, microsecond pcap writer (sample captures, tests)"""
+
+    def __init__(self, path, linktype=LINKTYPE_ETHERNET, snaplen=65535):
+        self.f = open(path, "wb")
+        self.f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, snaplen, linktype))
+
+    def write(self, ts, frame):
+        sec = int(ts)
+        usec = int(round((ts - sec) * 1e6))
+        if usec == 1000000:
+            sec, usec = sec + 1, 0
+        self.f.write(struct.pack("<IIII", sec, usec, len(frame), len(frame)))
+        self.f.write(frame)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
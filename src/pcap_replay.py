@@ -0,0 +1,286 @@
+import random
+import struct
+import time
+from collections import Counter
+
+import numpy as np
+
+from flow_table import FlowTable
+from load_shedder import LoadShedder
+from packet_decoder import decode_frame
+from pcap_io import LINKTYPE_ETHERNET, PcapError, PcapWriter, read_packets
+from traffic_windows import TrafficWindows
+
+
+def scapy_decoder():
+    """Full scapy dissection of each frame (the slow reference for decode_frame)"""
+    import scapy.all as sa
+    from sniffer import packet_fields
+
+    def decode(linktype, frame):
+        cls = sa.conf.l2types.get(linktype)
+        if cls is None:
+            return None
+        return packet_fields(cls(frame), sa)
+
+    return decode
+
+
+class PcapReplay:
+    """
+    🎞️ PCAP REPLAY
+    ==============
+    Streams a pcap/pcapng file through the live pipeline: frame decode ->
+    FlowTable (+ traffic windows) -> batched detection and/or forwarding to
+    the dashboard over the wire protocol.
+    - speed=0 replays as fast as possible; speed=1.0 keeps the original
+      packet timing (2.0 = twice as fast, ...)
+    - the capture clock drives flow timeouts, so results do not depend on
+      replay speed
+    - finished connections are scored in batches of `batch_size`, or after
+      `max_delay` seconds, whichever comes first
+    - flow_budget enables load shedding (new connections/s of capture time)
+    - a corrupt record ends the replay early; everything read before it is
+      still scored and reported (report["read_error"])
+    """
+
+    def __init__(self, path, detector=None, sender=None, speed=0.0, batch_size=256,
+                 max_delay=0.05, decoder=None, flow_budget=None):
+        self.path = path
+        self.detector = detector
+        self.sender = sender
+        self.speed = speed
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.decode = decoder or decode_frame
+        self.shedder = LoadShedder(flow_budget) if flow_budget else None
+        self.flows = FlowTable(windows=TrafficWindows(), shedder=self.shedder)
+
+        self._pending = []               # (record, wall time it finished)
+        self._latencies = []
+        self.packets = 0
+        self.skipped = 0
+        self.decode_errors = 0
+        self.read_error = None
+        self.connections = 0
+        self.attacks = 0
+        self.attackers = Counter()
+        self.timings = {"decode": 0.0, "flows": 0.0, "detect": 0.0}
+
+    def run(self):
+        self._first_ts = self._last_ts = None
+        start = time.perf_counter()
+        try:
+            self._replay(start)
+        except PcapError as e:
+            self.read_error = str(e)
+            print(f"⚠️  {self.path}: {e}; replay stopped after {self.packets} packets")
+
+        self.flows.flush()
+        self._collect()
+        while self._pending:
+            self._score()
+        if self.sender is not None:
+            self.sender.flush()
+        elapsed = time.perf_counter() - start
+        capture = (self._last_ts - self._first_ts) if self._first_ts is not None else 0.0
+        return self.report(elapsed, capture)
+
+    def _replay(self, start):
+        first_ts = last_expire = None
+        perf = time.perf_counter
+        for ts, linktype, frame in read_packets(self.path):
+            if first_ts is None:
+                self._first_ts = ts
+                first_ts = last_expire = ts
+            self._last_ts = ts
+            self.packets += 1
+            if self.speed > 0:
+                # Wait for the packet's time in slices, so quiet stretches still deliver verdicts
+                while True:
+                    delay = start + (ts - first_ts) / self.speed - perf()
+                    if delay <= 0:
+                        break
+                    time.sleep(min(delay, self.max_delay))
+                    self._due()
+
+            t0 = perf()
+            try:
+                fields = self.decode(linktype, frame)
+            except Exception:
+                fields = None
+                self.decode_errors += 1
+            t1 = perf()
+            self.timings["decode"] += t1 - t0
+            if fields is None:
+                self.skipped += 1
+                continue
+
+            self.flows.update(ts, *fields)
+            if ts - last_expire >= 1.0:
+                self.flows.expire(ts)
+                last_expire = ts
+            self._collect()
+            self.timings["flows"] += perf() - t1
+
+            if len(self._pending) >= self.batch_size:
+                self._score()
+            self._due()
+
+    def _due(self):
+        """Score connections that waited max_delay; send a partial datagram that waited too"""
+        if self._pending and time.perf_counter() - self._pending[0][1] >= self.max_delay:
+            self._score()
+        if self.sender is not None:
+            self.sender.poll()
+
+    def _collect(self):
+        records = self.flows.drain()
+        if records:
+            now = time.perf_counter()
+            self._pending.extend((record, now) for record in records)
+
+    def _score(self):
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        t0 = time.perf_counter()
+        records = [record for record, _ in batch]
+        if self.sender is not None:
+            for record in records:
+                record["timestamp"] = record["end"]
+                self.sender.add(record)
+        if self.detector is not None:
+            summary = self.detector.analyze_batch([r["features"] for r in records],
+                                                  [r["ip"] for r in records])
+            self.attacks += summary["detected_attacks"]
+            for record, result in zip(records, summary["results"]):
+                if result.get("is_attack"):
+                    self.attackers[record["ip"]] += 1
+        done = time.perf_counter()
+        self.timings["detect"] += done - t0
+        self.connections += len(records)
+        self._latencies.extend(done - finished for _, finished in batch)
+
+    def report(self, elapsed, capture):
+        lat = np.asarray(self._latencies) * 1000 if self._latencies else np.zeros(1)
+        return {
+            "file": self.path,
+            "mode": "as fast as possible" if self.speed <= 0 else f"original timing x{self.speed:g}",
+            "packets": self.packets,
+            "skipped": self.skipped,
+            "decode_errors": self.decode_errors,
+            "read_error": self.read_error,
+            "connections": self.connections,
+            "attacks": self.attacks,
+            "top_attackers": self.attackers.most_common(5),
+            "elapsed_s": round(elapsed, 3),
+            "capture_s": round(capture, 3),
+            "packets_per_s": round(self.packets / elapsed, 1) if elapsed else 0.0,
+            "connections_per_s": round(self.connections / elapsed, 1) if elapsed else 0.0,
+            "latency_ms": {p: round(float(np.percentile(lat, q)), 3)
+                           for p, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+            "stage_s": {k: round(v, 3) for k, v in self.timings.items()},
+            "flow_table": self.flows.get_stats(),
+        }
+
+
+def print_report(report):
+    print(f"🎞️  Replay of {report['file']} ({report['mode']})")
+    print(f"   {report['packets']} packets ({report['skipped']} not IP/undecodable) -> "
+          f"{report['connections']} connections, {report['attacks']} flagged as attacks")
+    if report["read_error"]:
+        print(f"   ⚠️  stopped early: {report['read_error']}")
+    print(f"   {report['elapsed_s']}s for {report['capture_s']}s of capture: "
+          f"{report['packets_per_s']:,.0f} packets/s, {report['connections_per_s']:,.0f} connections/s")
+    lat = report["latency_ms"]
+    print(f"   connection finished -> verdict: p50 {lat['p50']} ms, p95 {lat['p95']} ms, "
+          f"p99 {lat['p99']} ms, max {lat['max']} ms")
+    stages = report["stage_s"]
+    print(f"   time in decode {stages['decode']}s, flow table {stages['flows']}s, "
+          f"detection/forwarding {stages['detect']}s")
+    shed = report["flow_table"]["shedding"]
+    if shed:
+        print(f"   🚦 sampled out {shed['sampled_out_flows']} of {shed['offered_flows']} connections "
+              f"({shed['unscored_fraction']:.1%}, {shed['sampled_out_packets']} packets) at a budget of "
+              f"{shed['flow_budget']}/s")
+    for ip, count in report["top_attackers"]:
+        print(f"   🚨 {ip}: {count} attack connections")
+
+
+def _frame(src, dst, sport, dport, flags, payload=b""):
+    """Ethernet + IPv4 + TCP frame (checksums left at 0)"""
+    tcp = struct.pack("!HHIIBBHHH", sport, dport, 0, 0, 5 << 4, flags, 65535, 0, 0)
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp) + len(payload), 0, 0, 64, 6, 0,
+                     bytes(map(int, src.split("."))), bytes(map(int, dst.split("."))))
+    return b"\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00" + ip + tcp + payload
+
+
+def write_sample_capture(path, seconds=10.0, sessions_per_s=200, flood_per_s=2000, seed=0):
+    """Synthetic capture: HTTP sessions to a web server plus a SYN flood against it"""
+    rng = random.Random(seed)
+    server = "192.168.1.20"
+    events = []
+    t0 = 1_700_000_000.0
+    for i in range(int(seconds * sessions_per_s)):
+        ts = t0 + rng.uniform(0, seconds)
+        client = f"10.0.{rng.randint(0, 3)}.{rng.randint(1, 254)}"
+        port = rng.randint(1024, 65535)
+        rtt = rng.uniform(0.001, 0.02)
+        request = b"GET / HTTP/1.1\r\n" + b"x" * rng.randint(50, 400)
+        response = b"HTTP/1.1 200 OK\r\n" + b"y" * rng.randint(200, 1400)
+        events += [
+            (ts, _frame(client, server, port, 80, 0x02)),
+            (ts + rtt, _frame(server, client, 80, port, 0x12)),
+            (ts + 2 * rtt, _frame(client, server, port, 80, 0x18, request)),
+            (ts + 3 * rtt, _frame(server, client, 80, port, 0x18, response)),
+            (ts + 4 * rtt, _frame(client, server, port, 80, 0x11)),
+            (ts + 5 * rtt, _frame(server, client, 80, port, 0x11)),
+        ]
+    flood_start = t0 + seconds / 2
+    for i in range(int(seconds / 2 * flood_per_s)):
+        events.append((flood_start + i / flood_per_s,
+                       _frame("203.0.113.66", server, rng.randint(1024, 65535), 80, 0x02)))
+    events.sort(key=lambda e: e[0])
+    with PcapWriter(path, LINKTYPE_ETHERNET) as writer:
+        for ts, frame in events:
+            writer.write(ts, frame)
+    return len(events)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import socket
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Replay a pcap/pcapng capture through the detection pipeline")
+    parser.add_argument("pcap", nargs="?", help="capture file (default: generate a sample capture)")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="0 = as fast as possible, 1 = original timing, 2 = twice as fast ...")
+    parser.add_argument("--batch", type=int, default=256, help="connections per detection batch")
+    parser.add_argument("--send", metavar="HOST:PORT", help="also forward connections to a dashboard")
+    parser.add_argument("--no-detect", action="store_true", help="skip local detection")
+    parser.add_argument("--budget", type=int, help="load-shedding budget in new connections/s")
+    parser.add_argument("--scapy", action="store_true", help="decode with scapy instead of the struct decoder")
+    parser.add_argument("--generate", metavar="PATH", default=os.path.join(tempfile.gettempdir(), "cyberai_sample.pcap"),
+                        help="where to write the sample capture when no file is given")
+    args = parser.parse_args()
+
+    path = args.pcap
+    if path is None:
+        n = write_sample_capture(args.generate)
+        print(f"🧪 Wrote sample capture {args.generate} ({n} packets)")
+        path = args.generate
+
+    detector = None
+    if not args.no_detect:
+        from detector import CyberAI_Detector
+        detector = CyberAI_Detector()
+    sender = None
+    if args.send:
+        from wire_protocol import WireSender
+        host, port = args.send.rsplit(":", 1)
+        sender = WireSender(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), (host, int(port)))
+
+    replay = PcapReplay(path, detector=detector, sender=sender, speed=args.speed, batch_size=args.batch,
+                        decoder=scapy_decoder() if args.scapy else None, flow_budget=args.budget)
+    print_report(replay.run())
@@ -0,0 +1,108 @@
+import numbers
+
+import numpy as np
+
+
+class InferencePipeline:
+    """
+    🧪 INFERENCE PIPELINE
+    =====================
+    Raw connections -> model input -> attack probability, the same way for
+    one row or a batch and without pandas:
+    - protocol_type / service / flag strings become LabelEncoder codes via
+      sorted lookup tables (np.searchsorted); unknown categories become -1,
+      numeric values in those columns are taken as codes already
+    - the StandardScaler is applied as a vectorized (X - mean) / scale
+    - the model (compiled ensemble or sklearn) scores the result
+    Rows may be numeric arrays, sequences mixing numbers and category
+    strings, or dicts keyed by feature name (missing features are 0).
+    """
+
+    UNKNOWN = -1
+
+    def __init__(self, feature_names, categories, mean=None, scale=None, model=None):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self._index = {name: i for i, name in enumerate(self.feature_names)}
+        self.mean = np.zeros(self.n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(self.n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        self.model = model
+
+        # column index -> (sorted category strings, code of each)
+        self.tables = {}
+        for col, classes in (categories or {}).items():
+            if col not in self._index:
+                continue
+            classes = np.asarray([str(c) for c in classes])
+            order = np.argsort(classes, kind='stable')
+            self.tables[self._index[col]] = (classes[order], order.astype(np.float64))
+
+    @classmethod
+    def from_sklearn(cls, scaler, encoders, feature_names, model=None):
+        categories = {col: enc.classes_ for col, enc in encoders.items()}
+        return cls(feature_names, categories, scaler.mean_, scaler.scale_, model)
+
+    def _lookup(self, col, values):
+        """Category strings -> codes (UNKNOWN when not seen in training)"""
+        keys, codes = self.tables[col]
+        values = np.asarray(values, dtype=str)
+        pos = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+        return np.where(keys[pos] == values, codes[pos], self.UNKNOWN)
+
+    def category_codes(self, col, values):
+        """Training codes for a list of category strings of column `col`"""
+        return self._lookup(col, list(values))
+
+    def encode(self, rows):
+        """(n, n_features) float64 matrix in raw feature space (categories as codes)"""
+        if isinstance(rows, np.ndarray) and rows.dtype.kind in 'biuf':
+            X = np.asarray(rows, dtype=np.float64)
+            if X.size == 0:
+                return np.zeros((0, self.n_features))
+            return self._check_width(X.reshape(1, -1) if X.ndim == 1 else X)
+        if isinstance(rows, dict):
+            rows = [rows]
+        rows = list(rows)
+        if not rows:
+            return np.zeros((0, self.n_features))
+        if isinstance(rows[0], dict):
+            columns = [[row.get(name, 0) for row in rows] for name in self.feature_names]
+            obj = np.empty((len(rows), self.n_features), dtype=object)
+            for j, column in enumerate(columns):
+                obj[:, j] = column
+        else:
+            if isinstance(rows[0], (numbers.Number, str)):
+                rows = [rows]           # one flat row
+            try:
+                X = np.asarray(rows, dtype=np.float64).reshape(len(rows), -1)
+            except (TypeError, ValueError):
+                obj = self._check_width(np.asarray(rows, dtype=object))
+            else:
+                return self._check_width(X)
+
+        for j in self.tables:
+            column = obj[:, j]
+            is_str = np.fromiter((isinstance(v, str) for v in column), dtype=bool, count=len(column))
+            if is_str.any():
+                column[is_str] = self._lookup(j, column[is_str].tolist())
+        return obj.astype(np.float64)
+
+    def _check_width(self, X):
+        """Never reinterpret a matrix of the wrong width as some other batch"""
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows of {self.n_features} features, got shape {X.shape}")
+        return X
+
+    def standardize(self, X):
+        """Raw feature matrix -> the scaled space the model was trained on"""
+        return (X - self.mean) / self.scale
+
+    def transform(self, rows):
+        return self.standardize(self.encode(rows))
+
+    def attack_proba(self, rows):
+        """Attack probability per row (requires a model)"""
+        X = self.transform(rows)
+        if hasattr(self.model, 'predict_attack_proba'):
+            return self.model.predict_attack_proba(X)
+        return self.model.predict_proba(X)[:, 1]
@@ -0,0 +1,285 @@
+import bisect
+import os
+import struct
+import tempfile
+import time
+from array import array
+
+import numpy as np
+
+from rule_trie import parse_ip, parse_prefix
+
+# File layout (little-endian):
+#   header  : magic(4s) format(H) pad(H) n4(Q) n6(Q)
+#   IPv4    : starts uint32[n4], ends uint32[n4]   (padded to 8 bytes)
+#   IPv6    : starts uint64[n6, 2], ends uint64[n6, 2]   (hi, lo words)
+# Ranges are sorted, merged and inclusive, so one binary search answers a lookup.
+MAGIC = b'CYRS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHQQ')
+
+DEFAULT_STORE = 'models/blocklist.bin'
+
+
+def iter_feed(lines):
+    """
+    Stream (version, start, end) ranges out of a plain-text/CSV blocklist.
+    Accepts IPs, CIDR prefixes and 'start-end' ranges in the first column;
+    blank lines, '#'/';' comments and headers are skipped.
+    Yields None for lines that look like data but don't parse.
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', 'ignore')
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        token = line.replace(',', ' ').replace(';', ' ').replace('\t', ' ').split(' ', 1)[0].strip('"\'')
+        if not token or not (token[0].isdigit() or token[0] in ':abcdefABCDEF'):
+            continue
+        try:
+            if '-' in token:
+                lo, hi = token.split('-', 1)
+                v_lo, start = parse_ip(lo) or (None, None)
+                v_hi, end = parse_ip(hi) or (None, None)
+                if v_lo is None or v_lo != v_hi or start > end:
+                    raise ValueError(token)
+                yield v_lo, start, end
+            else:
+                version, key, plen = parse_prefix(token)
+                bits = 32 if version == 4 else 128
+                yield version, key, key | ((1 << (bits - plen)) - 1)
+        except ValueError:
+            yield None
+
+
+def _merge_v4(starts, ends):
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order].astype(np.int64), ends[order].astype(np.int64)
+    reach = np.maximum.accumulate(ends)
+    # A new range begins where it neither overlaps nor touches everything before it
+    new = np.ones(starts.size, dtype=bool)
+    new[1:] = starts[1:] > reach[:-1] + 1
+    group_ends = np.append(np.flatnonzero(new)[1:] - 1, starts.size - 1)
+    return starts[new].astype(np.uint32), reach[group_ends].astype(np.uint32)
+
+
+def _merge_v6(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _split128(values):
+    out = np.empty((len(values), 2), dtype=np.uint64)
+    for i, v in enumerate(values):
+        out[i, 0] = v >> 64
+        out[i, 1] = v & 0xFFFFFFFFFFFFFFFF
+    return out
+
+
+class _Words128:
+    """Sequence view over (hi, lo) uint64 pairs so bisect can search IPv6 keys"""
+
+    def __init__(self, words):
+        self.words = words
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, i):
+        hi, lo = self.words[i]
+        return (int(hi) << 64) | int(lo)
+
+
+class RangeStore:
+    """
+    💾 COMPACT RULE STORE
+    =====================
+    Sorted, merged integer ranges memory-mapped straight from disk.
+    Opening a store costs a header read; pages load on demand and are
+    shared between processes.
+    """
+
+    def __init__(self, v4_starts, v4_ends, v6_starts, v6_ends, path=None):
+        self.v4_starts = v4_starts
+        self.v4_ends = v4_ends
+        self.v6_starts = v6_starts
+        self.v6_ends = v6_ends
+        self.path = path
+
+    @classmethod
+    def open(cls, path=DEFAULT_STORE):
+        with open(path, 'rb') as f:
+            magic, fmt, _, n4, n6 = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a v{FORMAT_VERSION} rule store")
+
+        mm = np.memmap(path, dtype=np.uint8, mode='r')
+        offset = HEADER.size
+
+        def take(dtype, count, shape=None):
+            nonlocal offset
+            arr = mm[offset:offset + count * np.dtype(dtype).itemsize].view(dtype)
+            offset += arr.nbytes
+            offset += -offset % 8
+            return arr.reshape(shape) if shape else arr
+
+        v4_starts = take('<u4', n4)
+        v4_ends = take('<u4', n4)
+        v6_starts = take('<u8', 2 * n6, (n6, 2))
+        v6_ends = take('<u8', 2 * n6, (n6, 2))
+        return cls(v4_starts, v4_ends, v6_starts, v6_ends, path=path)
+
+    def save(self, path):
+        """Write atomically: readers keep their old mapping until they reopen"""
+        # A unique temp file per writer: concurrent saves never share one
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                   suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.v4_starts), len(self.v6_starts)))
+                for arr, dtype in ((self.v4_starts, '<u4'), (self.v4_ends, '<u4'),
+                                   (self.v6_starts, '<u8'), (self.v6_ends, '<u8')):
+                    f.write(np.ascontiguousarray(arr, dtype=dtype).tobytes())
+                    f.write(b'\0' * (-f.tell() % 8))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.path = path
+
+    @classmethod
+    def build(cls, ranges, base=None):
+        """Build a store from (version, start, end) tuples, optionally merged with `base`"""
+        v4_starts, v4_ends = array('I'), array('I')
+        v6 = []
+        invalid = 0
+        for item in ranges:
+            if item is None:
+                invalid += 1
+                continue
+            version, start, end = item
+            if version == 4:
+                v4_starts.append(start)
+                v4_ends.append(end)
+            else:
+                v6.append((start, end))
+        parsed = len(v4_starts) + len(v6)
+
+        s4 = np.frombuffer(v4_starts, dtype=np.uint32)
+        e4 = np.frombuffer(v4_ends, dtype=np.uint32)
+        if base is not None:
+            s4 = np.concatenate([s4, base.v4_starts])
+            e4 = np.concatenate([e4, base.v4_ends])
+            v6.extend(zip(_Words128(base.v6_starts), _Words128(base.v6_ends)))
+        s4, e4 = _merge_v4(s4, e4) if s4.size else (s4.copy(), e4.copy())
+        merged6 = _merge_v6(v6)
+
+        store = cls(s4, e4, _split128([s for s, _ in merged6]), _split128([e for _, e in merged6]))
+        return store, {"parsed": parsed, "invalid": invalid}
+
+    def __len__(self):
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.v4_starts, self.v4_ends, self.v6_starts, self.v6_ends))
+
+    def contains_key(self, version, key):
+        if version == 4:
+            i = int(np.searchsorted(self.v4_starts, key, side='right')) - 1
+            return i >= 0 and key <= int(self.v4_ends[i])
+        i = bisect.bisect_right(_Words128(self.v6_starts), key) - 1
+        return i >= 0 and key <= _Words128(self.v6_ends)[i]
+
+    def contains(self, ip):
+        parsed = parse_ip(ip) if ip else None
+        return parsed is not None and self.contains_key(*parsed)
+
+    def contains_v4_batch(self, keys):
+        """Vectorized membership for an array of IPv4 keys"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        if not len(self.v4_starts):
+            return np.zeros(keys.size, dtype=bool)
+        i = np.searchsorted(self.v4_starts, keys, side='right') - 1
+        safe = np.maximum(i, 0)
+        return (i >= 0) & (keys <= self.v4_ends[safe])
+
+    def summary(self):
+        return {
+            "path": self.path,
+            "ranges_v4": int(len(self.v4_starts)),
+            "ranges_v6": int(len(self.v6_starts)),
+            "bytes": int(self.nbytes),
+        }
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+def import_feed(lines, path=DEFAULT_STORE, merge=True):
+    """Stream a blocklist into the store at `path`; returns timing/size stats"""
+    start = time.perf_counter()
+    base = RangeStore.open(path) if merge and os.path.exists(path) else None
+    store, counts = RangeStore.build(iter_feed(lines), base=base)
+    parsed_at = time.perf_counter()
+    store.save(path)
+    saved_at = time.perf_counter()
+    reloaded = RangeStore.open(path)
+    reload_s = time.perf_counter() - saved_at
+
+    return reloaded, {
+        **counts,
+        "ranges": len(reloaded),
+        "file_bytes": os.path.getsize(path),
+        "import_s": round(parsed_at - start, 3),
+        "write_s": round(saved_at - parsed_at, 3),
+        "reload_ms": round(reload_s * 1000, 3),
+        "entries_per_s": int(counts["parsed"] / max(parsed_at - start, 1e-9)),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CyberAI threat-feed import")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import plain-text/CSV blocklists")
+    imp.add_argument("feeds", nargs="+", help="feed files ('-' for stdin)")
+    imp.add_argument("--store", default=DEFAULT_STORE)
+    imp.add_argument("--replace", action="store_true", help="drop existing ranges first")
+    info = sub.add_parser("info", help="show store size and reload time")
+    info.add_argument("--store", default=DEFAULT_STORE)
+    info.add_argument("--lookup", nargs="*", default=[], help="IPs to test")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import sys
+        for i, feed in enumerate(args.feeds):
+            merge = not (args.replace and i == 0)
+            if feed == '-':
+                store, report = import_feed(sys.stdin, args.store, merge=merge)
+            else:
+                with open(feed, 'r', encoding='utf-8', errors='ignore') as f:
+                    store, report = import_feed(f, args.store, merge=merge)
+            print(f"📥 {feed}: {report}")
+        print(f"✅ Store ready: {store.summary()}")
+    else:
+        start = time.perf_counter()
+        store = RangeStore.open(args.store)
+        print(f"💾 {store.summary()} (opened in {(time.perf_counter() - start) * 1000:.3f} ms)")
+        for ip in args.lookup:
+            print(f"   {ip}: {'BLOCKED' if store.contains(ip) else 'not listed'}")
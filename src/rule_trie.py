@@ -0,0 +1,297 @@
+import socket
+from array import array
+
+import numpy as np
+
+# Rule verdicts stored on trie nodes
+NO_RULE = 0
+ALLOW = 1
+BLOCK = 2
+
+RULE_TYPES = {"whitelist": ALLOW, "blacklist": BLOCK}
+
+
+def parse_prefix(text):
+    """
+    Parse '1.2.3.4', '10.0.0.0/8' or '2001:db8::/32' into (version, key, length).
+    Host bits are masked off. Raises ValueError on malformed input.
+    """
+    addr, _, length = str(text).strip().partition('/')
+    if ':' in addr:
+        version, family, bits = 6, socket.AF_INET6, 128
+    else:
+        version, family, bits = 4, socket.AF_INET, 32
+    try:
+        key = int.from_bytes(socket.inet_pton(family, addr), 'big')
+    except OSError:
+        raise ValueError(f"Invalid IP address: {addr!r}")
+
+    plen = bits
+    if length:
+        if not length.isdigit() or int(length) > bits:
+            raise ValueError(f"Invalid prefix length: {text!r}")
+        plen = int(length)
+    key &= ((1 << plen) - 1) << (bits - plen)
+    return version, key, plen
+
+
+def parse_ip(ip):
+    """Parse a bare address into (version, key); None if it isn't an IP"""
+    try:
+        if ':' in ip:
+            return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        return None
+
+
+def format_prefix(version, key, plen):
+    family, bits = (socket.AF_INET, 32) if version == 4 else (socket.AF_INET6, 128)
+    addr = socket.inet_ntop(family, key.to_bytes(bits // 8, 'big'))
+    return addr if plen == bits else f"{addr}/{plen}"
+
+
+class PrefixTrie:
+    """
+    🌳 PATRICIA TRIE (path-compressed binary radix trie)
+    ===================================================
+    Nodes live in parallel flat arrays (key, length, child0, child1, value),
+    so there are at most 2 nodes per stored prefix and no per-node objects.
+    Lookups walk at most `bits` levels and return the longest matching prefix.
+    """
+
+    def __init__(self, bits):
+        self.bits = bits
+        # IPv4 keys fit in uint32; IPv6 keys need Python ints
+        self.keys = array('I', [0]) if bits == 32 else [0]
+        self.lengths = array('B', [0])
+        self.child0 = array('i', [-1])
+        self.child1 = array('i', [-1])
+        self.values = array('b', [NO_RULE])
+        self.size = 0           # prefixes with a rule
+        self.version = 0        # bumped on every change (invalidates array snapshots)
+        self._snapshot = None
+
+    def _bit(self, key, pos):
+        return (key >> (self.bits - 1 - pos)) & 1
+
+    def _common_length(self, a, b, limit):
+        diff = (a ^ b) >> (self.bits - limit) if limit else 0
+        return limit - diff.bit_length()
+
+    def _new_node(self, key, plen, value):
+        self.keys.append(key)
+        self.lengths.append(plen)
+        self.child0.append(-1)
+        self.child1.append(-1)
+        self.values.append(value)
+        return len(self.values) - 1
+
+    def _set_child(self, node, bit, child):
+        (self.child1 if bit else self.child0)[node] = child
+
+    def _set_value(self, node, value):
+        if (self.values[node] == NO_RULE) != (value == NO_RULE):
+            self.size += 1 if value != NO_RULE else -1
+        self.values[node] = value
+        self.version += 1
+
+    def insert(self, key, plen, value):
+        node = 0
+        while True:
+            if self.lengths[node] == plen:
+                self._set_value(node, value)
+                return
+            bit = self._bit(key, self.lengths[node])
+            child = (self.child1 if bit else self.child0)[node]
+            if child == -1:
+                self._set_child(node, bit, self._new_node(key, plen, NO_RULE))
+                self._set_value(len(self.values) - 1, value)
+                return
+
+            ckey, clen = self.keys[child], self.lengths[child]
+            common = self._common_length(ckey, key, min(clen, plen))
+            if common == clen:
+                node = child
+                continue
+
+            if common == plen:
+                # New prefix sits between node and child
+                mid = self._new_node(key, plen, NO_RULE)
+                self._set_child(mid, self._bit(ckey, plen), child)
+                self._set_child(node, bit, mid)
+                self._set_value(mid, value)
+            else:
+                # Branch where the two prefixes diverge
+                mask = ((1 << common) - 1) << (self.bits - common)
+                fork = self._new_node(key & mask, common, NO_RULE)
+                leaf = self._new_node(key, plen, NO_RULE)
+                self._set_child(fork, self._bit(ckey, common), child)
+                self._set_child(fork, self._bit(key, common), leaf)
+                self._set_child(node, bit, fork)
+                self._set_value(leaf, value)
+            return
+
+    def find(self, key, plen):
+        """Node index holding exactly this prefix, or -1"""
+        node = 0
+        while self.lengths[node] < plen:
+            child = (self.child1 if self._bit(key, self.lengths[node]) else self.child0)[node]
+            if child == -1 or self.lengths[child] > plen or \
+                    self._common_length(self.keys[child], key, self.lengths[child]) != self.lengths[child]:
+                return -1
+            node = child
+        return node if self.lengths[node] == plen else -1
+
+    def remove(self, key, plen, value=None):
+        """Clear a prefix's rule (only if it equals `value`, when given)"""
+        node = self.find(key, plen)
+        if node == -1 or self.values[node] == NO_RULE:
+            return False
+        if value is not None and self.values[node] != value:
+            return False
+        self._set_value(node, NO_RULE)
+        return True
+
+    def get(self, key, plen):
+        node = self.find(key, plen)
+        return NO_RULE if node == -1 else self.values[node]
+
+    def lookup(self, key):
+        """Verdict of the longest prefix containing `key`"""
+        best = self.values[0]
+        node = 0
+        while self.lengths[node] < self.bits:
+            child = (self.child1 if self._bit(key, self.lengths[node]) else self.child0)[node]
+            if child == -1:
+                break
+            clen = self.lengths[child]
+            if clen and (self.keys[child] ^ key) >> (self.bits - clen):
+                break
+            if self.values[child] != NO_RULE:
+                best = self.values[child]
+            node = child
+        return best
+
+    def lookup_batch(self, keys):
+        """Vectorized lookup for a uint32 array of IPv4 keys (IPv4 tries only)"""
+        if self.bits != 32:
+            return np.fromiter((self.lookup(k) for k in keys), dtype=np.int8, count=len(keys))
+
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            nodes = (
+                np.frombuffer(self.keys, dtype=np.uint32).astype(np.uint64),
+                np.frombuffer(self.lengths, dtype=np.uint8).astype(np.int64),
+                np.stack([np.frombuffer(self.child0, dtype=np.int32),
+                          np.frombuffer(self.child1, dtype=np.int32)], axis=1),
+                np.frombuffer(self.values, dtype=np.int8).copy(),
+            )
+            self._snapshot = (self.version, nodes)
+        nkeys, nlens, children, nvalues = self._snapshot[1]
+
+        keys = np.asarray(keys, dtype=np.uint64)
+        best = np.full(keys.size, nvalues[0], dtype=np.int8)
+        node = np.zeros(keys.size, dtype=np.int64)
+        active = np.ones(keys.size, dtype=bool)
+        for _ in range(self.bits):
+            idx = np.flatnonzero(active)
+            if not idx.size:
+                break
+            cur = node[idx]
+            k = keys[idx]
+            length = nlens[cur]
+            done = length >= self.bits
+            bit = (k >> np.uint64(31 - np.minimum(length, 31))) & np.uint64(1)
+            child = children[cur, bit.astype(np.intp)]
+            safe = np.maximum(child, 0)
+            shift = np.uint64(32) - nlens[safe].astype(np.uint64)
+            # Shifting a uint64 by 32 keeps it well-defined for /0 .. /32
+            match = ~done & (child != -1) & (((nkeys[safe] ^ k) >> shift) == 0)
+            hit = match & (nvalues[safe] != NO_RULE)
+            best[idx[hit]] = nvalues[safe[hit]]
+            node[idx[match]] = child[match]
+            active[idx[~match]] = False
+        return best
+
+    def items(self):
+        """Yield (key, length, value) for every prefix with a rule"""
+        for node in range(len(self.values)):
+            if self.values[node] != NO_RULE:
+                yield self.keys[node], self.lengths[node], self.values[node]
+
+
+class RuleEngine:
+    """
+    🛡️ CIDR RULE ENGINE
+    ===================
+    Whitelist/blacklist prefixes for IPv4 and IPv6 on top of two Patricia tries.
+    The longest matching prefix decides; a prefix holds one verdict at a time,
+    so adding it to one list removes it from the other. Imported threat feeds
+    only apply to addresses no manual rule covers.
+    """
+
+    def __init__(self):
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        # Optional bulk blocklist (rule_store.RangeStore), consulted when no prefix matches
+        self.feed = None
+
+    def __len__(self):
+        return sum(trie.size for trie in self.tries.values())
+
+    def count(self, rule_type):
+        value = RULE_TYPES[rule_type]
+        return sum(1 for trie in self.tries.values() for _, _, v in trie.items() if v == value)
+
+    def add(self, prefix, rule_type):
+        version, key, plen = parse_prefix(prefix)
+        self.tries[version].insert(key, plen, RULE_TYPES[rule_type])
+
+    def remove(self, prefix, rule_type):
+        version, key, plen = parse_prefix(prefix)
+        return self.tries[version].remove(key, plen, RULE_TYPES[rule_type])
+
+    def contains(self, prefix, rule_type):
+        version, key, plen = parse_prefix(prefix)
+        return self.tries[version].get(key, plen) == RULE_TYPES[rule_type]
+
+    def match(self, ip):
+        """ALLOW / BLOCK / NO_RULE for one address (non-IPs never match)"""
+        parsed = parse_ip(ip) if ip else None
+        if parsed is None:
+            return NO_RULE
+        version, key = parsed
+        verdict = self.tries[version].lookup(key)
+        if verdict == NO_RULE and self.feed is not None and self.feed.contains_key(version, key):
+            return BLOCK
+        return verdict
+
+    def match_batch(self, ips):
+        """Vectorized match over a sequence of addresses -> int8 verdict array"""
+        n = len(ips)
+        verdicts = np.zeros(n, dtype=np.int8)
+        v4_idx, v4_keys = [], []
+        for i, ip in enumerate(ips):
+            parsed = parse_ip(ip) if ip else None
+            if parsed is None:
+                continue
+            version, key = parsed
+            if version == 4:
+                v4_idx.append(i)
+                v4_keys.append(key)
+            else:
+                verdicts[i] = self.match(ip)
+        if v4_idx:
+            keys = np.asarray(v4_keys, dtype=np.uint64)
+            v4 = self.tries[4].lookup_batch(keys)
+            if self.feed is not None:
+                v4[(v4 == NO_RULE) & self.feed.contains_v4_batch(keys)] = BLOCK
+            verdicts[v4_idx] = v4
+        return verdicts
+
+    def to_dict(self):
+        out = {"whitelist": [], "blacklist": []}
+        names = {v: k for k, v in RULE_TYPES.items()}
+        for version, trie in self.tries.items():
+            for key, plen, value in trie.items():
+                out[names[value]].append(format_prefix(version, key, plen))
+        return out
@@ -0,0 +1,320 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+
+
+def flow_shard(src, dst, sport, dport, proto, n_shards):
+    """Shard of a connection: the same for both directions (endpoints are ordered first)"""
+    a, b = (src, sport), (dst, dport)
+    if b < a:
+        a, b = b, a
+    return hash((proto, a, b)) % n_shards
+
+
+def _worker_main(index, mode, source, fanout_group, batches, results, stop, send_to,
+                 flow_budget, report_interval):
+    """Capture worker: its own flow table, traffic windows, shedder and wire sender"""
+    import socket
+
+    from flow_table import FlowTable
+    from load_shedder import LoadShedder
+    from traffic_windows import TrafficWindows
+
+    shedder = LoadShedder(flow_budget) if flow_budget else None
+    flows = FlowTable(windows=TrafficWindows(), shedder=shedder)
+    sender = None
+    if send_to:
+        from wire_protocol import WireSender
+        sender = WireSender(socket.socket(socket.AF_INET, socket.SOCK_DGRAM), send_to)
+    stats = {"worker": index, "pid": os.getpid(), "packets": 0, "connections": 0, "busy_s": 0.0}
+    started = last_report = time.perf_counter()
+
+    def forward():
+        for record in flows.drain():
+            record["timestamp"] = record["end"]
+            stats["connections"] += 1
+            if sender is not None:
+                sender.add(record)
+
+    def report(final=False):
+        stats["elapsed_s"] = time.perf_counter() - started
+        stats["flow_table"] = flows.get_stats()
+        if sender is not None:
+            stats["wire"] = sender.get_stats()
+        results.put((final, dict(stats)))
+
+    try:
+        if mode == "live":
+            from packet_decoder import AfPacketSource, decode_frame
+            capture = AfPacketSource(source, fanout_group=fanout_group, timeout=0.2)
+            last_expire = time.time()
+            while not stop.is_set():
+                item = capture.recv()
+                t0 = time.perf_counter()
+                if item is not None:
+                    ts, linktype, frame = item
+                    fields = decode_frame(linktype, frame)
+                    if fields is not None:
+                        stats["packets"] += 1
+                        flows.update(ts, *fields)
+                now = time.time()
+                if now - last_expire >= 1.0 or item is None:
+                    flows.expire(now)
+                    last_expire = now
+                forward()
+                if sender is not None:
+                    sender.poll()
+                stats["busy_s"] += time.perf_counter() - t0
+                if time.perf_counter() - last_report >= report_interval:
+                    report()
+                    last_report = time.perf_counter()
+            capture.close()
+        else:
+            last_expire = None
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                t0 = time.perf_counter()
+                for item in batch:
+                    flows.update(*item)
+                ts = batch[-1][0]
+                if last_expire is None or ts - last_expire >= 1.0:
+                    flows.expire(ts)        # capture clock, as in pcap replay
+                    last_expire = ts
+                forward()
+                stats["packets"] += len(batch)
+                stats["busy_s"] += time.perf_counter() - t0
+    except KeyboardInterrupt:
+        pass
+    except Exception as exc:
+        # Still flush and send the final report, so the parent never waits on a silent worker
+        stats["error"] = f"{type(exc).__name__}: {exc}"
+    # End of capture: every live flow becomes a record
+    try:
+        flows.flush()
+        forward()
+        if sender is not None:
+            sender.flush()
+    except Exception as exc:
+        stats.setdefault("error", f"{type(exc).__name__}: {exc}")
+    report(final=True)
+
+
+class ShardedCapture:
+    """
+    🧵 SHARDED CAPTURE WORKERS
+    ==========================
+    Spreads capture over `workers` processes by a symmetric flow hash, so
+    both directions of a connection always reach the same worker and each
+    worker's flow table and traffic windows see whole connections.
+    - live (Linux): every worker opens its own AF_PACKET socket in one
+      PACKET_FANOUT_HASH group; the kernel does the hashing, no packet ever
+      passes through a Python dispatcher
+    - pcap: this process reads and decodes the file, hashes each packet
+      with flow_shard() and ships per-worker batches
+    Each worker forwards its connections to the dashboard on its own wire
+    sender (own sender id + sequence numbers) and sheds load against
+    flow_budget / workers. The report has per-worker rates and imbalance.
+    """
+
+    def __init__(self, workers=None, send_to=None, flow_budget=None, batch_size=512,
+                 report_interval=5.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.send_to = send_to
+        self.flow_budget = flow_budget
+        self.batch_size = batch_size
+        self.report_interval = report_interval
+        self._ctx = mp.get_context("spawn")
+        self.latest = {}                     # worker -> last reported stats
+        self.dead = {}                       # worker -> exit code, for workers that died mid-replay
+        self.dropped = 0                     # packets that could not be handed to a dead worker
+
+    def _start(self, mode, source=None):
+        self._results = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self._batches = [self._ctx.Queue(maxsize=64) for _ in range(self.workers)] if mode == "pcap" else None
+        budget = self.flow_budget / self.workers if self.flow_budget else None
+        group = os.getpid() & 0xFFFF
+        self._processes = []
+        self._finished = set()              # workers whose final report arrived
+        self.dead = {}
+        self.dropped = 0
+        for i in range(self.workers):
+            proc = self._ctx.Process(
+                target=_worker_main, daemon=True,
+                args=(i, mode, source, group, self._batches[i] if self._batches else None, self._results,
+                      self._stop, self.send_to, budget, self.report_interval))
+            proc.start()
+            self._processes.append(proc)
+
+    def _put(self, shard, batch):
+        """Hand a batch (None = end) to a worker; gives up, instead of blocking forever, if it died"""
+        if shard in self.dead:
+            self.dropped += len(batch or ())
+            return False
+        while True:
+            try:
+                self._batches[shard].put(batch, timeout=1.0)
+                return True
+            except queue.Full:
+                proc = self._processes[shard]
+                if not proc.is_alive():
+                    self.dead[shard] = proc.exitcode
+                    print(f"⚠️ capture worker {shard} died (exit code {proc.exitcode}); "
+                          f"its share of the capture is dropped")
+                    self.dropped += len(batch or ())
+                    return False
+
+    def _collect(self, final=False):
+        """Pull worker reports; with final=True wait for every live worker's last one"""
+        done = self._finished
+        while True:
+            try:
+                is_final, stats = self._results.get(timeout=1.0 if final else 0.0)
+            except queue.Empty:
+                if not final or not any(proc.is_alive() for proc in self._processes):
+                    return
+                continue
+            self.latest[stats["worker"]] = stats
+            if is_final:
+                done.add(stats["worker"])
+                if final and len(done) == self.workers:
+                    return
+
+    def run_pcap(self, path):
+        """Replay a capture as fast as possible through the workers; returns the report"""
+        from packet_decoder import decode_frame
+        from pcap_io import read_packets
+
+        self._start("pcap")
+        n = self.workers
+        pending = [[] for _ in range(n)]
+        packets = skipped = 0
+        start = time.perf_counter()
+        for ts, linktype, frame in read_packets(path):
+            fields = decode_frame(linktype, frame)
+            if fields is None:
+                skipped += 1
+                continue
+            src, dst, sport, dport, proto = fields[:5]
+            shard = flow_shard(src, dst, sport, dport, proto, n)
+            batch = pending[shard]
+            batch.append((ts, *fields))
+            packets += 1
+            if len(batch) >= self.batch_size:
+                self._put(shard, batch)
+                pending[shard] = []
+        dispatch = time.perf_counter() - start
+        for shard, batch in enumerate(pending):
+            if batch:
+                self._put(shard, batch)
+            self._put(shard, None)
+        self._collect(final=True)
+        elapsed = time.perf_counter() - start
+        for proc in self._processes:
+            proc.join(timeout=5)
+        return self.report(elapsed, packets, skipped, dispatch)
+
+    def run_live(self, interface=None, duration=None):
+        """Capture until `duration` seconds pass (or Ctrl+C); returns the report"""
+        self._start("live", interface)
+        start = time.perf_counter()
+        try:
+            while duration is None or time.perf_counter() - start < duration:
+                time.sleep(min(self.report_interval, 0.5))
+                self._collect()
+                if not any(proc.is_alive() for proc in self._processes):
+                    break
+        except KeyboardInterrupt:
+            pass
+        self._stop.set()
+        self._collect(final=True)
+        elapsed = time.perf_counter() - start
+        packets = sum(stats["packets"] for stats in self.latest.values())
+        return self.report(elapsed, packets, 0, None)
+
+    def report(self, elapsed, packets, skipped, dispatch_s):
+        per_worker = []
+        for i in range(self.workers):
+            stats = self.latest.get(i, {"packets": 0, "connections": 0, "busy_s": 0.0})
+            busy = stats["busy_s"]
+            per_worker.append({
+                "worker": i,
+                "packets": stats["packets"],
+                "connections": stats["connections"],
+                "share": round(stats["packets"] / packets, 4) if packets else 0.0,
+                "packets_per_s": round(stats["packets"] / elapsed, 1) if elapsed else 0.0,
+                "busy_packets_per_s": round(stats["packets"] / busy, 1) if busy else 0.0,
+                "sampled_out": (stats.get("flow_table", {}).get("shedding") or {}).get("sampled_out_flows", 0),
+            })
+        for i, proc in enumerate(self._processes):
+            # A worker that exited without a final report died (killed, out of memory, ...)
+            if i not in self.dead and proc.exitcode not in (None, 0) and i not in self._finished:
+                self.dead[i] = proc.exitcode
+        counts = [w["packets"] for w in per_worker]
+        mean = sum(counts) / len(counts) if counts else 0
+        return {
+            "workers": self.workers,
+            "packets": packets,
+            "skipped": skipped,
+            "connections": sum(w["connections"] for w in per_worker),
+            "elapsed_s": round(elapsed, 3),
+            "packets_per_s": round(packets / elapsed, 1) if elapsed else 0.0,
+            "dispatch_packets_per_s": round(packets / dispatch_s, 1) if dispatch_s else None,
+            "imbalance": round(max(counts) / mean, 3) if mean else 1.0,   # 1.0 = perfectly even
+            "dead_workers": dict(sorted(self.dead.items())),              # worker -> exit code
+            "dropped_packets": self.dropped,
+            "errors": {i: stats["error"] for i, stats in sorted(self.latest.items()) if "error" in stats},
+            "per_worker": per_worker,
+        }
+
+
+def print_report(report):
+    print(f"🧵 {report['workers']} capture workers: {report['packets']} packets -> "
+          f"{report['connections']} connections in {report['elapsed_s']}s "
+          f"({report['packets_per_s']:,.0f} packets/s)")
+    if report["dispatch_packets_per_s"]:
+        print(f"   dispatcher (read + decode + hash): {report['dispatch_packets_per_s']:,.0f} packets/s")
+    for w in report["per_worker"]:
+        print(f"   worker {w['worker']}: {w['packets']:>8} packets ({w['share']:.1%}), "
+              f"{w['connections']:>7} connections, {w['packets_per_s']:>10,.0f} packets/s "
+              f"(capacity {w['busy_packets_per_s']:,.0f}/s busy), {w['sampled_out']} sampled out")
+    print(f"   imbalance (busiest / mean): {report['imbalance']}")
+    for worker, exitcode in report["dead_workers"].items():
+        print(f"   ⚠️ worker {worker} died with exit code {exitcode}")
+    if report["dropped_packets"]:
+        print(f"   ⚠️ {report['dropped_packets']} packets dropped for dead workers")
+    for worker, error in report["errors"].items():
+        print(f"   ⚠️ worker {worker} stopped on {error}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Multi-process capture sharded by flow hash")
+    parser.add_argument("pcap", nargs="?", help="replay this capture (default: sample capture)")
+    parser.add_argument("--live", action="store_true", help="capture live with AF_PACKET fanout (root)")
+    parser.add_argument("--iface", help="interface for --live (default: all)")
+    parser.add_argument("--duration", type=float, help="seconds of live capture (default: until Ctrl+C)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--send", metavar="HOST:PORT", help="forward connections to a dashboard")
+    parser.add_argument("--budget", type=int, help="load-shedding budget in new connections/s (all workers)")
+    args = parser.parse_args()
+
+    send_to = None
+    if args.send:
+        host, port = args.send.rsplit(":", 1)
+        send_to = (host, int(port))
+    capture = ShardedCapture(args.workers, send_to=send_to, flow_budget=args.budget)
+    if args.live:
+        print_report(capture.run_live(args.iface, args.duration))
+    else:
+        path = args.pcap
+        if path is None:
+            from pcap_replay import write_sample_capture
+            path = os.path.join(tempfile.gettempdir(), "cyberai_sample.pcap")
+            write_sample_capture(path)
+        print_report(capture.run_pcap(path))
@@ -1,27 +1,74 @@
 import threading
 import queue
 import time
-import numpy as np
+
+from flow_table import FlowTable
+from load_shedder import LoadShedder
+from packet_decoder import AfPacketSource, decode_frame
+from traffic_windows import TrafficWindows
 
 # Global pointer to scapy modules
 scapy_all = None
 
+def packet_fields(packet, sa):
+    """(src, dst, sport, dport, proto, payload_len, tcp_flags) of a scapy packet, None if not IP"""
+    if sa.IP not in packet:
+        return None
+    ip = packet[sa.IP]
+    sport = dport = flags = 0
+    if sa.TCP in packet:
+        layer = packet[sa.TCP]
+        sport, dport, flags = layer.sport, layer.dport, int(layer.flags)
+    elif sa.UDP in packet:
+        layer = packet[sa.UDP]
+        sport, dport = layer.sport, layer.dport
+    elif sa.ICMP in packet:
+        layer = packet[sa.ICMP]
+        sport, dport = layer.type, layer.code
+    else:
+        layer = ip
+    return ip.src, ip.dst, sport, dport, ip.proto, len(layer.payload), flags
+
 class PacketSniffer:
-    def __init__(self):
+    def __init__(self, flow_budget=5000):
         self.packet_queue = queue.Queue(maxsize=100)
         self.running = False
         self.sniffer_thread = None
-        self.connection_history = [] 
+        # Packets are folded into connections; one record per finished connection
+        # Overload: sample whole connections (counted), never drop silently
+        self.shedder = LoadShedder(flow_budget=flow_budget)
+        self.flows = FlowTable(windows=TrafficWindows(), shedder=self.shedder)
+        self.queue_dropped = 0
+        self._flow_lock = threading.Lock()
 
     def start(self):
         if self.running: return
         self.running = True
         self.sniffer_thread = threading.Thread(target=self._sniff_loop, daemon=True)
         self.sniffer_thread.start()
+        threading.Thread(target=self._expire_loop, daemon=True).start()
         print("🕵️ Packet Sniffer Started (Background)...")
 
     def _sniff_loop(self):
         global scapy_all
+        try:
+            # Linux: raw socket + struct decoder, no scapy dissection per packet
+            source = AfPacketSource()
+        except OSError:
+            source = None
+        if source is not None:
+            print("⚡ Capturing with AF_PACKET + struct decoder")
+            for ts, linktype, frame in source:
+                if not self.running:
+                    break
+                fields = decode_frame(linktype, frame)
+                if fields is not None:
+                    with self._flow_lock:
+                        self.flows.update(ts, *fields)
+                        self._publish()
+            source.close()
+            return
+
         print("⏳ Loading Scapy... (This may take a few seconds)")
         try:
             # Lazy Import to prevent startup freeze
@@ -35,81 +82,39 @@ class PacketSniffer:
             print(f"❌ Sniffer Error: {e}")
             self.running = False
 
+    def _expire_loop(self):
+        """UDP/ICMP connections (and silent TCP ones) only end by timing out"""
+        while self.running:
+            time.sleep(1.0)
+            with self._flow_lock:
+                self.flows.expire(time.time())
+                self._publish()
+
     def _process_packet(self, packet):
         if not self.running: return False
         
-        # Use local reference to avoid global lookup issues
-        IP = scapy_all.IP
-        TCP = scapy_all.TCP
-        UDP = scapy_all.UDP
-        
-        if IP in packet:
-            src_ip = packet[IP].src
-            dst_ip = packet[IP].dst
-            length = len(packet)
-            
-            # Protocol
-            protocol_type = "other"
-            if TCP in packet: protocol_type = "tcp"
-            elif UDP in packet: protocol_type = "udp"
-            
-            # Create a "Feature Vector" for the AI Model
-            # Note: Real ML models need 41 precise features. We will calculate real ones where possible
-            # and approximate complex time-based stats to keep the demo responsive.
-            
-            features = self._extract_features(packet, protocol_type, length)
-            
-            packet_data = {
-                "ip": src_ip,
-                "dst": dst_ip,
-                "proto": protocol_type,
-                "len": length,
-                "features": features
-            }
-            
+        fields = packet_fields(packet, scapy_all)
+        if fields is not None:
+            with self._flow_lock:
+                self.flows.update(time.time(), *fields)
+                self._publish()
+
+    def _publish(self):
+        """Queue finished connections for the consumer (drop oldest when full)"""
+        for record in self.flows.drain():
             if self.packet_queue.full():
-                try: self.packet_queue.get_nowait() # Drop oldest
-                except: pass
-                
-            self.packet_queue.put(packet_data)
+                try:
+                    self.packet_queue.get_nowait() # Drop oldest (counted)
+                    self.queue_dropped += 1
+                except queue.Empty: pass
+            self.packet_queue.put(record)
 
-    def _extract_features(self, packet, proto, length):
-        # Approximating KDDCup99 features from live packet
-        # [duration, protocol_type_int, service_int, flag_int, src_bytes, dst_bytes, ...]
-        
-        # 1. Basic Transformation
-        proto_map = {"tcp": 0, "udp": 1, "icmp": 2, "other": 3}
-        p_int = proto_map.get(proto, 3)
-        
-        # 2. Add to history for temporal features
-        now = time.time()
-        self.connection_history.append(now)
-        # Keep only last 2 seconds
-        self.connection_history = [t for t in self.connection_history if now - t < 2]
-        
-        # count (collisions in last 2 sec)
-        count = len(self.connection_history)
-        
-        # 3. Construct Feature Vector (41 dimensions)
-        # We fill unknown values with averages/zeros to satisfy the model input shape
-        features = [
-            0,              # duration (0 for single packet view)
-            p_int,          # protocol_type
-            0,              # service (http/ftp etc - complex to parse, default to 0)
-            0,              # flag (SF/S0 etc - default to Normal)
-            length,         # src_bytes
-            0,              # dst_bytes (unknown in single sniffer direction usually)
-            0,              # land
-            0,              # wrong_fragment
-            0,              # urgent
-        ]
-        
-        # Fill remaining 32 features with reasonable defaults or calculated temporal stats
-        # Indices 22 (count) and 23 (srv_count) are important
-        remaining = [0] * 32
-        remaining[13] = count # 'count' feature (index 22 in total list roughly)
-        
-        return features + remaining
+    def get_stats(self):
+        """Flow table, sampling and queue-drop counters"""
+        with self._flow_lock:
+            stats = self.flows.get_stats()
+        stats["queue_dropped"] = self.queue_dropped
+        return stats
 
     def get_packet(self):
         if not self.packet_queue.empty():
@@ -123,5 +128,6 @@ if __name__ == "__main__":
     while True:
         pkt = sniffer.get_packet()
         if pkt:
-            print(f"Captured: {pkt['ip']} -> {pkt['dst']} [{pkt['proto']}]")
+            print(f"Connection: {pkt['ip']}:{pkt['sport']} -> {pkt['dst']}:{pkt['dport']} "
+                  f"[{pkt['proto']}/{pkt['features'][2]}/{pkt['features'][3]}] {pkt['len']} bytes")
         time.sleep(0.1)
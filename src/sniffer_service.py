@@ -1,5 +1,4 @@
 import socket
-import json
 import time
 import threading
 import sys
@@ -12,61 +11,124 @@ DASHBOARD_PORT = 5005
 import os
 os.environ["PATH"] += os.pathsep + r"C:\Program Files\Npcap"
 
-print("🕵️ CyberAI Sniffer Service Starting...")
-print("Please wait while loading Network Drivers (Scapy/Npcap)...")
+if __name__ == "__main__":  # capture workers re-import this file
+    print("🕵️ CyberAI Sniffer Service Starting...")
 
-try:
-    from scapy.all import sniff, IP, TCP, UDP
-    print("✅ Drivers Loaded Successfully!")
-except ImportError:
-    print("❌ Error: Scapy not installed. Run 'pip install scapy'")
-    sys.exit(1)
-except Exception as e:
-    print(f"❌ Error loading Scapy: {e}")
-    sys.exit(1)
+# Capture backend: "afpacket" (Linux raw socket + struct decoder, no scapy
+# dissection) or "scapy" (Npcap on Windows, and the fallback everywhere)
+CAPTURE = os.environ.get("CYBERAI_CAPTURE") or ("afpacket" if hasattr(socket, "AF_PACKET") else "scapy")
+# > 1: that many capture processes sharded by flow hash (AF_PACKET fanout)
+CAPTURE_WORKERS = int(os.environ.get("CYBERAI_CAPTURE_WORKERS", 1))
+scapy = None
+
+def load_scapy():
+    global scapy
+    print("Please wait while loading Network Drivers (Scapy/Npcap)...")
+    try:
+        import scapy.all as sa
+        scapy = sa
+        print("✅ Drivers Loaded Successfully!")
+    except ImportError:
+        print("❌ Error: Scapy not installed. Run 'pip install scapy'")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error loading Scapy: {e}")
+        sys.exit(1)
+
+from flow_table import FlowTable
+from load_shedder import LoadShedder
+from packet_decoder import AfPacketSource, decode_frame
+from sniffer import packet_fields
+from traffic_windows import TrafficWindows
+from wire_protocol import WireSender
 
 # UDP Socket for sending data
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 sock.bind(('0.0.0.0', 0)) # Bind to ephemeral port explicitly for Windows compatibility
 
+# Connections go out batched in binary datagrams (CYBERAI_WIRE=json for the old format)
+wire = WireSender(sock, (DASHBOARD_IP, DASHBOARD_PORT), fmt=os.environ.get("CYBERAI_WIRE", "binary"))
+
+# Packets are folded into connections;
+# the dashboard gets one record (with the NSL-KDD feature vector) per
+# finished connection. Above CYBERAI_FLOW_BUDGET new connections/s, whole
+# connections are sampled out and only counted.
+shedder = LoadShedder(flow_budget=int(os.environ.get("CYBERAI_FLOW_BUDGET", 5000)))
+flows = FlowTable(windows=TrafficWindows(), shedder=shedder)
+flow_lock = threading.Lock()
+
+def send_connections():
+    """Forward every finished connection to the Dashboard"""
+    for record in flows.drain():
+        record["timestamp"] = record["end"]
+        wire.add(record)
+
+def expire_loop():
+    """UDP/ICMP connections (and silent TCP ones) only end by timing out"""
+    last_report = time.time()
+    while True:
+        time.sleep(wire.flush_interval)
+        now = time.time()
+        with flow_lock:
+            flows.expire(now)
+            send_connections()
+            wire.poll()
+        if now - last_report >= 10:
+            # One summary line instead of a print per connection, and the
+            # counters to the dashboard so unscored traffic is visible there
+            with flow_lock:
+                sensor = flows.get_stats()
+            sensor["wire"] = stats = wire.get_stats()
+            shed = sensor["shedding"]
+            print(f"📡 Sent {stats['records']} connections in {stats['datagrams']} datagrams "
+                  f"({stats['records_per_datagram']}/datagram), {sensor['active_flows']} active, "
+                  f"sample rate {shed['sample_rate']:.0%}, {shed['sampled_out_flows']} unscored")
+            wire.send_stats(sensor)
+            last_report = now
+
 def process_packet(packet):
-    """Extract features and send to Dashboard"""
-    if IP in packet:
-        try:
-            src_ip = packet[IP].src
-            dst_ip = packet[IP].dst
-            length = len(packet)
-            
-            protocol = "other"
-            if TCP in packet: protocol = "tcp"
-            elif UDP in packet: protocol = "udp"
-            
-            # Simplified feature extraction for JSON transport
-            # The complex feature vector construction will happen in app.py or here
-            # For now, we send raw attributes and let app.py map it for the AI model
-            
-            packet_data = {
-                "ip": src_ip,
-                "dst": dst_ip,
-                "proto": protocol,
-                "len": length,
-                "timestamp": time.time()
-            }
-            
-            print(f"📡 Sending: {src_ip} -> {dst_ip} [{protocol}]")
-            
-            # Send to Dashboard
-            message = json.dumps(packet_data).encode('utf-8')
-            sock.sendto(message, (DASHBOARD_IP, DASHBOARD_PORT))
-            
-        except Exception as e:
-            print(f"⚠️ Packet Error: {e}")
+    """Account the packet to its connection; send connections as they finish"""
+    try:
+        fields = packet_fields(packet, scapy)
+        if fields is not None:
+            with flow_lock:
+                flows.update(time.time(), *fields)
+                send_connections()
+    except Exception as e:
+        print(f"⚠️ Packet Error: {e}")
+
+def capture_raw(source):
+    """Fast path: decode headers straight from the raw frames"""
+    for ts, linktype, frame in source:
+        fields = decode_frame(linktype, frame)
+        if fields is not None:
+            with flow_lock:
+                flows.update(ts, *fields)
+                send_connections()
 
 def start_sniffing():
     print(f"🚀 Sniffer Active! Forwarding to {DASHBOARD_IP}:{DASHBOARD_PORT}")
+    threading.Thread(target=expire_loop, daemon=True).start()
     try:
+        if CAPTURE == "afpacket" and CAPTURE_WORKERS > 1:
+            from sharded_capture import ShardedCapture, print_report
+            print(f"🧵 Capturing with {CAPTURE_WORKERS} workers (flow-hash fanout)")
+            sharded = ShardedCapture(CAPTURE_WORKERS, send_to=(DASHBOARD_IP, DASHBOARD_PORT),
+                                     flow_budget=shedder.flow_budget)
+            print_report(sharded.run_live(os.environ.get("CYBERAI_IFACE")))
+            return
+        if CAPTURE == "afpacket":
+            try:
+                source = AfPacketSource(os.environ.get("CYBERAI_IFACE"))
+            except OSError as e:
+                print(f"⚠️ Raw socket capture unavailable ({e}), falling back to Scapy")
+            else:
+                print("⚡ Capturing with AF_PACKET + struct decoder")
+                capture_raw(source)
+                return
+        load_scapy()
         # Filter for IP traffic
-        sniff(filter="ip", prn=process_packet, store=0)
+        scapy.sniff(filter="ip", prn=process_packet, store=0)
     except KeyboardInterrupt:
         print("\n🛑 Sniffer Stopped.")
         sys.exit(0)
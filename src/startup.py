@@ -0,0 +1,79 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTracker:
+    """
+    ⏱️ STARTUP TRACKER
+    ==================
+    Records how long each startup phase takes (relative to `t0`) and which
+    background components are ready, so the server can answer requests
+    immediately and report readiness separately.
+    """
+
+    def __init__(self, t0, required=("detector",)):
+        self.t0 = t0
+        self.required = tuple(required)
+        self.phases = {}                # name -> (start_ms, duration_ms)
+        self.components = {}            # name -> "pending" | "ready" | "failed: ..."
+        self.first_response_ms = None
+        self._lock = threading.Lock()
+
+    def _ms(self, t):
+        return round((t - self.t0) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_phase(name, start, time.perf_counter())
+
+    def record_phase(self, name, start, end):
+        """Record a phase timed elsewhere (perf_counter() values), e.g. module imports"""
+        with self._lock:
+            self.phases[name] = (self._ms(start), round((end - start) * 1000, 1))
+
+    def pending(self, component):
+        with self._lock:
+            self.components[component] = "pending"
+
+    def ready(self, component):
+        with self._lock:
+            self.components[component] = "ready"
+
+    def failed(self, component, error):
+        with self._lock:
+            self.components[component] = f"failed: {error}"
+
+    def is_ready(self, component=None):
+        names = (component,) if component else self.required
+        with self._lock:
+            return all(self.components.get(name) == "ready" for name in names)
+
+    def first_response(self):
+        if self.first_response_ms is None:
+            self.first_response_ms = self._ms(time.perf_counter())
+
+    def report(self):
+        with self._lock:
+            return {
+                "ready": all(self.components.get(name) == "ready" for name in self.required),
+                "uptime_ms": self._ms(time.perf_counter()),
+                "time_to_first_response_ms": self.first_response_ms,
+                "components": dict(self.components),
+                "phases": [
+                    {"phase": name, "start_ms": start, "duration_ms": duration}
+                    for name, (start, duration) in sorted(self.phases.items(), key=lambda kv: kv[1][0])
+                ],
+            }
+
+    def print_report(self):
+        report = self.report()
+        print("⏱️  Startup timing (ms since process start):")
+        for p in report["phases"]:
+            print(f"   {p['phase']:<18} starts {p['start_ms']:8.1f}  takes {p['duration_ms']:8.1f}")
+        if report["time_to_first_response_ms"] is not None:
+            print(f"   first response at {report['time_to_first_response_ms']:.1f}")
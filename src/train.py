@@ -299,27 +299,14 @@ sample_connection = {
     'dst_host_srv_rerror_rate': 0.0
 }
 
-# Convert to DataFrame
-sample_df = pd.DataFrame([sample_connection])
+# Score it through the same pipeline the detector uses:
+# category strings -> codes (unknown -> -1), scaling, then the model
+from pipeline import InferencePipeline
+pipeline = InferencePipeline.from_sklearn(scaler, label_encoders, features, best_model)
 
-# Encode categorical variables
-for col in categorical_cols:
-    if col in sample_df.columns:
-        # Use the encoder we already trained
-        if col in label_encoders:
-            try:
-                sample_df[col] = label_encoders[col].transform(sample_df[col])
-            except:
-                # If new category, assign -1
-                sample_df[col] = -1
-
-# Select same features and scale
-sample_features = sample_df[features]
-sample_scaled = scaler.transform(sample_features)
-
-# Predict
-prediction = best_model.predict(sample_scaled)
-probability = best_model.predict_proba(sample_scaled)[0]
+attack_probability = pipeline.attack_proba(sample_connection)[0]
+probability = [1 - attack_probability, attack_probability]
+prediction = [int(attack_probability > 0.5)]
 
 print(f"\n🔮 Prediction for sample connection:")
 print(f"   - Probability of being NORMAL: {probability[0]:.4f}")
@@ -351,9 +338,21 @@ joblib.dump(scaler, scaler_filename)
 encoders_filename = 'models/encoders.pkl'
 joblib.dump(label_encoders, encoders_filename)
 
+# Save the versioned bundle (model + preprocessing + schema, memory-mappable arrays)
+from model_bundle import save_bundle
+manifest = save_bundle(
+    best_model, scaler, label_encoders, features, 'models/bundle',
+    metadata={
+        "dataset": "NSL-KDD KDDTrain+",
+        "train_rows": int(X_train.shape[0]),
+        "test_accuracy": float(accuracy)
+    }
+)
+
 print(f"✅ Model saved to: {model_filename}")
 print(f"✅ Scaler saved to: {scaler_filename}")
 print(f"✅ Encoders saved to: {encoders_filename}")
+print(f"✅ Bundle saved to: models/bundle (version {manifest['version']})")
 
 # ======================
 # FINAL STEP: SUMMARY
@@ -379,6 +378,7 @@ print("   - plots/model_evaluation.png")
 print("   - models/best_model.pkl (your AI model!)")
 print("   - models/scaler.pkl")
 print("   - models/encoders.pkl")
+print("   - models/bundle/ (versioned model bundle)")
 
 print("\n🚀 NEXT STEPS:")
 print("1. Run: python simple_detector.py (again to see it work)")
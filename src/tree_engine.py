@@ -0,0 +1,309 @@
+import os
+
+import numpy as np
+
+
+class CompiledTrees:
+    """
+    ⚡ FLAT-ARRAY TREE GROUP
+    ========================
+    A set of decision trees packed into shared node arrays
+    (feature, threshold, left, value). Nodes are renumbered so the right
+    child always sits at left + 1, and leaves point to themselves, so a
+    batch can walk every tree in lock-step for `depth` steps.
+    """
+
+    def __init__(self, feature, threshold, left, value, roots, depth, missing_right=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.missing_right = missing_right
+
+    @staticmethod
+    def _sibling_order(tree):
+        """Breadth-first node order in which every pair of children is adjacent"""
+        order = [0]
+        for node in order:
+            if tree.children_left[node] != -1:
+                order.append(tree.children_left[node])
+                order.append(tree.children_right[node])
+        return np.asarray(order, dtype=np.intp)
+
+    @staticmethod
+    def _floor_float32(threshold):
+        """Largest float32 <= threshold, so float32 compares match sklearn's float64 ones"""
+        t32 = threshold.astype(np.float32)
+        over = t32.astype(np.float64) > threshold
+        t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+        return t32
+
+    @classmethod
+    def from_estimators(cls, estimators, leaf_value):
+        """Pack fitted sklearn trees; leaf_value(tree_) -> per-node output"""
+        features, thresholds, lefts, values, missing = [], [], [], [], []
+        roots = []
+        depth = 0
+        offset = 0
+        for est in estimators:
+            tree = est.tree_
+            order = cls._sibling_order(tree)
+            n = order.size
+            new_id = np.empty(n, dtype=np.intp)
+            new_id[order] = np.arange(n)
+
+            is_leaf = tree.children_left[order] == -1
+            own = np.arange(offset, offset + n)
+            first_child = new_id[np.where(is_leaf, order, tree.children_left[order])] + offset
+
+            features.append(np.where(is_leaf, 0, tree.feature[order]).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            lefts.append(np.where(is_leaf, own, first_child).astype(np.intp))
+            values.append(np.asarray(leaf_value(tree), dtype=np.float64)[order])
+            mgl = getattr(tree, 'missing_go_to_left', None)
+            go_right = np.zeros(n, dtype=bool) if mgl is None else ~np.asarray(mgl, dtype=bool)[order]
+            missing.append(go_right & ~is_leaf)
+
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            offset += n
+
+        missing = np.concatenate(missing)
+        return cls(
+            feature=np.concatenate(features),
+            threshold=cls._floor_float32(np.concatenate(thresholds)),
+            left=np.concatenate(lefts),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth,
+            missing_right=missing if missing.any() else None,
+        )
+
+    def leaf_values(self, X, n_trees=None):
+        """Return the (n_rows, n_trees) leaf outputs for float32 input X (first n_trees trees only if given)"""
+        n, n_features = X.shape
+        flat = X.ravel()
+        base = (np.arange(n, dtype=np.intp) * n_features)[:, None]
+        roots = self.roots if n_trees is None else self.roots[:n_trees]
+        node = np.broadcast_to(roots, (n, roots.size))
+        check_nan = self.missing_right is not None and np.isnan(flat).any()
+
+        for _ in range(self.depth):
+            x = flat[base + self.feature[node]]
+            # NaN compares False, i.e. goes left unless the split sends missing values right
+            step = x > self.threshold[node]
+            if check_nan:
+                step |= np.isnan(x) & self.missing_right[node]
+            node = self.left[node] + step
+
+        return self.value[node]
+
+    def arrays(self, prefix):
+        out = {
+            f'{prefix}feature': self.feature,
+            f'{prefix}threshold': self.threshold,
+            f'{prefix}left': self.left,
+            f'{prefix}value': self.value,
+            f'{prefix}roots': self.roots,
+            f'{prefix}depth': np.asarray(self.depth),
+        }
+        if self.missing_right is not None:
+            out[f'{prefix}missing_right'] = self.missing_right
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        return cls(
+            feature=arrays[f'{prefix}feature'],
+            threshold=arrays[f'{prefix}threshold'],
+            left=arrays[f'{prefix}left'],
+            value=arrays[f'{prefix}value'],
+            roots=arrays[f'{prefix}roots'],
+            depth=arrays[f'{prefix}depth'].item(),
+            missing_right=arrays[f'{prefix}missing_right'] if f'{prefix}missing_right' in arrays else None,
+        )
+
+
+class CompiledEnsemble:
+    """
+    🚀 COMPILED INFERENCE ENGINE
+    ============================
+    Drop-in replacement for predict_proba of the trained ensemble:
+    - RandomForest members: mean of per-tree class-1 fractions
+    - GradientBoosting members: sigmoid(init + learning_rate * sum(leaves))
+    - Soft voting: weighted mean of member probabilities
+    """
+
+    # member kinds
+    FOREST = 'forest'
+    BOOSTING = 'boosting'
+
+    def __init__(self, members, weights, n_features):
+        self.members = members          # list of (kind, CompiledTrees, bias)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        if len(self.weights) != len(members):
+            raise ValueError(f"{len(members)} ensemble members but {len(self.weights)} weights")
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return int(sum(trees.roots.size for _, trees, _ in self.members))
+
+    def _prepare(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        return X
+
+    def _member_proba(self, X, index, n_trees=None):
+        kind, trees, bias = self.members[index]
+        leaves = trees.leaf_values(X, n_trees)
+        if kind == self.FOREST:
+            return leaves.sum(axis=1) / leaves.shape[1]
+        return 1.0 / (1.0 + np.exp(-(bias + leaves.sum(axis=1))))
+
+    def member_proba(self, X, index, n_trees=None):
+        """Class-1 probability from member `index` alone (optionally only its first n_trees trees)"""
+        return self._member_proba(self._prepare(X), index, n_trees)
+
+    def member_cost(self, index):
+        """Relative per-row cost of a member: node visits for a full walk"""
+        _, trees, _ = self.members[index]
+        return trees.roots.size * trees.depth
+
+    def predict_attack_proba(self, X, known=None):
+        """
+        Class-1 (attack) probability for each row of X. `known` maps member
+        index -> that member's probabilities when they were already computed.
+        """
+        X = self._prepare(X)
+        known = known or {}
+        proba = np.zeros(X.shape[0], dtype=np.float64)
+        for index, weight in enumerate(self.weights):
+            p = known[index] if index in known else self._member_proba(X, index)
+            proba += weight * p
+        return proba / self.weights.sum()
+
+    def predict_proba(self, X):
+        p = self.predict_attack_proba(X)
+        return np.column_stack([1.0 - p, p])
+
+    def save(self, path):
+        """Write one .npy per array into directory `path` (mmap-able on load)"""
+        arrays = {
+            'weights': self.weights,
+            'n_features': np.asarray(self.n_features),
+            'kinds': np.asarray([kind for kind, _, _ in self.members]),
+            'biases': np.asarray([bias for _, _, bias in self.members], dtype=np.float64),
+        }
+        for i, (_, trees, _) in enumerate(self.members):
+            arrays.update(trees.arrays(f'm{i}_'))
+        os.makedirs(path, exist_ok=True)
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(arr))
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Load a saved directory; mmap_mode='r' shares node arrays between processes"""
+        # asarray drops the memmap subclass (cheaper indexing) but keeps the mapping
+        arrays = {
+            name[:-4]: np.asarray(np.load(os.path.join(path, name), mmap_mode=mmap_mode))
+            for name in os.listdir(path) if name.endswith('.npy')
+        }
+        members = [
+            (str(kind), CompiledTrees.from_arrays(arrays, f'm{i}_'), float(bias))
+            for i, (kind, bias) in enumerate(zip(arrays['kinds'], arrays['biases']))
+        ]
+        return cls(members, np.array(arrays['weights']), arrays['n_features'].item())
+
+
+def _forest_member(forest):
+    # tree_.value holds class fractions (sklearn >= 1.4) or weighted counts: normalize both
+    def leaf_value(tree):
+        value = tree.value[:, 0, :]
+        return value[:, 1] / value.sum(axis=1)
+    return (CompiledEnsemble.FOREST, CompiledTrees.from_estimators(forest.estimators_, leaf_value), 0.0)
+
+
+def _boosting_member(gb):
+    if gb.estimators_.shape[1] != 1:
+        raise ValueError("Only binary GradientBoostingClassifier models can be compiled")
+    lr = gb.learning_rate
+    trees = CompiledTrees.from_estimators(gb.estimators_[:, 0], lambda tree: lr * tree.value[:, 0, 0])
+
+    # Recover the constant init score through the public API
+    x0 = np.zeros((1, gb.n_features_in_))
+    raw = float(np.ravel(gb.decision_function(x0))[0])
+    bias = raw - float(trees.leaf_values(x0.astype(np.float32)).sum())
+    return (CompiledEnsemble.BOOSTING, trees, bias)
+
+
+def _member(model):
+    from sklearn.ensemble import (ExtraTreesClassifier, GradientBoostingClassifier,
+                                  RandomForestClassifier)
+
+    if list(model.classes_) != [0, 1]:
+        raise ValueError(f"Expected binary classes [0, 1], got {list(model.classes_)}")
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier)):
+        return _forest_member(model)
+    if isinstance(model, GradientBoostingClassifier):
+        if model.init_ not in ('zero',) and type(model.init_).__name__ != 'DummyClassifier':
+            raise ValueError("Custom GradientBoosting init estimators cannot be compiled")
+        return _boosting_member(model)
+    raise ValueError(f"Unsupported estimator: {type(model).__name__}")
+
+
+def compile_model(model):
+    """Compile a fitted RF / GB / soft-voting ensemble into a CompiledEnsemble"""
+    from sklearn.ensemble import VotingClassifier
+
+    if isinstance(model, VotingClassifier):
+        if model.voting != 'soft':
+            raise ValueError("Only soft-voting ensembles can be compiled")
+        if list(model.le_.classes_) != [0, 1]:
+            raise ValueError(f"Expected binary classes [0, 1], got {list(model.le_.classes_)}")
+        members = [_member(est) for est in model.estimators_]
+        weights = model.weights if model.weights is not None else [1.0] * len(model.estimators)
+        # Dropped ('drop') estimators are absent from estimators_, keep weights aligned
+        weights = [w for (_, est), w in zip(model.estimators, weights) if est != 'drop']
+    else:
+        members = [_member(model)]
+        weights = [1.0]
+
+    return CompiledEnsemble(members, weights, model.n_features_in_)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import joblib
+
+    src = sys.argv[1] if len(sys.argv) > 1 else 'models/best_model.pkl'
+    dst = sys.argv[2] if len(sys.argv) > 2 else 'models/compiled'
+
+    print(f"⚙️  Compiling {src} ...")
+    model = joblib.load(src)
+    compiled = compile_model(model)
+    compiled.save(dst)
+    print(f"✅ {compiled.n_trees} trees packed into {dst}")
+
+    # Parity + latency check against sklearn
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(1000, compiled.n_features))
+    diff = np.abs(model.predict_proba(X)[:, 1] - compiled.predict_attack_proba(X)).max()
+    print(f"📐 Max |sklearn - compiled| probability difference: {diff:.2e}")
+
+    for batch in (1, 16, 1000):
+        Xb = X[:batch]
+        for name, fn in (("sklearn", lambda: model.predict_proba(Xb)),
+                         ("compiled", lambda: compiled.predict_attack_proba(Xb))):
+            reps = 20
+            start = time.perf_counter()
+            for _ in range(reps):
+                fn()
+            ms = (time.perf_counter() - start) / reps * 1000
+            print(f"   batch={batch:<5} {name:<9} {ms:8.3f} ms/call")
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+import numpy as np
+
+
+class VerdictCache:
+    """
+    🧠 VERDICT CACHE
+    ================
+    Maps quantized feature vectors to model attack probabilities.
+    - quantum: None for exact matching, or a step (scalar or per-feature
+      array) that feature values are rounded to before hashing
+    - bounded by `max_size` entries (LRU) and `ttl` seconds per entry
+    - cleared whenever the model or threshold it was filled under changes
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0, quantum=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.quantum = None if quantum is None else np.asarray(quantum, dtype=np.float64)
+
+        self._entries = OrderedDict()     # key -> (probability, expires_at)
+        self._lock = threading.Lock()
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0                # misses answered by a duplicate row in the same batch
+        self.stale_writes = 0             # put_many() calls dropped for an outdated generation
+
+    def keys_for(self, X):
+        """One 16-byte digest per row of X"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.quantum is None:
+            # + 0.0 folds -0.0 into 0.0 so equal values hash equally
+            Q = np.ascontiguousarray(X + 0.0)
+        else:
+            Q = np.ascontiguousarray(np.round(X / self.quantum).astype(np.int64))
+        return [blake2b(row.tobytes(), digest_size=16).digest() for row in Q]
+
+    def sync(self, generation):
+        """Drop every entry if the (model, threshold) generation changed"""
+        with self._lock:
+            if generation != self._generation:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._generation = generation
+
+    def get_many(self, keys):
+        """Cached probability per key (None on miss)"""
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    out.append(entry[0])
+        return out
+
+    def put_many(self, keys, probabilities, generation=None):
+        """
+        Store scored rows. With `generation`, the write is dropped if the
+        cache has moved on since (a request that started on the old model
+        finishing after a hot reload must not fill the new generation).
+        """
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self.stale_writes += 1
+                return False
+            for key, prob in zip(keys, probabilities):
+                self._entries[key] = (prob, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def note_coalesced(self, count):
+        with self._lock:
+            self.coalesced += count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "model_skip_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_writes": self.stale_writes,
+            }
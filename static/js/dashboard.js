@@ -179,6 +179,10 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function formatLocation(geo) {
+        return geo && geo.city !== 'Unknown' ? `[${geo.city}, ${geo.country}]` : '';
+    }
+
     function addLogEntry(data) {
         clientLogs.push(data);
         if(clientLogs.length > 50) clientLogs.shift();
@@ -189,9 +193,9 @@ document.addEventListener('DOMContentLoaded', function() {
         div.className = `log-entry ${data.result.is_attack ? 'attack' : 'normal'}`;
         
         const sourceBadge = data.source === "REAL" ? '<span class="badge-real">LIVE</span>' : '';
-        const loc = data.geo.city !== 'Unknown' ? `[${data.geo.city}, ${data.geo.country}]` : '';
-        
-        div.innerHTML = `<span class="log-time">[${data.timestamp}]</span> <span class="log-ip">${sourceBadge} ${data.ip}</span> <span class="log-msg">${loc} ${data.result.message}</span>`;
+        if (data.source === "REAL") div.dataset.eventId = data.id;
+
+        div.innerHTML = `<span class="log-time">[${data.timestamp}]</span> <span class="log-ip">${sourceBadge} ${data.ip}</span> <span class="log-msg"><span class="log-loc">${formatLocation(data.geo)}</span> ${data.result.message}</span>`;
         consoleWindow.insertBefore(div, consoleWindow.firstChild);
         if (consoleWindow.children.length > 50) consoleWindow.removeChild(consoleWindow.lastChild);
     }
@@ -208,11 +212,53 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // --- API POLLING ---
+    // Sensor traffic is scored continuously server-side; the dashboard only
+    // reads the newest events. Simulated traffic fills in only while no sensor is sending.
+    // Events arrive with geo pending; a later poll brings the same id with its location.
+    const SENSOR_QUIET_S = 10;
+    let lastLiveSeq = 0;
+    function sensorsQuiet(pipeline) {
+        return !pipeline || pipeline.idle_s === null || pipeline.idle_s > SENSOR_QUIET_S;
+    }
+
+    function fetchLive() {
+        fetch('/api/live?since=' + lastLiveSeq + '&limit=20')
+            .then(r => r.json())
+            .then(data => {
+                if (!data) return;
+                // Server restarted: its sequence numbers start over
+                if (data.last_seq < lastLiveSeq) {
+                    lastLiveSeq = 0;
+                    consoleWindow.querySelectorAll('[data-event-id]').forEach(el => delete el.dataset.eventId);
+                }
+                const events = data.events || [];
+                if (events.length === 0) {
+                    if (sensorsQuiet(data.pipeline)) fetchSimulation();
+                    return;
+                }
+                lastLiveSeq = data.last_seq;
+                const fresh = [];
+                events.forEach(event => {
+                    const shown = consoleWindow.querySelector(`[data-event-id="${event.id}"] .log-loc`);
+                    if (shown) {
+                        shown.innerText = formatLocation(event.geo);
+                        return;
+                    }
+                    fresh.push(event);
+                    addLogEntry(event);
+                    updateChart(event.result.attack_probability);
+                });
+                // A poll with only geo updates is still sensor traffic: no simulation
+                if (fresh.length) drawMap(fresh.some(event => event.result.is_attack));
+            })
+            .catch(err => console.error("📡 Live API Error:", err));
+    }
+
     function fetchSimulation() {
         fetch('/api/simulate')
             .then(r => r.json())
             .then(data => {
-                if(data.status === 'idle') return;
+                if(data.status === 'idle' || data.status === 'starting') return;
                 addLogEntry(data);
                 updateChart(data.result.attack_probability);
                 drawMap(data.result.is_attack);
@@ -310,7 +356,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // --- FIREWALL ---
     window.addRule = function(type) {
         const ip = document.getElementById('rule-ip').value.trim();
-        if (!ip.match(/^\d+\.\d+\.\d+\.\d+$/)) return alert("Invalid IP");
+        // IPv4/IPv6 address or CIDR prefix (e.g. 10.0.0.0/8); the server does the strict check
+        if (!ip.match(/^[0-9a-fA-F:.]+(\/\d{1,3})?$/)) return alert("Invalid IP or CIDR");
         
         fetch('/api/rules/update', {
             method: 'POST',
@@ -320,6 +367,8 @@ document.addEventListener('DOMContentLoaded', function() {
             if(data.status === 'ok') {
                 document.getElementById('rule-ip').value = '';
                 updateRulesList(data.rules);
+            } else {
+                alert(data.message);
             }
         });
     }
@@ -348,10 +397,20 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     // --- INITIALIZATION ---
-    fetch('/api/rules').then(r => r.json()).then(updateRulesList);
+    function loadRules() {
+        fetch('/api/rules')
+            .then(r => r.json())
+            .then(data => {
+                // Detector still loading in the background: try again shortly
+                if (data.status === 'starting') return setTimeout(loadRules, 1000);
+                updateRulesList(data);
+            })
+            .catch(err => console.error("📡 Rules API Error:", err));
+    }
+    loadRules();
     
     console.log("⏱️ Starting Intervals...");
-    setInterval(fetchSimulation, 1000); 
+    setInterval(fetchLive, 1000);
     setInterval(updateStats, 2000);
     console.log("✨ Dashboard Fully Initialized");
 });
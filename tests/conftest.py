@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules in src/ import each other flatly (as app.py sets up)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
@@ -0,0 +1,70 @@
+import pytest
+
+from event_store import EventStore, decode_cursor, verdict_rows
+
+
+@pytest.fixture
+def store(tmp_path):
+    return EventStore(str(tmp_path / "events.db"), max_age=None, max_bytes=None)
+
+
+def results(n, attack_every=3):
+    return [{"is_attack": i % attack_every == 0, "attack_probability": 0.9 if i % attack_every == 0 else 0.1,
+             "alert_level": "HIGH" if i % attack_every == 0 else "LOW"} for i in range(n)]
+
+
+def test_pages_cover_every_row_once_newest_first(store):
+    for t in range(10):
+        # Ten rows share each timestamp: the cursor must break ties by id
+        store.append(verdict_rows(results(10), [f"10.0.0.{i}" for i in range(10)], "live", ts=1000.0 + t))
+    store.flush()
+    seen, cursor = [], None
+    while True:
+        page = store.query(limit=7, cursor=cursor)
+        seen += [(e["ts"], e["id"]) for e in page["events"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 100
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_filters(store):
+    store.append(verdict_rows(results(6), ["10.0.0.1", "10.0.0.2"] * 3, "live", ts=1000.0))
+    store.append(verdict_rows(results(6), ["10.0.0.1", "10.0.0.2"] * 3, "live", ts=2000.0))
+    store.flush()
+    assert {e["ip"] for e in store.query(ip="10.0.0.1")["events"]} == {"10.0.0.1"}
+    assert len(store.query(ip="10.0.0.1")["events"]) == 6
+    assert {e["ts"] for e in store.query(since=1500.0)["events"]} == {2000.0}
+    assert {e["ts"] for e in store.query(until=1500.0)["events"]} == {1000.0}
+    attacks = store.query(attacks_only=True)["events"]
+    assert attacks and all(e["is_attack"] and e["attack_type"] is None for e in attacks)
+
+
+def test_verdict_rows_skip_errors_and_keep_attack_type_on_attacks():
+    rows = verdict_rows([{"is_attack": True}, {"is_attack": False}, {"error": "bad row"}],
+                        ["1.1.1.1", "2.2.2.2", "3.3.3.3"], "upload", attack_type="DoS", ts=5.0)
+    assert [(r[1], r[4], r[5]) for r in rows] == [("1.1.1.1", "DoS", 1), ("2.2.2.2", None, 0)]
+
+
+def test_retention_by_age(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"), max_age=100, max_bytes=None)
+    store.append(verdict_rows(results(5), ["10.0.0.1"] * 5, "live", ts=1000.0))
+    store.append(verdict_rows(results(5), ["10.0.0.1"] * 5, "live", ts=1200.0))
+    store.flush()
+    assert store.prune(now=1250.0) == 5
+    assert {e["ts"] for e in store.query()["events"]} == {1200.0}
+
+
+def test_full_queue_drops_whole_batches(store):
+    store._thread = object()                 # no writer: the queue only fills
+    rows = verdict_rows(results(3), ["10.0.0.1"] * 3, "live", ts=1.0)
+    accepted = [store.append(rows) for _ in range(store._queue.maxsize + 2)]
+    assert accepted.count(False) == 2
+    assert store.get_stats()["dropped"] == 6
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "1.5:x"])
+def test_bad_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,31 @@
+import threading
+
+from live_pipeline import DetectionPipeline
+
+
+def test_stats_are_safe_while_geo_waiters_change():
+    pipeline = DetectionPipeline(lambda: None)
+    stop = threading.Event()
+    errors = []
+
+    def enrichment():
+        # What _enrich_run / _geo_resolved do, under the same lock
+        i = 0
+        while not stop.is_set():
+            with pipeline._events_lock:
+                pipeline._geo_waiting.setdefault(f"10.0.{i % 2000}", []).append({})
+                pipeline._geo_waiting.pop(f"10.0.{(i + 1000) % 2000}", None)
+            i += 1
+
+    thread = threading.Thread(target=enrichment)
+    thread.start()
+    try:
+        for _ in range(3000):
+            try:
+                assert pipeline.get_stats()["geo_pending"] >= 0
+            except RuntimeError as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
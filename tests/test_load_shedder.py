@@ -0,0 +1,31 @@
+from load_shedder import LoadShedder, simulate_flood
+
+
+def test_new_attacker_is_scored_during_a_spoofed_flood():
+    offered, scored = simulate_flood(LoadShedder(flow_budget=2000))
+    rate = {kind: scored[kind] / offered[kind] for kind in offered}
+    assert rate["flood"] < 0.15
+    assert rate["normal"] > 0.5
+    # The brute-force source keeps its allowance although spoofed addresses repeat
+    assert rate["brute"] > 0.4
+    assert rate["brute"] > 4 * rate["flood"]
+
+
+def test_sampled_out_connection_stays_out():
+    # Admitted flows live in the FlowTable; the shedder remembers the rejected ones
+    shedder = LoadShedder(flow_budget=10, new_source_share=0.0)
+    rejected = set()
+    for i in range(1000):
+        key = ("10.0.0.1", 1024 + i % 50)
+        if not shedder.admit(1000.0 + i / 1000, key, "10.0.0.1", 0):
+            rejected.add(key)
+    assert rejected
+    assert not any(shedder.admit(1001.0, key, "10.0.0.1", 0) for key in rejected)
+
+
+def test_sampled_out_traffic_is_accounted():
+    shedder = LoadShedder(flow_budget=10, new_source_share=0.0)
+    admitted = sum(shedder.admit(1000.0 + i / 1000, ("10.0.0.1", i), "10.0.0.1", 100) for i in range(1000))
+    stats = shedder.get_stats()
+    assert admitted + stats["sampled_out_flows"] == stats["offered_flows"] == 1000
+    assert stats["sampled_out_bytes"] == 100 * stats["sampled_out_packets"]
@@ -0,0 +1,120 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from pcap_io import LINKTYPE_ETHERNET, PcapError, PcapWriter, read_packets
+from pcap_replay import PcapReplay, _frame
+from wire_protocol import WireReceiver, WireSender
+
+FRAME = _frame("10.0.0.1", "192.168.1.20", 40000, 80, 0x02)
+
+
+def shb():
+    return struct.pack("<IIIHHq", 0x0A0D0D0A, 28, 0x1A2B3C4D, 1, 0, -1) + struct.pack("<I", 28)
+
+
+def block(btype, body):
+    length = 12 + len(body)
+    return struct.pack("<II", btype, length) + body + struct.pack("<I", length)
+
+
+def idb():
+    return block(1, struct.pack("<HHI", LINKTYPE_ETHERNET, 0, 65535))
+
+
+def epb(frame, ts_us=1_700_000_000_000_000):
+    body = struct.pack("<IIIII", 0, ts_us >> 32, ts_us & 0xFFFFFFFF, len(frame), len(frame))
+    return block(6, body + frame + b"\0" * (-len(frame) % 4))
+
+
+def write(tmp_path, data, name="capture.pcapng"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_pcap_round_trip(tmp_path):
+    path = str(tmp_path / "capture.pcap")
+    with PcapWriter(path) as writer:
+        writer.write(1.5, FRAME)
+        writer.write(2.25, FRAME)
+    packets = list(read_packets(path))
+    assert [(ts, linktype, frame) for ts, linktype, frame in packets] == \
+        [(1.5, LINKTYPE_ETHERNET, FRAME), (2.25, LINKTYPE_ETHERNET, FRAME)]
+
+
+def test_pcapng_enhanced_packets(tmp_path):
+    path = write(tmp_path, shb() + idb() + epb(FRAME) + epb(FRAME, 1_700_000_001_000_000))
+    packets = list(read_packets(path))
+    assert [frame for _, _, frame in packets] == [FRAME, FRAME]
+    assert packets[1][0] - packets[0][0] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("corrupt", [
+    struct.pack("<II", 6, 4) + b"x" * 64,           # block length below the header size
+    struct.pack("<II", 6, 14) + b"x" * 64,          # not a multiple of 4
+    struct.pack("<II", 6, 1 << 30) + b"x" * 64,     # absurd length
+    block(6, b"\0" * 8),                            # EPB too short for its fixed fields
+    block(1, b"\0" * 4),                            # IDB too short
+    block(3, b""),                                  # SPB too short
+])
+def test_corrupt_pcapng_blocks_raise_pcap_error(tmp_path, corrupt):
+    path = write(tmp_path, shb() + idb() + epb(FRAME) + corrupt)
+    packets = read_packets(path)
+    assert next(packets)[2] == FRAME
+    with pytest.raises(PcapError):
+        next(packets)
+
+
+def test_corrupt_section_header(tmp_path):
+    path = write(tmp_path, struct.pack("<III", 0x0A0D0D0A, 8, 0x1A2B3C4D) + b"\0" * 32)
+    with pytest.raises(PcapError):
+        list(read_packets(path))
+
+
+def test_oversized_pcap_record(tmp_path):
+    path = str(tmp_path / "capture.pcap")
+    with PcapWriter(path) as writer:
+        writer.write(1.0, FRAME)
+        writer.f.write(struct.pack("<IIII", 2, 0, 1 << 30, 1 << 30))
+    packets = read_packets(path)
+    next(packets)
+    with pytest.raises(PcapError):
+        next(packets)
+
+
+def test_not_a_capture(tmp_path):
+    with pytest.raises(PcapError):
+        list(read_packets(write(tmp_path, b"hello world, not a capture at all")))
+
+
+def test_replay_reports_what_it_read_before_a_corrupt_block(tmp_path):
+    path = write(tmp_path, shb() + idb() + epb(FRAME) + block(6, b"\0" * 8))
+    report = PcapReplay(path).run()
+    assert report["packets"] == 1
+    assert "corrupt pcapng block" in report["read_error"]
+
+
+def test_paced_replay_sends_partial_datagrams_during_quiet_stretches(tmp_path):
+    path = str(tmp_path / "quiet.pcap")
+    with PcapWriter(path, LINKTYPE_ETHERNET) as writer:
+        writer.write(0.0, _frame("10.0.0.5", "192.168.1.20", 40000, 80, 0x02))
+        writer.write(0.05, _frame("192.168.1.20", "10.0.0.5", 80, 40000, 0x12))
+        writer.write(0.1, _frame("10.0.0.5", "192.168.1.20", 40000, 80, 0x04))
+        writer.write(3.0, _frame("10.0.0.6", "192.168.1.20", 40001, 80, 0x02))
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0))
+    rx.settimeout(5)
+    sender = WireSender(tx, rx.getsockname())
+    started = time.monotonic()
+    threading.Thread(target=PcapReplay(path, sender=sender, speed=1.0).run, daemon=True).start()
+    try:
+        data, _ = rx.recvfrom(65535)
+    finally:
+        rx.close()
+    assert time.monotonic() - started < 2.0   # not held until the packet at 3 s
+    assert len(WireReceiver().decode(data)) == 1
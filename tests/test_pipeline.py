@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from model_bundle import NSL_KDD_FEATURES
+from pipeline import InferencePipeline
+
+CATEGORIES = {
+    'protocol_type': ['icmp', 'tcp', 'udp'],
+    'service': ['ftp', 'http', 'private', 'telnet'],
+    'flag': ['REJ', 'S0', 'SF'],
+}
+
+
+@pytest.fixture
+def pipeline():
+    return InferencePipeline(NSL_KDD_FEATURES, CATEGORIES)
+
+
+def test_numeric_shapes(pipeline):
+    assert pipeline.encode(np.zeros(41)).shape == (1, 41)
+    assert pipeline.encode(np.zeros((5, 41))).shape == (5, 41)
+    assert pipeline.encode(np.array([])).shape == (0, 41)
+    assert pipeline.encode([]).shape == (0, 41)
+
+
+@pytest.mark.parametrize("shape", [(41, 40), (82, 20), (1, 42), (40,)])
+def test_wrong_width_is_rejected(pipeline, shape):
+    with pytest.raises(ValueError):
+        pipeline.encode(np.zeros(shape))
+
+
+def test_wrong_width_lists_are_rejected(pipeline):
+    with pytest.raises(ValueError):
+        pipeline.encode([[0.0] * 40, [0.0] * 40])
+    with pytest.raises(ValueError):
+        pipeline.encode([0, 'tcp', 'http'])
+
+
+def test_category_strings_and_unknowns(pipeline):
+    row = [0, 'tcp', 'http', 'SF'] + [0] * 37
+    X = pipeline.encode([row, [0, 'sctp', 'gopher', 'XX'] + [0] * 37])
+    assert X[0, 1:4].tolist() == [1.0, 1.0, 2.0]             # LabelEncoder codes (sorted classes)
+    assert X[1, 1:4].tolist() == [InferencePipeline.UNKNOWN] * 3
+
+
+def test_dicts_match_sequences(pipeline):
+    row = [2, 'udp', 'private', 'S0', 120] + [0] * 36
+    as_dict = dict(zip(NSL_KDD_FEATURES, row))
+    np.testing.assert_array_equal(pipeline.encode(as_dict), pipeline.encode([row]))
+    # Missing dict features are 0
+    assert pipeline.encode({'src_bytes': 7}).tolist() == [[0] * 4 + [7] + [0] * 36]
@@ -0,0 +1,74 @@
+import ipaddress
+import random
+
+import pytest
+
+from rule_trie import ALLOW, BLOCK, NO_RULE, RuleEngine, parse_prefix
+
+
+def random_rules(rng, n, version):
+    bits, network_type = (32, ipaddress.IPv4Network) if version == 4 else (128, ipaddress.IPv6Network)
+    lengths = [0, 1, 8, 12, 16, 24, 31, 32] if version == 4 else [0, 16, 32, 48, 64, 127, 128]
+    rules = []
+    for _ in range(n):
+        plen = rng.choice(lengths)
+        network = network_type((rng.getrandbits(bits) >> (bits - plen) << (bits - plen), plen))
+        rules.append((network, rng.choice(["whitelist", "blacklist"])))
+    return rules
+
+
+def reference_match(rules, ip):
+    """Longest matching prefix by brute force over ipaddress networks (later rules win ties)"""
+    address = ipaddress.ip_address(ip)
+    best = None
+    for network, rule_type in rules:
+        if address.version == network.version and address in network:
+            if best is None or network.prefixlen >= best[0].prefixlen:
+                best = (network, rule_type)
+    return NO_RULE if best is None else (ALLOW if best[1] == "whitelist" else BLOCK)
+
+
+@pytest.mark.parametrize("version", [4, 6])
+def test_trie_matches_ipaddress(version):
+    rng = random.Random(version)
+    rules = random_rules(rng, 300, version)
+    engine = RuleEngine()
+    for network, rule_type in rules:
+        engine.add(str(network), rule_type)
+    address_type = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+    # Probe random addresses and the edges of every rule's range
+    probes = [str(address_type(rng.getrandbits(32 if version == 4 else 128))) for _ in range(500)]
+    for network, _ in rules:
+        probes += [str(network.network_address), str(network.broadcast_address)]
+    expected = [reference_match(rules, ip) for ip in probes]
+    assert [engine.match(ip) for ip in probes] == expected
+    assert engine.match_batch(probes).tolist() == expected
+
+
+def test_parse_prefix_masks_host_bits():
+    assert parse_prefix("10.1.2.3/8") == (4, int(ipaddress.ip_address("10.0.0.0")), 8)
+    assert parse_prefix("2001:db8::1/32")[1] == int(ipaddress.ip_address("2001:db8::"))
+
+
+@pytest.mark.parametrize("text", ["10.0.0.0/33", "10.0.0/8", "10.0.0.0/x", "::/129", "not an ip"])
+def test_parse_prefix_rejects_malformed(text):
+    with pytest.raises(ValueError):
+        parse_prefix(text)
+
+
+def test_non_addresses_never_match():
+    engine = RuleEngine()
+    engine.add("0.0.0.0/0", "blacklist")
+    assert engine.match("local") == NO_RULE
+    assert engine.match(None) == NO_RULE
+    assert engine.match_batch(["local", "", "1.2.3.4"]).tolist() == [NO_RULE, NO_RULE, BLOCK]
+
+
+def test_prefix_moves_between_lists():
+    engine = RuleEngine()
+    engine.add("10.0.0.0/8", "blacklist")
+    engine.add("10.0.0.0/8", "whitelist")
+    assert engine.match("10.9.9.9") == ALLOW
+    assert engine.to_dict() == {"whitelist": ["10.0.0.0/8"], "blacklist": []}
+    assert engine.remove("10.0.0.0/8", "whitelist")
+    assert engine.match("10.9.9.9") == NO_RULE and len(engine) == 0
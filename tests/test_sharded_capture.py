@@ -0,0 +1,48 @@
+import pytest
+
+from pcap_replay import write_sample_capture
+from sharded_capture import ShardedCapture, flow_shard
+
+
+@pytest.fixture(scope="module")
+def sample(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("capture") / "sample.pcap")
+    write_sample_capture(path, seconds=1.0)
+    return path
+
+
+def test_flow_shard_is_symmetric():
+    for n in (1, 2, 7):
+        assert flow_shard("10.0.0.1", "192.168.1.20", 40000, 80, 6, n) == \
+            flow_shard("192.168.1.20", "10.0.0.1", 80, 40000, 6, n)
+
+
+def test_replay_through_workers(sample):
+    report = ShardedCapture(workers=2).run_pcap(sample)
+    assert sum(w["packets"] for w in report["per_worker"]) == report["packets"]
+    assert report["dead_workers"] == {} and report["dropped_packets"] == 0 and report["errors"] == {}
+
+
+def test_dead_worker_does_not_hang_the_dispatcher(sample, monkeypatch):
+    start = ShardedCapture._start
+
+    def start_and_kill(self, mode, source=None):
+        start(self, mode, source)
+        self._processes[0].kill()
+        self._processes[0].join()
+
+    monkeypatch.setattr(ShardedCapture, "_start", start_and_kill)
+    report = ShardedCapture(workers=2, batch_size=1).run_pcap(sample)
+    assert 0 in report["dead_workers"]
+    assert report["dropped_packets"] > 0
+    assert report["per_worker"][1]["packets"] > 0
+
+
+def test_worker_error_still_sends_a_final_report():
+    capture = ShardedCapture(workers=1)
+    capture._start("pcap")
+    capture._put(0, [("not a packet",)])
+    capture._put(0, None)
+    capture._collect(final=True)
+    assert 0 in capture._finished
+    assert capture.latest[0]["error"].startswith("TypeError")
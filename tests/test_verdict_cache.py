@@ -0,0 +1,39 @@
+import numpy as np
+
+from verdict_cache import VerdictCache
+
+
+def test_hits_and_generation_invalidation():
+    cache = VerdictCache(max_size=100, ttl=60.0)
+    X = np.arange(12, dtype=np.float64).reshape(3, 4)
+    keys = cache.keys_for(X)
+    cache.sync("v1")
+    assert cache.get_many(keys) == [None, None, None]
+    assert cache.put_many(keys, [0.1, 0.2, 0.3], "v1")
+    assert cache.get_many(keys) == [0.1, 0.2, 0.3]
+
+    cache.sync("v2")                                  # hot reload / threshold change
+    assert cache.get_many(keys) == [None, None, None]
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_write_from_an_old_generation_is_dropped():
+    cache = VerdictCache(max_size=100, ttl=60.0)
+    keys = cache.keys_for(np.ones((2, 4)))
+    cache.sync("old")                                 # request starts on the old model ...
+    cache.sync("new")                                 # ... a reload lands meanwhile ...
+    assert not cache.put_many(keys, [0.9, 0.9], "old")   # ... and its late write is refused
+    assert cache.get_many(keys) == [None, None]
+    assert cache.get_stats()["stale_writes"] == 1
+
+
+def test_quantized_keys_and_lru_bound():
+    cache = VerdictCache(max_size=2, ttl=60.0, quantum=0.5)
+    a, b = cache.keys_for(np.array([[1.0, 2.0], [1.1, 2.1]]))
+    assert a == b
+    exact = VerdictCache()
+    assert exact.keys_for(np.array([[-0.0]])) == exact.keys_for(np.array([[0.0]]))
+    keys = cache.keys_for(np.array([[1.0], [2.0], [3.0]]))
+    cache.put_many(keys, [0.1, 0.2, 0.3])
+    assert cache.get_many(keys) == [None, 0.2, 0.3]
+    assert cache.get_stats()["evictions"] == 1
@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pytest
+
+from flow_table import FlowTable
+from wire_protocol import RECORD_DTYPE, WireReceiver, WireSender, addresses, to_records
+
+
+class _Sink:
+    def __init__(self):
+        self.datagrams = []
+
+    def sendto(self, payload, addr):
+        self.datagrams.append(bytes(payload))
+
+
+def connection_records(pairs):
+    """One closed TCP connection per (client, server) address pair"""
+    table = FlowTable()
+    for i, (client, server) in enumerate(pairs):
+        sport = 40000 + i
+        table.update(100.0 + i, client, server, sport, 80, 6, 0, 0x02)
+        table.update(100.1 + i, server, client, 80, sport, 6, 0, 0x12)
+        table.update(100.2 + i, client, server, sport, 80, 6, 120, 0x18)
+        table.update(100.3 + i, server, client, 80, sport, 6, 900, 0x18)
+        table.update(100.4 + i, client, server, sport, 80, 6, 0, 0x04)
+    table.flush()
+    return table.drain()
+
+
+PAIRS = [("10.0.0.1", "192.168.1.20"), ("0.0.0.0", "10.1.0.0"), ("10.1.0.0", "0.0.0.0"),
+         ("2001:db8::1", "::"), ("::", "fe80::"), ("192.168.0.0", "1.0.0.0")]
+
+
+def test_binary_round_trip_keeps_addresses_and_features():
+    records = connection_records(PAIRS)
+    sink = _Sink()
+    sender = WireSender(sink, None)
+    for record in records:
+        sender.add(record)
+    sender.flush()
+    receiver = WireReceiver()
+    batch = np.concatenate([receiver.decode(d, ("sensor", 1)) for d in sink.datagrams])
+    assert batch.dtype == RECORD_DTYPE
+    srcs, dsts = addresses(batch)
+    assert srcs == [r["ip"] for r in records]
+    assert dsts == [r["dst"] for r in records]
+    for sent, got in zip(records, to_records(batch)):
+        assert (got["ip"], got["dst"], got["sport"], got["dport"]) == \
+            (sent["ip"], sent["dst"], sent["sport"], sent["dport"])
+        assert got["features"][1:4] == sent["features"][1:4]
+        assert got["features"][4:6] == sent["features"][4:6]
+        assert got["features"][6:] == pytest.approx(sent["features"][6:41], rel=1e-6)
+
+
+def test_full_datagrams_and_loss_accounting():
+    records = connection_records([(f"10.0.{i // 250}.{i % 250 + 1}", "192.168.1.20") for i in range(100)])
+    sink = _Sink()
+    sender = WireSender(sink, None)
+    for record in records:
+        sender.add(record)
+    sender.flush()
+    assert len(sink.datagrams) == -(-len(records) // sender.capacity)
+    receiver = WireReceiver()
+    for datagram in sink.datagrams[:1] + sink.datagrams[2:]:      # lose the second one
+        receiver.decode(datagram, ("sensor", 1))
+    stats = receiver.get_stats()
+    assert stats["lost_datagrams"] == 1
+    assert stats["records"] == len(records) - sender.capacity
+
+
+def test_json_and_malformed_datagrams():
+    receiver = WireReceiver()
+    record = {"ip": "10.0.0.1", "features": [0] * 41}
+    assert receiver.decode(json.dumps(record).encode()) == [record]
+    assert receiver.decode(b"\x00garbage") is None
+    stats = receiver.get_stats()
+    assert stats["json_records"] == 1 and stats["rejected"] == 1